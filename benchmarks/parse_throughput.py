@@ -0,0 +1,79 @@
+#!/usr/bin/python
+"""
+Measures how fast the crawler turns fetched pages into links.
+
+usage: python benchmarks/parse_throughput.py [-n pages] [-a anchors]
+
+Every page goes through Crawler._parse_page() with each link extraction
+backend, so excludes(), canonical() and the regex sweep are included.
+No network access is needed; the pages are generated.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from modules.crawler import Crawler  # noqa: E402
+from modules.linkparser import PARSERS, get_parser  # noqa: E402
+
+
+def make_pages(count, anchors, seed=0):
+    """ Generates forum-like pages with many anchors each.
+
+    :param count: Integer - Number of pages.
+    :param anchors: Integer - Anchors per page.
+    :return: List of Strings.
+    """
+    rnd = random.Random(seed)
+    pages = []
+    for index in range(count):
+        parts = [f"<html><head><title>Board {index}</title>"
+                 "<script src='/static/app.js'></script></head><body><table>"]
+        for _ in range(anchors):
+            topic = rnd.randrange(100000)
+            parts.append(f"<tr><td class='topic'><a href='/topic/{topic}?page=1'>"
+                         f"Topic {topic}</a></td><td><img src='/avatar/{topic}.png'>"
+                         f"<a href='http://mirror{topic % 7}.onion/t/{topic}'>mirror</a>"
+                         "</td></tr>")
+        parts.append("</table></body></html>")
+        pages.append(''.join(parts))
+    return pages
+
+
+def run(name, pages, parse):
+    """ Times a parse function over all pages and prints its throughput. """
+    size = sum(len(page.encode('utf-8')) for page in pages)
+    started = time.perf_counter()
+    for page in pages:
+        parse(page)
+    elapsed = time.perf_counter() - started
+    print(f"{name:<28} {len(pages) / elapsed:10.1f} pages/s "
+          f"{size / elapsed / 1048576:8.2f} MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Link extraction throughput.")
+    parser.add_argument('-n', '--pages', type=int, default=200)
+    parser.add_argument('-a', '--anchors', type=int, default=500)
+    args = parser.parse_args()
+
+    pages = make_pages(args.pages, args.anchors)
+    print(f"## {args.pages} pages, {args.anchors} rows each")
+
+    for name in PARSERS:
+        run(f"{name} (extract only)", pages, get_parser(name))
+
+    for name in PARSERS:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            crawler = Crawler("http://forum.onion", 1, 0, temp_dir, False, False,
+                              parser=name)
+            run(f"{name} (_parse_page)", pages,
+                lambda page, c=crawler: c._parse_page(c.website, page, []))
+
+
+if __name__ == '__main__':
+    main()
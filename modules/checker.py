@@ -10,7 +10,8 @@ import sys
 from json import load
 from urllib.error import HTTPError
 from urllib.parse import urlparse
-from urllib.request import urlopen
+
+from modules.transport import EndpointPool, SocksTransport, open_url, parse_endpoints
 
 
 def url_canon(website, verbose):
@@ -99,11 +100,14 @@ def check_tor(verbose):
 
 def check_ip():
     """ Checks users IP from external resource.
+
+    Goes through open_url(), so the IP is looked up over the same TOR
+    transport (or SOCKS default) as the crawl itself.
     :return: None or HTTPError
     """
     api_address = 'https://api.ipify.org/?format=json'
     try:
-        my_ip = load(urlopen(api_address))['ip']
+        my_ip = load(open_url(api_address))['ip']
         print(f'## Your IP: {my_ip}')
     except HTTPError as err:
         error = sys.exc_info()[0]
@@ -113,6 +117,9 @@ def check_ip():
 
 _user_agents_cache = None
 _proxies_cache = None
+_proxy_transport = None
+# Seconds a dead proxy sits out before a health check may re-admit it.
+PROXY_COOLDOWN = 300.0
 
 
 def _read_resource_file(filename):
@@ -149,14 +156,14 @@ def get_random_user_agent():
     return None
 
 
-def get_random_proxy():
-    """ Loads proxies from res/proxies.txt and returns a random one.
+def _load_proxies():
+    """ Loads proxies from res/proxies.txt once per process.
     If no proxies are found, displays a helpful message with instructions.
-    
-    :return: String - Random proxy string (format: host:port) or None if no proxies available
+
+    :return: List - Proxy strings (format: host:port), or None on read error.
     """
     global _proxies_cache
-    
+
     if _proxies_cache is None:
         proxies_file = _read_resource_file('proxies.txt')
         try:
@@ -169,7 +176,7 @@ def get_random_proxy():
         except IOError:
             print(f"## Warning: Could not load proxies from {proxies_file}")
             return None
-        
+
         # If no proxies found, show helpful message
         if not _proxies_cache:
             print("## No proxies found in res/proxies.txt")
@@ -178,15 +185,53 @@ def get_random_proxy():
             print("##   127.0.0.1:9050")
             print("##   192.168.1.1:8080")
             print("##   proxy.example.com:3128")
-            return None
+
+    return _proxies_cache
+
+
+def get_random_proxy():
+    """ Loads proxies from res/proxies.txt and returns a random one.
+    If no proxies are found, displays a helpful message with instructions.
     
-    if _proxies_cache:
-        return random.choice(_proxies_cache)
+    :return: String - Random proxy string (format: host:port) or None if no proxies available
+    """
+    proxies = _load_proxies()
+    if proxies:
+        return random.choice(proxies)
     return None
 
 
+def get_proxy_transport():
+    """ Returns the transport used for --random-proxy requests.
+
+    Every request is bound to a proxy from res/proxies.txt on its own
+    connection, so concurrent requests never race on `socket.socket`.
+    Proxies are picked by health score and latency. A proxy that can't be
+    reached is evicted until a health check, PROXY_COOLDOWN seconds
+    later, finds it back; errors about the destination don't count.
+
+    :return: SocksTransport or None if no proxies are available.
+    """
+    global _proxy_transport
+
+    if _proxy_transport is None:
+        endpoints = []
+        for proxy_string in _load_proxies() or []:
+            try:
+                endpoints.extend(parse_endpoints(proxy_string))
+            except ValueError:
+                print(f"## Warning: Invalid proxy format: {proxy_string}. Expected host:port")
+        if not endpoints:
+            return None
+        pool = EndpointPool(endpoints, cooldown=PROXY_COOLDOWN, strategy='weighted')
+        _proxy_transport = SocksTransport(pool)
+    return _proxy_transport
+
+
 def setup_proxy_connection(proxy_string):
-    """ Sets up a SOCKS5 proxy connection for a request.
+    """ Sets up a SOCKS5 proxy connection for the whole process.
+
+    Not safe with concurrent requests; prefer get_proxy_transport().
     
     :param proxy_string: String - Proxy in format "host:port"
     :return: None
@@ -1,30 +1,61 @@
 #!/usr/bin/python
-import http.client
 import os
 import re
+import sqlite3
 import sys
 import datetime
 import time
 import urllib.request
-from urllib.parse import urlparse, urljoin
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+from collections import defaultdict, deque
 from urllib.error import HTTPError, URLError
 
-from bs4 import BeautifulSoup
 from modules.checker import get_random_user_agent
-from modules.checker import get_random_proxy
-from modules.checker import setup_proxy_connection
+from modules.checker import get_proxy_transport
+from modules.export import export_json
+from modules.incremental import content_hash, open_page_cache
+from modules.linkparser import DEFAULT_PARSER, get_parser
+from modules.pagestore import response_details
+from modules.scanner import PatternScanner
+from modules.scheduler import HostScheduler
+from modules.seen import DEFAULT_BLOOM_ERROR, open_seen_store
+from modules.state import CrawlState
+from modules.transport import ContentRejected, open_url
+from modules.urls import EdgeList, ResourceIndex, URLTable, parse_url
+from modules.writer import BufferedWriter
 
 DEFAULT_URL_REGEX = r'(?:(?:https?|ftp|file):\/\/|www\.)[^\s"\'<>]+'
 DEFAULT_REGEX_FILE = os.path.abspath(
     os.path.join(os.path.dirname(__file__), os.pardir, 'res', 'regex_patterns.txt')
 )
+DEFAULT_EXTENSIONS_FILE = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), os.pardir, 'res', 'extensions.txt')
+)
 IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.bmp')
+SCRIPT_EXTS = ('.js', '.mjs', '.ts', '.jsx', '.tsx')
+FILE_EXTS = ('.pdf', '.doc')
+# Used when res/extensions.txt can't be read.
+DEFAULT_EXTENSION_CATEGORIES = {
+    "images": IMAGE_EXTS,
+    "scripts": SCRIPT_EXTS,
+    "files": FILE_EXTS,
+}
+# Links with these schemes are findings of their own, not pages.
+SCHEME_CATEGORIES = {'tel': 'telephones', 'mailto': 'emails'}
+CATEGORIES = ("external_links", "images", "scripts", "telephones", "emails", "files")
+# Output files not named after their category.
+CATEGORY_FILES = {"external_links": "ext-links", "emails": "mails"}
+HTML_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain')
+DEFAULT_MAX_PAGE_BYTES = 10 * 1024 * 1024
 
 
 class Crawler:
     def __init__(self, website, c_depth, c_pause, out_path, logs, verbose,
-                 random_ua=False, random_proxy=False):
+                 random_ua=False, random_proxy=False, workers=1,
+                 max_page_bytes=DEFAULT_MAX_PAGE_BYTES, parser=DEFAULT_PARSER,
+                 async_writes=False, seen_store='memory', bloom_error=DEFAULT_BLOOM_ERROR,
+                 state_dir=None, resume=False, incremental=False, page_store=None):
         self.website = website
         self.c_depth = c_depth
         self.c_pause = c_pause
@@ -33,42 +64,45 @@ class Crawler:
         self.verbose = verbose
         self.random_ua = random_ua
         self.random_proxy = random_proxy
-        self.regex_patterns = self._load_regex_patterns()
+        self.workers = max(1, int(workers or 1))
+        self.max_page_bytes = max_page_bytes or None
+        self.parser = parser
+        self._extract_links = get_parser(parser)
+        # Findings files and crawler.log share one buffered handle each.
+        self.writer = BufferedWriter(background=async_writes)
+        # Politeness (-p) is enforced per host rather than as a global sleep.
+        self.scheduler = HostScheduler(min_delay=float(c_pause or 0))
+        self.scanner = self._load_regex_patterns()
         self.timestamp = datetime.datetime.now().strftime("%y%m%d")
-        parsed = urlparse(self.website)
-        netloc = parsed.netloc.lower()
-        self.base_domain = netloc[4:] if netloc.startswith("www.") else netloc
-        self.findings = {
-            "links": set(),
-            "external_links": set(),
-            "images": set(),
-            "scripts": set(),
-            "telephones": set(),
-            "emails": set(),
-            "files": set(),
-        }
-        self.normalized_links = set()
-        self.logged = {
-            "external_links": set(),
-            "images": set(),
-            "scripts": set(),
-            "telephones": set(),
-            "emails": set(),
-            "files": set(),
-        }
-        self.resources = {
-            "external_links": defaultdict(set),
-            "images": defaultdict(set),
-            "scripts": defaultdict(set),
-            "telephones": defaultdict(set),
-            "emails": defaultdict(set),
-            "files": defaultdict(set),
-        }
-        self.edges = set()
+        self.base_domain = parse_url(self.website).domain
+        # Extension -> category, e.g. {'png': 'images', 'zip': 'archives'}.
+        self.extension_categories = self._load_extension_categories()
+        self.categories = list(CATEGORIES) + sorted(
+            set(self.extension_categories.values()) - set(CATEGORIES))
+        self.findings = {"links": set()}
+        self.findings.update({category: set() for category in self.categories})
+        self.findings["matches"] = defaultdict(set)
+        # Normalized links and logged findings already seen; may live on
+        # disk or in a Bloom filter for very large crawls. The links
+        # themselves are still kept below, for the results and exports.
+        self.seen = open_seen_store(seen_store, out_path, error_rate=bloom_error)
+        # Edges and resources refer to URLs by their ID in one shared table.
+        self.urls = URLTable()
+        self.resources = {category: ResourceIndex(self.urls) for category in self.categories}
+        self.edges = EdgeList(self.urls)
         self.titles = {}
+        # Depth, status, size and fetch time of every fetched page.
+        self.pages = {}
+        # Checkpoints of the crawl, for --resume.
+        self.state = CrawlState(state_dir, resume) if state_dir else None
+        # Validators, hashes and extractions of earlier crawls, for --incremental.
+        self.page_cache = open_page_cache(out_path) if incremental else None
+        # Fetched bodies are kept here for the extractor (-c -e) to reuse.
+        self.page_store = page_store
 
     def _load_regex_patterns(self):
-        """Load regex patterns from res/regex_patterns.txt plus default URL pattern."""
+        """Load regex patterns from res/regex_patterns.txt plus default URL pattern
+        into a single scanner."""
         patterns = [DEFAULT_URL_REGEX]
 
         # Only read patterns from the dedicated file.
@@ -83,15 +117,49 @@ class Crawler:
             print(f"## Unable to read regex pattern file {DEFAULT_REGEX_FILE}: {err}")
             self.write_log(f"[INFO] WARN: Unable to read regex pattern file {DEFAULT_REGEX_FILE}: {err}\n")
 
-        compiled_patterns = []
+        valid_patterns = []
         for pattern in patterns:
             try:
-                compiled_patterns.append(re.compile(pattern, re.IGNORECASE))
+                re.compile(pattern, re.IGNORECASE)
+                valid_patterns.append(pattern)
             except re.error as err:
                 print(f"## Skipping invalid regex pattern '{pattern}': {err}")
                 self.write_log(f"[INFO] WARN: Skipping invalid regex pattern '{pattern}': {err}\n")
 
-        return compiled_patterns
+        return PatternScanner(valid_patterns, re.IGNORECASE)
+
+    def _load_extension_categories(self):
+        """Load the extension -> category table from res/extensions.txt.
+
+        Each line reads `category: ext ext ...`. Links with a listed
+        extension are logged under their category and never crawled.
+        """
+        table = {}
+        try:
+            with open(DEFAULT_EXTENSIONS_FILE, 'r', encoding='UTF-8') as extensions_file:
+                for line in extensions_file:
+                    stripped = line.strip()
+                    if not stripped or stripped.startswith('#'):
+                        continue
+                    category, sep, extensions = stripped.partition(':')
+                    category = category.strip().lower()
+                    if not sep or not re.fullmatch(r'[a-z0-9_-]+', category) \
+                            or category in ("links", "matches"):
+                        print(f"## Skipping invalid extension category '{stripped}'")
+                        self.write_log(f"[INFO] WARN: Skipping invalid extension category '{stripped}'\n")
+                        continue
+                    for extension in extensions.replace(',', ' ').split():
+                        table[extension.lstrip('.').lower()] = category
+        except OSError as err:
+            print(f"## Unable to read extensions file {DEFAULT_EXTENSIONS_FILE}: {err}")
+            self.write_log(f"[INFO] WARN: Unable to read extensions file {DEFAULT_EXTENSIONS_FILE}: {err}\n")
+            for category, extensions in DEFAULT_EXTENSION_CATEGORIES.items():
+                for extension in extensions:
+                    table[extension.lstrip('.')] = category
+
+        # Links without an extension are never classified by it.
+        table.pop('', None)
+        return table
 
     def excludes(self, link, source_url=None):
         """ Excludes links that are not required.
@@ -102,68 +170,45 @@ class Crawler:
         now = self.timestamp
         source = source_url or self.website
 
+        # BeautifulSoup returns tags without href; skip missing targets early
+        if link is None:
+            return True
+
+        # Every link is parsed once; excludes(), canonical() and the
+        # dedupe checks all share the cached result.
+        url = parse_url(link)
         # Normalize domain comparison for absolute links to treat same-domain (with/without www)
         same_domain = False
-        if isinstance(link, str) and link.startswith(('http://', 'https://')):
-            try:
-                parsed = urlparse(link)
-                netloc = parsed.netloc.lower()
-                candidate_domain = netloc[4:] if netloc.startswith("www.") else netloc
-                same_domain = candidate_domain == self.base_domain
-            except ValueError:
-                # Malformed URL; let the regular exclusion rules handle (or skip)
+        if link.startswith(('http://', 'https://')):
+            if not url.valid:
+                # Malformed URL; skip it
                 return True
+            same_domain = url.domain == self.base_domain
 
-        # BeautifulSoup returns tags without href; skip missing targets early
-        if link is None:
-            return True
         # Links
-        elif '#' in link:
-            return True
-        # Image links (log separately only)
-        elif self._is_image_link(link):
-            img_path = self.out_path + '/' + now + '_images.txt'
-            self._log_once("images", link, img_path)
-            self.findings["images"].add(str(link))
-            self.resources["images"][source].add(str(link))
-            return True
-        # Script links (log separately only)
-        elif re.search('^.*\\.(js|mjs|ts|jsx|tsx)$', link, re.IGNORECASE):
-            script_path = self.out_path + '/' + now + '_scripts.txt'
-            self._log_once("scripts", link, script_path)
-            self.findings["scripts"].add(str(link))
-            self.resources["scripts"][source].add(str(link))
-            return True
-        # External links
-        elif link.startswith('http') and not same_domain:
-            file_path = self.out_path + '/' + now + '_ext-links.txt'
-            self._log_once("external_links", link, file_path)
-            self.findings["external_links"].add(str(link))
-            self.resources["external_links"][source].add(str(link))
-            return True
-        # Telephone Number
-        elif link.startswith('tel:'):
-            link = link.replace('tel:', '', 1)
-            file_path = self.out_path + '/' + now + '_telephones.txt'
-            self._log_once("telephones", link, file_path)
-            self.findings["telephones"].add(str(link))
-            self.resources["telephones"][source].add(str(link))
-            return True
-        # Mails
-        elif link.startswith('mailto:'):
-            link = link.replace('mailto:', '', 1)
-            file_path = self.out_path + '/' + now + '_mails.txt'
-            self._log_once("emails", link, file_path)
-            self.findings["emails"].add(str(link))
-            self.resources["emails"][source].add(str(link))
-            return True
-        # Other files
-        elif re.search('^.*\\.(pdf|doc)$', link, re.IGNORECASE):
-            file_path = self.out_path + '/' + now + '_files.txt'
-            self._log_once("files", link, file_path)
-            self.findings["files"].add(str(link))
+        if '#' in link:
             return True
 
+        # One lookup per table instead of a chain of pattern matches.
+        category = SCHEME_CATEGORIES.get(url.scheme)
+        if category is not None:
+            # Telephone Numbers and Mails
+            link = link[len(url.scheme) + 1:]
+        else:
+            category = self.extension_categories.get(url.extension)
+        if category is None and link.startswith('http') and not same_domain:
+            category = "external_links"
+        if category is None:
+            return False
+
+        file_path = f"{self.out_path}/{now}_{CATEGORY_FILES.get(category, category)}.txt"
+        self._log_once(category, link, file_path)
+        self.findings[category].add(link)
+        self.resources[category].add(source, link)
+        if self.state is not None:
+            self.state.add_finding(category, link, source)
+        return True
+
     def canonical(self, link):
         """ Canonicalization of the link.
 
@@ -175,14 +220,11 @@ class Crawler:
             return link
         # Absolute URL with same base domain but different subdomain (e.g., missing www)
         if link.startswith(('http://', 'https://')):
-            try:
-                parsed = urlparse(link)
-                netloc = parsed.netloc.lower()
-                candidate_domain = netloc[4:] if netloc.startswith("www.") else netloc
-                if candidate_domain == self.base_domain:
-                    return link
-            except ValueError:
+            url = parse_url(link)
+            if not url.valid:
                 return None
+            if url.domain == self.base_domain:
+                return link
         # For relative paths with / in front
         elif link.startswith('/'):
             if self.website[-1] == '/':
@@ -195,21 +237,18 @@ class Crawler:
             return urljoin(self.website if self.website.endswith('/') else self.website + '/', link)
         # Protocol-relative URLs
         elif link.startswith('//'):
-            parsed_base = urlparse(self.website)
-            return f"{parsed_base.scheme}:{link}"
+            return f"{parse_url(self.website).scheme}:{link}"
 
     def write_log(self, log):
         log_path = self.out_path + '/crawler.log'
         now = datetime.datetime.now()
 
         if self.logs is True:
-            open(log_path, 'a+')
-            if self.logs is True and os.access(log_path, os.W_OK) is False:
+            try:
+                self.writer.write(log_path, str(now) + " [crawler.py] " + log)
+            except OSError:
                 print(f"## Unable to write to {self.out_path}/log.txt - Exiting")
                 sys.exit(2)
-            with open(log_path, 'a+', encoding='UTF-8') as log_file:
-                log_file.write(str(now) + " [crawler.py] " + log)
-                log_file.close()
 
     def _make_request(self, url):
         """ Makes an HTTP request with optional random user-agent and proxy.
@@ -217,202 +256,434 @@ class Crawler:
         :param url: String - URL to request
         :return: HTTPResponse object
         """
-        # Set up proxy if random proxy is enabled
-        if self.random_proxy:
-            proxy = get_random_proxy()
-            if proxy:
-                setup_proxy_connection(proxy)
-        
+        headers = {}
         # Set up user-agent if random UA is enabled
         if self.random_ua:
             user_agent = get_random_user_agent()
             if user_agent:
-                req = urllib.request.Request(url, headers={'User-Agent': user_agent})
-                return urllib.request.urlopen(req)
-        return urllib.request.urlopen(url)
+                headers['User-Agent'] = user_agent
+        # Lets unchanged pages come back as an empty 304 Not Modified.
+        if self.page_cache is not None:
+            headers.update(self.page_cache.conditional_headers(url))
+        request = urllib.request.Request(url, headers=headers) if headers else url
 
+        # Only pages are parsed; anything else is dropped before download.
+        options = {'accept_types': HTML_TYPES, 'max_bytes': self.max_page_bytes,
+                   'scheduler': self.scheduler}
 
-    def crawl(self):
-        """ Core of the crawler.
-        :return: List (ord_lst) - List of crawled links.
+        # Bind a proxy to this request only if random proxy is enabled
+        if self.random_proxy:
+            proxy_transport = get_proxy_transport()
+            if proxy_transport:
+                return open_url(request, transport=proxy_transport, **options)
+        return open_url(request, **options)
+
+
+    def _fetch(self, item):
+        """ Fetches a single page and decodes its body.
+
+        Runs on worker threads when the concurrent engine is enabled, so it
+        must not touch the findings/edges bookkeeping.
+
+        :param item: String - URL to fetch.
+        :return: Tuple (html_page, html_content, fetch_info) or None if
+            unreachable; fetch_info holds the body's size in bytes, the
+            seconds the fetch took and when it finished (UTC, ISO 8601).
         """
-        lst = set()
-        ord_lst = []
-        ord_lst.insert(0, self.website)
-        self.findings["links"].add(self.website)
-        self.normalized_links.add(self._normalize_for_dedupe(self.website))
-        ord_lst_ind = 0
+        host = parse_url(item).netloc
+        self.scheduler.acquire(host)
+        started = time.monotonic()
+        try:
+            html_page = self._make_request(item)
+        except ContentRejected as rejected:
+            self.scheduler.release(host, time.monotonic() - started)
+            self.write_log(f"[INFO] SKIP: Not a page: {str(item)} | Type: {rejected.reason}\n")
+            return None
+        except (HTTPError, URLError) as error:
+            # Client errors say nothing about the host's health.
+            overloaded = not isinstance(error, HTTPError) or error.code >= 500 or error.code == 429
+            self.scheduler.release(host, time.monotonic() - started, error=overloaded)
+            self.write_log(f"[INFO] ERROR: Domain or link seems to be unreachable: {str(item)} | "
+                           f"Message: {error}\n")
+            return None
 
-        print(f"## Crawler started from {self.website} with "
-              f"{str(self.c_depth)} depth crawl, and {str(self.c_pause)} "
-              f"second(s) delay.")
+        try:
+            raw_content = html_page.read()
+            if isinstance(raw_content, (bytes, bytearray)):
+                html_content = raw_content.decode('utf-8', errors='ignore')
+            else:
+                html_content = str(raw_content)
+        except Exception:
+            self.scheduler.release(host, time.monotonic() - started, error=True)
+            self.write_log(f"[INFO] ERROR: Unable to read content from: {str(item)}\n")
+            return None
+
+        elapsed = time.monotonic() - started
+        self.scheduler.release(host, elapsed)
+        fetch_info = {
+            "bytes": len(raw_content),
+            "elapsed": round(elapsed, 3),
+            "fetched_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        }
+        truncated = getattr(html_page, 'truncated', False)
+        if truncated:
+            self.write_log(f"[INFO] WARN: Truncated to {self.max_page_bytes} bytes: {str(item)}\n")
+        elif self.page_store is not None and isinstance(raw_content, (bytes, bytearray)):
+            self._store_body(item, html_page, raw_content)
+        return html_page, html_content, fetch_info
+
+    def _store_body(self, item, html_page, raw_content):
+        """ Keeps a fetched body and its response in the page store for
+        the extractor.
+
+        :param item: String - URL of the page.
+        :param html_page: Response - Response the body came with.
+        :param raw_content: Bytes - Body as received.
+        :return: None
+        """
+        try:
+            # A 304 has no body; the one stored last time is still current.
+            if html_page.status == 304:
+                self.page_store.touch(item)
+            else:
+                self.page_store.put(item, bytes(raw_content),
+                                    response_details(html_page, item))
+        except (OSError, sqlite3.Error) as err:
+            self.write_log(f"[INFO] WARN: Unable to store page {str(item)}: {err}\n")
+
+    def _fetch_all(self, items, executor=None):
+        """ Yields (item, page) pairs for every item, in the given order.
+
+        Without an executor the pages are fetched lazily one by one; with
+        one, items are pulled lazily and at most twice `self.workers` of
+        them are in flight or waiting to be handed out at once (as in
+        run_pipeline), so a large level doesn't queue up at once.
+
+        :param items: Iterable - URLs to fetch.
+        :param executor: ThreadPoolExecutor - Pool of fetch workers.
+        :return: Generator of (String, Tuple or None).
+        """
+        if executor is None:
+            for item in items:
+                yield item, self._fetch(item)
+            return
 
-        # Depth
-        for index in range(0, int(self.c_depth)):
-
-            # For every element of list.
-            for item in ord_lst:
-                html_page = http.client.HTTPResponse
-                # Check if is the first element
-                if ord_lst_ind > 0:
-                    try:
-                        if item is not None:
-                            html_page = self._make_request(item)
-                    except (HTTPError, URLError) as error:
-                        self.write_log(f"[INFO] ERROR: Domain or link seems to be unreachable: {str(item)} | "
-                                       f"Message: {error}\n")
-                        continue
-                else:
-                    try:
-                        html_page = self._make_request(self.website)
-                        ord_lst_ind += 1
-                    except (HTTPError, URLError) as error:
-                        self.write_log(f"[INFO] ERROR: Domain or link seems to be unreachable: {str(item)} | "
-                                       f"Message: {error}\n")
-                        ord_lst_ind += 1
-                        continue
+        max_pending = 2 * self.workers
+        pending = deque()
+        try:
+            for item in items:
+                pending.append((item, executor.submit(self._fetch, item)))
+                if len(pending) >= max_pending:
+                    item, future = pending.popleft()
+                    yield item, future.result()
+            while pending:
+                item, future = pending.popleft()
+                yield item, future.result()
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    def _parse_page(self, source_url, html_content, lst):
+        """ Extracts links and resources from a fetched page.
+
+        :param source_url: String - URL of the page.
+        :param html_content: String - Decoded page body.
+        :param lst: List - Collects newly discovered links.
+        :return: Boolean - False if the page couldn't be parsed.
+        """
+        extracted = self._extract_page(source_url, html_content)
+        if extracted is None:
+            return False
+        self._apply_extraction(source_url, extracted, lst)
+        return True
+
+    def _extract_page(self, source_url, html_content):
+        """ Parses a page into what the crawler needs from it.
+
+        The result only holds strings, so it can be stored and applied
+        again on a later crawl without parsing the page (see --incremental).
+
+        :param source_url: String - URL of the page.
+        :param html_content: String - Decoded page body.
+        :return: Dict - Title, links found by the parser and [pattern, match]
+            pairs found by the regex sweep, or None if it couldn't be parsed.
+        """
+        try:
+            page_title, links = self._extract_links(html_content)
+        except (TypeError, ValueError):
+            print(f"## Parser Error Encountered:: couldn't parse {source_url}")
+            return None
+        return {
+            "title": page_title,
+            "links": list(links),
+            "matches": [[pattern, match] for pattern, match in self.scanner.scan(html_content)],
+        }
 
-                try:
-                    raw_content = html_page.read()
-                    if isinstance(raw_content, (bytes, bytearray)):
-                        html_content = raw_content.decode('utf-8', errors='ignore')
-                    else:
-                        html_content = str(raw_content)
-                except Exception:
-                    self.write_log(f"[INFO] ERROR: Unable to read content from: {str(item)}\n")
-                    continue
+    def _apply_extraction(self, source_url, extracted, lst):
+        """ Records the links and resources extracted from a page.
 
-                try:
-                    soup = BeautifulSoup(html_content, features="html.parser")
-                except TypeError:
-                    print(f"## Soup Error Encountered:: couldn't parse "
-                          f"ord_list # {ord_lst_ind}::{ord_lst[ord_lst_ind]}")
+        :param source_url: String - URL of the page.
+        :param extracted: Dict - Result of _extract_page().
+        :param lst: List - Collects newly discovered links.
+        :return: None
+        """
+        self.titles[source_url] = extracted["title"]
+
+        # For each link-bearing attribute found by the parser.
+        for link in extracted["links"]:
+            if self.excludes(link, source_url):
+                continue
+
+            ver_link = self.canonical(link)
+            if ver_link is not None:
+                self._add_link(ver_link, source_url, lst)
+
+        # Additional regex sweep, in one pass, for links not inside tags and
+        # for matches of the custom patterns.
+        for pattern, match in extracted["matches"]:
+            link = match.rstrip('),.;\'"')
+            if pattern != DEFAULT_URL_REGEX:
+                self.findings["matches"][pattern].add(link)
+                if self.state is not None:
+                    self.state.add_match(pattern, link)
+                # Wallets, keys etc. are findings only, not links to follow.
+                if not self._looks_like_link(link):
                     continue
+            if link.startswith('www.'):
+                link = f"https://{link}"
+            if self.excludes(link, source_url):
+                continue
+            ver_link = self.canonical(link)
+            if ver_link is not None:
+                self._add_link(ver_link, source_url, lst)
+
+    def _process_page(self, item, html_page, html_content, lst):
+        """ Parses a fetched page, or reuses what an earlier crawl stored
+        for it when it hasn't changed.
+
+        :param item: String - URL of the page.
+        :param html_page: Response - The fetched page.
+        :param html_content: String - Decoded page body.
+        :param lst: List - Collects newly discovered links.
+        :return: Boolean - False if the page couldn't be parsed.
+        """
+        if self.page_cache is None:
+            return self._parse_page(item, html_content, lst)
+
+        headers = getattr(html_page, 'headers', None)
+        stored = self.page_cache.lookup(item)
+        digest = content_hash(html_content)
+        # 304 Not Modified has no body; the stored extraction stands in for it.
+        if stored is not None and (html_page.status == 304 or stored[0] == digest):
+            self.page_cache.unchanged_page(item, headers)
+            self._apply_extraction(item, stored[1], lst)
+            return True
 
-                source_url = item if item else self.website
-                page_title = None
-                if soup.title and soup.title.string:
-                    page_title = soup.title.string.strip()
-                self.titles[source_url] = page_title
+        extracted = self._extract_page(item, html_content)
+        if extracted is None:
+            return False
+        self.page_cache.store(item, headers, digest, extracted)
+        self._apply_extraction(item, extracted, lst)
+        return True
 
-                # For each <a href=""> tag.
-                for link in soup.find_all('a'):
-                    link = link.get('href')
+    @staticmethod
+    def _looks_like_link(match):
+        """Whether a regex match is a URL or path rather than a bare token."""
+        return '/' in match or ':' in match or match.startswith('www.')
 
-                    if self.excludes(link, source_url):
-                        continue
+    def crawl(self):
+        """ Core of the crawler.
 
-                    ver_link = self.canonical(link)
-                    if ver_link is not None:
-                        self._add_link(ver_link, source_url, lst)
-                        self.edges.add((source_url, ver_link))
+        Breadth-first walk over a frontier with one deque per depth level.
+        The seen store lets every URL into the frontier once, so it is
+        fetched at most once; its depth is the level it is queued at and
+        is kept in `self.pages` once it is fetched.
 
-                # For each <area> tag.
-                for link in soup.find_all('area'):
-                    link = link.get('href')
+        With a state folder the crawl is checkpointed as it goes and a
+        resumed crawl picks up the links that weren't crawled yet.
 
-                    if self.excludes(link, source_url):
-                        continue
+        :return: List (ord_lst) - List of crawled links, in discovery order.
+        """
+        ord_lst = []
+        if self.state is not None and self.state.resumable(self.website):
+            start, pending = self._restore(ord_lst)
+            print(f"## Resuming crawl from {self.state.path} with "
+                  f"{str(len(ord_lst))} known link(s), "
+                  f"{str(len(ord_lst) - sum(map(len, pending.values())))} already crawled")
+        else:
+            start, pending = 0, {0: deque([self.website])}
+            ord_lst.append(self.website)
+            self.findings["links"].add(self.website)
+            self.seen.add(self._normalize_for_dedupe(self.website))
+            if self.state is not None:
+                self.state.begin(self.website)
 
-                    ver_link = self.canonical(link)
-                    if ver_link is not None:
-                        self._add_link(ver_link, source_url, lst)
-                        self.edges.add((source_url, ver_link))
-
-                # Additional regex sweep for links not inside <a> or <area> tags.
-                if self.verbose:
-                    # print("## Starting RegEx parsing of the page")
-                    pass
-                for pattern in self.regex_patterns:
-                    if self.verbose:
-                        # print(f"## Parsing with regex: {pattern.pattern}")
-                        pass
-                    for match in pattern.finditer(html_content):
-                        link = match.group(0).rstrip('),.;\'"')
-                        if link.startswith('www.'):
-                            link = f"https://{link}"
-                        if self.excludes(link, source_url):
-                            continue
-                        ver_link = self.canonical(link)
-                        if ver_link is not None:
-                            self._add_link(ver_link, source_url, lst)
-                            self.edges.add((source_url, ver_link))
-
-                # Pass new on list and re-set it to delete duplicates.
-                ord_lst = ord_lst + list(set(lst))
-                ord_lst = list(set(ord_lst))
-
-                # Keeps logs for every webpage visited.
-                page_code = html_page.status
-                url_visited = f"[{str(page_code)}] {str(item)} \n"
-                self.write_log("[INFO] Parsed: " + url_visited)
-
-                if self.verbose:
-                    sys.stdout.write(" -- Results: " + str(len(ord_lst)) + "\r")
-                    sys.stdout.flush()
-
-                # Add Pause time between each iteration
-                if (ord_lst.index(item) != len(ord_lst) - 1) and float(self.c_pause) > 0:
-                    time.sleep(float(self.c_pause))
+        print(f"## Crawler started from {self.website} with "
+              f"{str(self.c_depth)} depth crawl, and {str(self.c_pause)} "
+              f"second(s) delay.")
+        if self.workers > 1 and self.verbose:
+            print(f"## Concurrent engine enabled with {self.workers} workers")
+
+        # Worker threads live for the whole crawl, so per-thread transport
+        # state (e.g. Tor circuit isolation) stays stable across steps.
+        executor = None
+        if self.workers > 1:
+            executor = ThreadPoolExecutor(max_workers=self.workers)
+
+        try:
+            self._crawl_steps(ord_lst, executor, start, pending)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            self.writer.close()
+            if self.state is not None:
+                self.state.commit()
+
+        if self.page_cache is not None:
+            self._report_changes(ord_lst)
+        return ord_lst
+
+    def _report_changes(self, ord_lst):
+        """ Writes the new/changed/removed diff against the last crawl.
 
+        :param ord_lst: List - Every link found this crawl.
+        :return: None
+        """
+        changes = self.page_cache.finish(ord_lst)
+        self.page_cache.close()
+        export_json(self.out_path, f"{self.timestamp}_changes", changes)
+        print(f"## Incremental crawl: {len(changes['new'])} new, "
+              f"{len(changes['changed'])} changed, {changes['unchanged']} unchanged, "
+              f"{len(changes['removed'])} removed, {len(changes['failed'])} failed")
+
+    def _crawl_steps(self, ord_lst, executor, start, pending):
+        """ Walks the frontier one depth level at a time.
+
+        :param ord_lst: List - Crawled links, extended in place.
+        :param executor: ThreadPoolExecutor or None - Pool of fetch workers.
+        :param start: Integer - Depth level to start from.
+        :param pending: Dict - Depth -> Deque of URLs known to be due at it.
+        :return: None
+        """
+        frontier = pending.pop(start, deque())
+        # Depth
+        for index in range(start, int(self.c_depth)):
+            items = self._due(frontier)
+            next_frontier = pending.pop(index + 1, deque())
+
+            # Pages are parsed in frontier order on this thread, so the
+            # bookkeeping matches the serial engine.
+            for item, page in self._fetch_all(items, executor):
+                if page is not None:
+                    html_page, html_content, fetch_info = page
+                    self.pages[item] = {"depth": index, "status": html_page.status, **fetch_info}
+                    lst = []
+                    if self._process_page(item, html_page, html_content, lst):
+                        for link in lst:
+                            ord_lst.append(link)
+                            next_frontier.append(link)
+                            if self.state is not None:
+                                self.state.add_page(link, index + 1)
+
+                        # Keeps logs for every webpage visited.
+                        page_code = html_page.status
+                        if self.state is not None:
+                            self.state.page_done(item, page_code, self.titles.get(item))
+                        url_visited = f"[{str(page_code)}] {str(item)} \n"
+                        self.write_log("[INFO] Parsed: " + url_visited)
+
+                        if self.verbose:
+                            sys.stdout.write(" -- Results: " + str(len(ord_lst)) + "\r")
+                            sys.stdout.flush()
+
+
+            frontier = next_frontier
             print(f"## Step {str(index + 1)} completed "
                   f"with: {str(len(ord_lst))} result(s)")
 
-        return ord_lst
+    @staticmethod
+    def _due(frontier):
+        """ Pops the URLs of a level lazily, so only the fetch window is
+        taken off the frontier at a time.
+
+        :param frontier: Deque - URLs of the level.
+        :return: Generator of String.
+        """
+        while frontier:
+            yield frontier.popleft()
+
+    def _restore(self, ord_lst):
+        """ Loads the checkpointed state of an interrupted crawl.
+
+        Links that were found but not crawled yet, including pages that
+        failed last time, are returned by depth to be crawled again.
+
+        :param ord_lst: List - Crawled links, extended in place.
+        :return: Tuple (start, pending) - First depth level to crawl and
+            Dict of depth -> Deque of URLs due at it.
+        """
+        pending = defaultdict(deque)
+        for url, depth, done, title in self.state.pages():
+            ord_lst.append(url)
+            self.findings["links"].add(url)
+            self.seen.add(self._normalize_for_dedupe(url))
+            if done:
+                self.titles[url] = title
+                if self.page_cache is not None:
+                    self.page_cache.keep(url)
+            else:
+                pending[depth].append(url)
+
+        for from_url, to_url in self.state.edges():
+            self.edges.add((from_url, to_url))
+        for category, value, from_url in self.state.findings():
+            if category not in self.resources:
+                continue
+            self.findings[category].add(value)
+            self.resources[category].add(from_url, value)
+            # Already written to the findings files last time.
+            self.seen.add(f"{category}\t{self._normalize_for_dedupe(value)}")
+        for pattern, value in self.state.matches():
+            self.findings["matches"][pattern].add(value)
+
+        start = min(pending) if pending else int(self.c_depth)
+        return start, dict(pending)
 
     def _serialized_findings(self):
         """Return findings as JSON-serializable dict."""
         return {
             "start_url": self.website,
             "links": sorted(self.findings["links"]),
-            "external_links": sorted(self.findings["external_links"]),
-            "images": sorted(self.findings["images"]),
-            "scripts": sorted(self.findings["scripts"]),
-            "telephones": sorted(self.findings["telephones"]),
-            "emails": sorted(self.findings["emails"]),
-            "files": sorted(self.findings["files"]),
+            **{category: sorted(self.findings[category]) for category in self.categories},
+            "matches": {pattern: sorted(values)
+                        for pattern, values in self.findings["matches"].items()},
         }
 
     def _normalize_for_dedupe(self, url):
         """Normalize URL for deduplication: lower-case host, strip leading www."""
-        try:
-            parsed = urlparse(url)
-            netloc = parsed.netloc.lower()
-            netloc = netloc[4:] if netloc.startswith("www.") else netloc
-            normalized = parsed._replace(netloc=netloc).geturl()
-            return normalized
-        except ValueError:
-            return url.strip().lower()
+        return parse_url(url).normalized
 
     def _add_link(self, ver_link, source_url, lst):
         """Add link to collections with deduplication by normalized host."""
+        # Keep a single copy of the URL string however often it is found.
+        ver_link = self.urls.url(self.urls.intern(ver_link))
         norm = self._normalize_for_dedupe(ver_link)
-        if norm not in self.normalized_links:
-            self.normalized_links.add(norm)
-            lst.add(ver_link)
+        if self.seen.add(norm):
+            lst.append(ver_link)
             self.findings["links"].add(ver_link)
         # Always record edge relationships, even if link already known
         if source_url and ver_link:
             self.edges.add((source_url, ver_link))
+            if self.state is not None:
+                self.state.add_edge(source_url, ver_link)
 
     def _log_once(self, category, link, filepath):
         """Log to file only if normalized link not already written."""
         norm = self._normalize_for_dedupe(link)
-        if norm in self.logged.get(category, set()):
+        # Findings share the seen store with links, under their category.
+        if not self.seen.add(f"{category}\t{norm}"):
             return
-        self.logged.setdefault(category, set()).add(norm)
-        with open(filepath, 'a+', encoding='UTF-8') as lst_file:
-            lst_file.write(str(link) + '\n')
-
-    def _is_image_link(self, link):
-        """Best-effort image detection using URL path extension (ignoring query/fragment)."""
-        try:
-            parsed = urlparse(link)
-            path = parsed.path.lower()
-        except Exception:
-            path = str(link).lower()
-        base = path.split('?', 1)[0].split('#', 1)[0]
-        return any(base.endswith(ext) for ext in IMAGE_EXTS)
+        self.writer.write(filepath, str(link) + '\n')
 
     def export_payload(self):
         """Return data needed for downstream exporters/visualization."""
@@ -421,6 +692,5 @@ class Crawler:
             "data": self._serialized_findings(),
             "edges": set(self.edges),
             "titles": dict(self.titles),
-            "resources": {cat: {src: sorted(vals) for src, vals in sources.items()}
-                          for cat, sources in self.resources.items()},
+            "resources": {cat: index.export() for cat, index in self.resources.items()},
         }
@@ -3,6 +3,8 @@ import json
 import sqlite3
 import xml.etree.ElementTree as ET
 
+from modules.yararules import page_score
+
 
 def _build_xml_tree(data):
     root = ET.Element("crawl", start_url=data.get("start_url", ""))
@@ -21,6 +23,15 @@ def _build_xml_tree(data):
         for item in data.get(section, []):
             child = ET.SubElement(section_el, child_tag)
             child.text = item
+
+    # Categories configured in res/extensions.txt (e.g. archives).
+    for section, items in data.items():
+        if section in tag_map or not isinstance(items, list):
+            continue
+        section_el = ET.SubElement(root, section)
+        for item in items:
+            child = ET.SubElement(section_el, "item")
+            child.text = item
     return root
 
 
@@ -43,8 +54,18 @@ def export_xml(export_path, prefix, data, verbose=False):
     return xml_path
 
 
-def export_database(export_path, prefix, data, edges, titles, resources=None, verbose=False):
+def export_database(export_path, prefix, data, edges, titles, resources=None, verbose=False,
+                    pages=None, yara_matches=None):
+    """ Writes the crawl graph, resources, page metadata and YARA matches
+    to SQLite.
+
+    :param pages: Dict - URL -> {status, bytes, elapsed, fetched_at}.
+    :param yara_matches: Dict - URL -> List of match dicts (see
+        modules.yararules.match_details).
+    """
     db_path = os.path.join(export_path, f"{prefix}.db")
+    pages = pages or {}
+    yara_matches = yara_matches or {}
 
     nodes = set(data.get("links", []))
     nodes.update([edge[0] for edge in edges])
@@ -75,6 +96,33 @@ def export_database(export_path, prefix, data, edges, titles, resources=None, ve
             );
         """)
 
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                status INTEGER,
+                bytes INTEGER,
+                elapsed REAL,
+                fetched_at TEXT,
+                score INTEGER
+            );
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS yara_matches (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT,
+                rule TEXT,
+                namespace TEXT,
+                tags TEXT,
+                score INTEGER,
+                meta TEXT,
+                offsets TEXT
+            );
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_pages_score ON pages(score);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_pages_status ON pages(status);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_yara_matches_url ON yara_matches(url);")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_yara_matches_rule ON yara_matches(rule, score);")
+
         cur.executemany(
             "INSERT OR REPLACE INTO nodes(url, title) VALUES(?, ?);",
             [(url, titles.get(url)) for url in nodes]
@@ -97,6 +145,33 @@ def export_database(export_path, prefix, data, edges, titles, resources=None, ve
                 "INSERT OR IGNORE INTO resources(category, from_url, value) VALUES(?, ?, ?);",
                 res_rows
             )
+
+        # Pages: crawl metadata, plus the YARA score of the ones extracted.
+        page_rows = []
+        for url in set(pages) | set(yara_matches):
+            info = pages.get(url, {})
+            score = page_score(yara_matches[url]) if url in yara_matches else None
+            page_rows.append((url, info.get("status"), info.get("bytes"), info.get("elapsed"),
+                              info.get("fetched_at"), score))
+        cur.executemany(
+            "INSERT OR REPLACE INTO pages(url, status, bytes, elapsed, fetched_at, score) "
+            "VALUES(?, ?, ?, ?, ?, ?);",
+            page_rows
+        )
+
+        cur.execute("DELETE FROM yara_matches WHERE url IN (SELECT url FROM pages);")
+        match_rows = []
+        for url, matches in yara_matches.items():
+            for match in matches:
+                match_rows.append((url, match["rule"], match.get("namespace"),
+                                   ",".join(match.get("tags", [])), page_score([match]),
+                                   json.dumps(match.get("meta", {}), ensure_ascii=False),
+                                   json.dumps(match.get("strings", []))))
+        cur.executemany(
+            "INSERT INTO yara_matches(url, rule, namespace, tags, score, meta, offsets) "
+            "VALUES(?, ?, ?, ?, ?, ?, ?);",
+            match_rows
+        )
         conn.commit()
         if verbose:
             print(f"## SQLite results created at: {db_path}")
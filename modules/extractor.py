@@ -1,7 +1,7 @@
 #!/usr/bin/python
-import io
+import datetime
+import functools
 import os
-import importlib.resources as resources
 import urllib.error
 import urllib.parse
 import urllib.request
@@ -11,11 +11,17 @@ from http.client import InvalidURL
 from http.client import IncompleteRead
 from bs4 import BeautifulSoup
 from pathlib import Path
+from concurrent.futures import Future, ProcessPoolExecutor
 
 from modules.checker import url_canon
 from modules.checker import get_random_user_agent
-from modules.checker import get_random_proxy
-from modules.checker import setup_proxy_connection
+from modules.checker import get_proxy_transport
+from modules.pagestore import response_details
+from modules.pipeline import run_pipeline
+from modules.transport import open_url
+from modules.warc import DEFAULT_WARC_MAX_SIZE, WarcWriter
+from modules.yararules import configure_rules, configured_rules, get_rules, match_details
+from modules.yararules import page_score
 
 
 def text(response=None):
@@ -32,156 +38,314 @@ def text(response=None):
     return ' '.join(soup.stripped_strings)
 
 
-def _make_request_with_ua(url, random_ua=False, random_proxy=False, timeout=10):
+def _make_request_with_ua(url, random_ua=False, random_proxy=False, timeout=None,
+                          page_store=None):
     """ Makes an HTTP request with optional random user-agent and proxy.
     
     :param url: String - URL to request
     :param random_ua: Boolean - Whether to use random user-agent
     :param random_proxy: Boolean - Whether to use random proxy
-    :param timeout: Integer - Request timeout in seconds
+    :param timeout: Float - Request timeout in seconds (Default: the
+        configured --connect/--read/--total-timeout)
+    :param page_store: PageStore - Bodies already fetched by the crawler,
+        tried before the network.
     :return: bytes - Response content
     """
-    # Set up proxy if random proxy is enabled
-    if random_proxy:
-        proxy = get_random_proxy()
-        if proxy:
-            setup_proxy_connection(proxy)
-    
+    if page_store is not None:
+        content = page_store.get(url.strip())
+        if content is not None:
+            return content
+    return _open_with_ua(url, random_ua, random_proxy, timeout).read()
+
+
+def _open_with_ua(url, random_ua=False, random_proxy=False, timeout=None):
+    """ Opens a URL with optional random user-agent and proxy.
+
+    :return: Response
+    """
+    request = url
     # Set up user-agent if random UA is enabled
     if random_ua:
         user_agent = get_random_user_agent()
         if user_agent:
-            req = urllib.request.Request(url, headers={'User-Agent': user_agent})
-            return urllib.request.urlopen(req, timeout=timeout).read()
-    return urllib.request.urlopen(url, timeout=timeout).read()
+            request = urllib.request.Request(url, headers={'User-Agent': user_agent})
 
+    # Bind a proxy to this request only if random proxy is enabled
+    if random_proxy:
+        proxy_transport = get_proxy_transport()
+        if proxy_transport:
+            return open_url(request, timeout=timeout, transport=proxy_transport)
+    return open_url(request, timeout=timeout)
+
+
+def _fetch_record(url, random_ua=False, random_proxy=False, page_store=None):
+    """ Fetches a page along with what a WARC record needs to know about it.
+
+    :return: Tuple (content, response) - response is a Dict from
+        response_details(), or None for a page store hit whose response
+        wasn't kept.
+    """
+    if page_store is not None:
+        content, response = page_store.get_record(url.strip())
+        if content is not None:
+            return content, response
+    response = _open_with_ua(url, random_ua, random_proxy)
+    return response.read(), response_details(response, url)
 
-def check_yara(raw=None, yara=0):
-    """ Validates Yara Rule to categorize the site and check for keywords.
+
+def _scan_fetched(fetched, yara=0):
+    """ Scan stage of the extractor pipeline: matches a fetched page. """
+    return scan_page(fetched[0], yara)
+
+
+def scan_page(raw, yara=0):
+    """ Matches a page against the YARA rules.
+
+    A module-level function, so that it can run in a worker process.
 
     :param raw: HTTP Response body.
-    :param yara:  Integer: Keyword search argument.
-    :return matches: List of yara rule matches.
+    :param yara: Integer: Keyword search argument, 1 to match the text only.
+    :return: List of Dicts: Rule, namespace, tags, meta and string
+        offsets of every match.
     """
+    if yara == 1:
+        raw = text(response=raw).lower()
+    return [match_details(match) for match in get_rules().match(raw)]
 
-    try:
-        import yara as _yara
-    except OSError:
-        print("YARA module error: " + 
-              "Try this solution: https://stackoverflow.com/a/51504326")
 
-    try:
-        file_path = resources.files("res").joinpath("keywords.yar")
-    except (FileNotFoundError, ModuleNotFoundError):
-        file_path = os.path.join('res/keywords.yar')
+def check_yara(raw=None, yara=0):
+    """ Validates Yara Rule to categorize the site and check for keywords.
 
-    if raw is not None:
-        if yara == 1:
-            raw = text(response=raw).lower()
+    The rules (res/keywords.yar or --yara-rules) are compiled once per
+    process and only again when a rule file changes.
 
-        file = os.path.join(file_path)
-        rules = _yara.compile(str(file))
-        matches = rules.match(data=raw)
+    :param raw: HTTP Response body.
+    :param yara:  Integer: Keyword search argument.
+    :return matches: List of yara rule matches (see scan_page).
+    """
+    if raw is not None:
+        matches = scan_page(raw, yara)
         if len(matches) != 0:
             print("YARA: Found a match!")
         return matches
 
 
-def input_file_to_folder(input_file, output_path, yara=None, random_ua=False, random_proxy=False):
+def _is_hit(matches, min_score=None):
+    """ Whether a page's YARA matches count, given the --min-score threshold.
+
+    :param matches: List of Dicts: Matches returned by scan_page.
+    :param min_score: Integer: Lowest page_score() kept, None for any match.
+    :return: Boolean
+    """
+    return len(matches) != 0 and (min_score is None or page_score(matches) >= min_score)
+
+
+def _page_results(items, url_of, yara, random_ua, random_proxy, page_store,
+                  fetch_workers, scan_workers, ordered, record=False):
+    """ Fetches (and YARA-scans) every item on bounded worker pools.
+
+    Fetches run on threads. With more than one scan worker, scans run in
+    a pool of processes, so that YARA and the text stripping can use
+    every core while the fetch threads keep the network busy.
+
+    :param items: Iterable - Items to extract, e.g. lines of links.txt.
+    :param url_of: Callable(item) - URL to request for an item.
+    :param record: Boolean - Keep the response details for a WARC record.
+    :return: Generator of (item, Future) - The future holds (content,
+        matches, response), with matches None without YARA and response
+        None unless recorded (see _fetch_record), or the raised error.
+    """
+    def fetch(item):
+        if record:
+            return _fetch_record(url_of(item), random_ua, random_proxy, page_store)
+        return _make_request_with_ua(url_of(item), random_ua, random_proxy,
+                                     page_store=page_store), None
+
+    scan = functools.partial(_scan_fetched, yara=yara) if yara is not None else None
+    executor = None
+    if scan is not None and scan_workers > 1:
+        executor = ProcessPoolExecutor(max_workers=scan_workers, initializer=configure_rules,
+                                       initargs=(configured_rules(),))
+    try:
+        for item, future in run_pipeline(items, fetch, scan, fetch_workers=fetch_workers,
+                                         scan_workers=scan_workers, ordered=ordered,
+                                         scan_executor=executor):
+            if future.exception() is None:
+                future = _page_outcome(future.result(), scan is not None)
+            yield item, future
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+def _page_outcome(result, scanned):
+    """ Returns a done future holding (content, matches, response). """
+    (content, response), matches = result if scanned else (result, None)
+    future = Future()
+    future.set_result((content, matches, response))
+    return future
+
+
+def input_file_to_folder(input_file, output_path, yara=None, random_ua=False, random_proxy=False,
+                         page_store=None, fetch_workers=1, scan_workers=1, ordered=True,
+                         min_score=None, warc=False, warc_max_size=DEFAULT_WARC_MAX_SIZE):
     """ Ingests the crawled links from the input_file,
     scrapes the contents of the resulting web pages and writes the contents to
     the into out_path/{url_address}.
 
+    Pages are fetched and scanned by bounded worker pools while the input
+    file is read line by line; files are written from this thread only.
+    With `warc` the pages are appended to out_path/<date>_pages-NNNNN.warc.gz
+    instead, indexed by URL in out_path/<date>_pages.cdx.
+
     :param input_file: String: Filename of the crawled Urls.
     :param output_path: String: Pathname of results.
     :param yara: Integer: Keyword search argument.
     :param random_ua: Boolean: Whether to use random user-agent rotation.
     :param random_proxy: Boolean: Whether to use random proxy rotation.
-    :return: None
+    :param page_store: PageStore: Pages fetched by the crawler, read first.
+    :param fetch_workers: Integer: Pages downloaded concurrently.
+    :param scan_workers: Integer: Pages YARA-scanned concurrently.
+    :param ordered: Boolean: Write pages in input order rather than as they finish.
+    :param min_score: Integer: Only write pages whose YARA score reaches it.
+    :param warc: Boolean: Write the pages to rotating WARC files.
+    :param warc_max_size: Integer: Bytes after which a new WARC file is started.
+    :return: Dict: URL -> YARA matches of every page written with -y.
     """
     i = 0
-    file = io.TextIOWrapper
+    yara_results = {}
     try:
         file = open(input_file, 'r')
     except IOError as err:
         print(f"Error: {err}\n## Can't open: {input_file}")
+        return yara_results
+
+    warc_writer = None
+    if warc:
+        prefix = f"{datetime.datetime.now().strftime('%y%m%d')}_pages"
+        warc_writer = WarcWriter(output_path, prefix, warc_max_size)
+        output_file = prefix
+
+    with file:
+        results = _page_results(file, str, yara, random_ua, random_proxy, page_store,
+                                fetch_workers, scan_workers, ordered, record=warc)
+        for line, result in results:
+
+            # Generate the name for every file.
+            try:
+                if warc_writer is None:
+                    page_name = line.rsplit('/', 1)
+                    cl_page_name = str(page_name[1])
+                    cl_page_name = cl_page_name[:-1]
+                    if len(cl_page_name) == 0:
+                        output_file = "index.htm"
+                    else:
+                        output_file = cl_page_name
+            except IndexError as error:
+                print(f"Error: {error}")
+                continue
+
+            # Extract page to file.
+            try:
+                content, full_match_keywords, response = result.result()
 
-    for line in file:
-
-        # Generate the name for every file.
-        try:
-            page_name = line.rsplit('/', 1)
-            cl_page_name = str(page_name[1])
-            cl_page_name = cl_page_name[:-1]
-            if len(cl_page_name) == 0:
-                output_file = "index.htm"
-            else:
-                output_file = cl_page_name
-        except IndexError as error:
-            print(f"Error: {error}")
-            continue
-
-        # Extract page to file.
-        try:
-            content = _make_request_with_ua(line, random_ua, random_proxy, timeout=10)
-
-            if yara is not None:
-                full_match_keywords = check_yara(content, yara)
-                if len(full_match_keywords) == 0:
-                    print('No matches found.')
+                if yara is not None:
+                    if not _is_hit(full_match_keywords, min_score):
+                        print('No matches found.')
+                        continue
+                    print("YARA: Found a match!")
+                    yara_results[line.strip()] = full_match_keywords
+
+                if warc_writer is not None:
+                    _write_warc(warc_writer, line.strip(), content, response)
                     continue
 
-            # Add an incremental in case of existing filename (eg. index.htm)
-            filename = Path(output_path + "/" + output_file)
-            if filename.is_file():
-                i += 1
-                filename = output_path + "/" + output_file + "(" + str(i) + ")"
-            with open(filename, 'wb') as results:
-                results.write(content)
-            print(f"# File created on: {os.getcwd()}/{filename}")
-        except HTTPError as e:
-            print(f"Error: {e.code}, cannot access: {e.url}")
-            continue
-        except InvalidURL:
-            print(f"Invalid URL: {line}, \n Skipping...")
-            continue
-        except IncompleteRead:
-            print(f"IncompleteRead on {line}")
-            continue
-        except IOError as err:
-            print(f"Error: {err}\nCan't write on file: {output_file}")
-    file.close()
-
-
-def input_file_to_terminal(input_file, yara, random_ua=False, random_proxy=False):
+                # Add an incremental in case of existing filename (eg. index.htm)
+                filename = Path(output_path + "/" + output_file)
+                if filename.is_file():
+                    i += 1
+                    filename = output_path + "/" + output_file + "(" + str(i) + ")"
+                with open(filename, 'wb') as results_file:
+                    results_file.write(content)
+                print(f"# File created on: {os.getcwd()}/{filename}")
+            except HTTPError as e:
+                print(f"Error: {e.code}, cannot access: {e.url}")
+                continue
+            except InvalidURL:
+                print(f"Invalid URL: {line}, \n Skipping...")
+                continue
+            except IncompleteRead:
+                print(f"IncompleteRead on {line}")
+                continue
+            except IOError as err:
+                print(f"Error: {err}\nCan't write on file: {output_file}")
+    if warc_writer is not None:
+        warc_writer.close()
+        print(f"## WARC index created on: {os.getcwd()}/{warc_writer.cdx_path}")
+    return yara_results
+
+
+def _write_warc(warc_writer, url, content, response):
+    """ Appends a page to the WARC files.
+
+    :param warc_writer: WarcWriter: Where to write.
+    :param url: String: URL from the input file.
+    :param content: Bytes: Page body.
+    :param response: Dict: Response details, None for a page store hit.
+    :return: None
+    """
+    if response is None:
+        name = warc_writer.write_resource(url, content)
+    else:
+        name = warc_writer.write_response(response["url"], response["status"],
+                                          response["reason"], response["headers"],
+                                          content, response["request_headers"])
+    print(f"# WARC record of {url} in: {os.getcwd()}/{warc_writer.directory}/{name}")
+
+
+def input_file_to_terminal(input_file, yara, random_ua=False, random_proxy=False,
+                           page_store=None, fetch_workers=1, scan_workers=1, ordered=True,
+                           min_score=None):
     """ Input links from file and extract them into terminal.
 
     :param input_file: String: File name of links file.
     :param yara: Integer: Keyword search argument.
     :param random_ua: Boolean: Whether to use random user-agent rotation.
     :param random_proxy: Boolean: Whether to use random proxy rotation.
-    :return: None
+    :param page_store: PageStore: Pages fetched by the crawler, read first.
+    :param fetch_workers: Integer: Pages downloaded concurrently.
+    :param scan_workers: Integer: Pages YARA-scanned concurrently.
+    :param ordered: Boolean: Print pages in input order rather than as they finish.
+    :param min_score: Integer: Lowest YARA score that counts as a match.
+    :return: Dict: URL -> YARA matches of every matching page with -y.
     """
+    yara_results = {}
     try:
         with open(input_file, 'r') as file:
-            for line in file:
-                website = url_canon(line, 0)
+            websites = ((line, url_canon(line, 0)) for line in file)
+            results = _page_results(websites, lambda item: item[1], yara, random_ua,
+                                    random_proxy, page_store, fetch_workers, scan_workers,
+                                    ordered)
+            for (line, website), result in results:
                 try:
-                    content = _make_request_with_ua(website, random_ua, random_proxy)
+                    content, full_match_keywords, _ = result.result()
                 except (HTTPError, URLError, InvalidURL) as err:
                     print(f"## ERROR: {err}. URL: " + website)
                     continue
                 if yara is not None:
-                    full_match_keywords = check_yara(raw=content, yara=yara)
-
-                    if len(full_match_keywords) == 0:
+                    if not _is_hit(full_match_keywords, min_score):
                         print(f"No matches in: {line}")
+                    else:
+                        print("YARA: Found a match!")
+                        yara_results[website] = full_match_keywords
                 print(content)
     except IOError as err:
         print(f"ERROR: {err}\n## Not valid file. File tried: " + input_file)
+    return yara_results
 
 
-def url_to_folder(website, output_file, output_path, yara, random_ua=False, random_proxy=False):
+def url_to_folder(website, output_file, output_path, yara, random_ua=False, random_proxy=False,
+                  min_score=None):
     """ Scrapes the contents of the provided web address and outputs the
     contents to file.
 
@@ -191,8 +355,10 @@ def url_to_folder(website, output_file, output_path, yara, random_ua=False, rand
     :param yara: Integer: Keyword search argument.
     :param random_ua: Boolean: Whether to use random user-agent rotation.
     :param random_proxy: Boolean: Whether to use random proxy rotation.
-    :return: None
+    :param min_score: Integer: Only write the page if its YARA score reaches it.
+    :return: Dict: URL -> YARA matches, if the page matched.
     """
+    yara_results = {}
     # Extract page to file
     try:
         output_file = output_path + "/" + output_file
@@ -201,8 +367,12 @@ def url_to_folder(website, output_file, output_path, yara, random_ua=False, rand
         if yara is not None:
             full_match_keywords = check_yara(raw=content, yara=yara)
 
-            if len(full_match_keywords) == 0:
+            if not _is_hit(full_match_keywords, min_score):
                 print(f"No matches in: {website}")
+                if min_score is not None:
+                    return yara_results
+            else:
+                yara_results[website] = full_match_keywords
 
         with open(output_file, 'wb') as file:
             file.write(content)
@@ -211,34 +381,39 @@ def url_to_folder(website, output_file, output_path, yara, random_ua=False, rand
         print(f"HTTPError: {err}")
     except IOError as err:
         print(f"Error: {err}\n Can't write on file: {output_file}")
+    return yara_results
 
 
-def url_to_terminal(website, yara, random_ua=False, random_proxy=False):
+def url_to_terminal(website, yara, random_ua=False, random_proxy=False, min_score=None):
     """ Scrapes provided web address and prints the results to the terminal.
 
     :param website: String: URL of website to scrape.
     :param yara: Integer: Keyword search argument.
     :param random_ua: Boolean: Whether to use random user-agent rotation.
     :param random_proxy: Boolean: Whether to use random proxy rotation.
-    :return: None
+    :param min_score: Integer: Lowest YARA score that counts as a match.
+    :return: Dict: URL -> YARA matches, if the page matched.
     """
     try:
         content = _make_request_with_ua(website, random_ua, random_proxy)
         if yara is not None:
             full_match_keywords = check_yara(content, yara)
 
-            if len(full_match_keywords) == 0:
+            if not _is_hit(full_match_keywords, min_score):
                 # No match.
                 print(f"No matches in: {website}")
-                return
+                return {}
 
         print(content)
     except (HTTPError, URLError, InvalidURL) as err:
         print(f"Error: ({err}) {website}")
-        return
+        return {}
+    return {website: full_match_keywords} if yara is not None else {}
 
 
-def extractor(website, crawl, output_file, input_file, output_path, selection_yara, random_ua=False, random_proxy=False):
+def extractor(website, crawl, output_file, input_file, output_path, selection_yara, random_ua=False, random_proxy=False,
+              page_store=None, fetch_workers=1, scan_workers=1, ordered=True, min_score=None,
+              warc=False, warc_max_size=DEFAULT_WARC_MAX_SIZE):
     """ Extractor - scrapes the resulting website or discovered links.
 
     :param website: String: URL of website to scrape.
@@ -250,18 +425,36 @@ def extractor(website, crawl, output_file, input_file, output_path, selection_ya
     :param selection_yara: String: Selected option of HTML or Text.
     :param random_ua: Boolean: Whether to use random user-agent rotation.
     :param random_proxy: Boolean: Whether to use random proxy rotation.
-    :return: None
+    :param page_store: PageStore: Pages fetched by the crawler, read before
+        going to the network.
+    :param fetch_workers: Integer: Pages of input_file downloaded concurrently.
+    :param scan_workers: Integer: Pages of input_file YARA-scanned concurrently.
+    :param ordered: Boolean: Output pages of input_file in input order.
+    :param min_score: Integer: Lowest YARA score (sum of the matched rules'
+        `score` meta) a page needs to count as a match.
+    :param warc: Boolean: Write the pages of input_file to WARC files.
+    :param warc_max_size: Integer: Bytes after which a new WARC file is started.
+    :return: Dict: URL -> YARA matches of the matching pages.
     """
     if len(input_file) > 0:
         if crawl:
-            input_file_to_folder(input_file, output_path, selection_yara, random_ua, random_proxy)
+            return input_file_to_folder(input_file, output_path, selection_yara, random_ua,
+                                        random_proxy, page_store=page_store,
+                                        fetch_workers=fetch_workers, scan_workers=scan_workers,
+                                        ordered=ordered, min_score=min_score, warc=warc,
+                                        warc_max_size=warc_max_size)
         # TODO: Extract from list into a folder
         # elif len(output_file) > 0:
         # 	input_list_to_folder(website, input_ile, output_file)
         else:
-            input_file_to_terminal(input_file, selection_yara, random_ua, random_proxy)
+            return input_file_to_terminal(input_file, selection_yara, random_ua, random_proxy,
+                                          page_store=page_store, fetch_workers=fetch_workers,
+                                          scan_workers=scan_workers, ordered=ordered,
+                                          min_score=min_score)
     else:
         if len(output_file) > 0:
-            url_to_folder(website, output_file, output_path, selection_yara, random_ua, random_proxy)
+            return url_to_folder(website, output_file, output_path, selection_yara, random_ua,
+                                 random_proxy, min_score=min_score)
         else:
-            url_to_terminal(website, selection_yara, random_ua, random_proxy)
+            return url_to_terminal(website, selection_yara, random_ua, random_proxy,
+                                   min_score=min_score)
@@ -0,0 +1,162 @@
+#!/usr/bin/python
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import zlib
+
+CACHE_FILE = 'incremental.db'
+
+
+def content_hash(html_content):
+    """ Hash identifying a page body.
+
+    :param html_content: String - Decoded page body.
+    :return: String - Hex SHA-256 digest.
+    """
+    return hashlib.sha256(html_content.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+class PageCache:
+    """ What earlier crawls learned about every page, for incremental re-crawls.
+
+    Per URL it keeps the ETag and Last-Modified validators, a hash of
+    the body and what was extracted from it (title, links and pattern
+    matches). A re-crawl sends conditional requests with the validators,
+    and pages that come back 304 or with the same hash reuse the stored
+    extraction instead of being parsed again.
+    """
+
+    def __init__(self, path, batch_size=100):
+        """
+        :param path: String - Database file, created if missing.
+        :param batch_size: Integer - Stored pages per commit.
+        """
+        self.path = path
+        self.batch_size = max(1, int(batch_size))
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                extracted BLOB
+            );
+        """)
+        self._conn.commit()
+        self._previous = {row[0] for row in self._conn.execute("SELECT url FROM pages;")}
+        self.new = []
+        self.changed = []
+        self.unchanged = []
+
+    def conditional_headers(self, url):
+        """ Request headers that let the server answer 304 Not Modified.
+
+        :param url: String - URL about to be requested.
+        :return: Dict - If-None-Match / If-Modified-Since, if known.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT etag, last_modified FROM pages WHERE url = ?;",
+                                     (url,)).fetchone()
+        headers = {}
+        if row is not None:
+            if row[0]:
+                headers['If-None-Match'] = row[0]
+            if row[1]:
+                headers['If-Modified-Since'] = row[1]
+        return headers
+
+    def lookup(self, url):
+        """ Returns (content_hash, extracted) stored for a URL, or None. """
+        with self._lock:
+            row = self._conn.execute("SELECT content_hash, extracted FROM pages WHERE url = ?;",
+                                     (url,)).fetchone()
+        if row is None or row[1] is None:
+            return None
+        return row[0], json.loads(zlib.decompress(row[1]).decode('utf-8'))
+
+    def unchanged_page(self, url, headers=None):
+        """ Records that a page hasn't changed since the last crawl.
+
+        :param url: String - URL of the page.
+        :param headers: HTTPMessage - Response headers with fresh validators.
+        :return: None
+        """
+        self.unchanged.append(url)
+        if headers is not None:
+            etag, last_modified = headers.get('ETag'), headers.get('Last-Modified')
+            if etag or last_modified:
+                with self._lock:
+                    self._conn.execute("UPDATE pages SET etag = COALESCE(?, etag), "
+                                       "last_modified = COALESCE(?, last_modified) "
+                                       "WHERE url = ?;", (etag, last_modified, url))
+
+    def store(self, url, headers, digest, extracted):
+        """ Records a page that is new or changed since the last crawl.
+
+        :param url: String - URL of the page.
+        :param headers: HTTPMessage - Response headers (validators).
+        :param digest: String - content_hash() of the body.
+        :param extracted: Dict - Title, links and matches found in the page.
+        :return: None
+        """
+        (self.changed if url in self._previous else self.new).append(url)
+        headers = headers if headers is not None else {}
+        blob = zlib.compress(json.dumps(extracted, ensure_ascii=False).encode('utf-8'))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages(url, etag, last_modified, content_hash, extracted) "
+                "VALUES(?, ?, ?, ?, ?);",
+                (url, headers.get('ETag'), headers.get('Last-Modified'), digest, blob))
+            self._pending += 1
+            if self._pending >= self.batch_size:
+                self._conn.commit()
+                self._pending = 0
+
+    def keep(self, url):
+        """ Keeps a page crawled earlier in this run (e.g. before a resume). """
+        self.unchanged.append(url)
+
+    def finish(self, discovered=None):
+        """ Forgets pages this crawl didn't reach and reports the changes.
+
+        Pages that were found but couldn't be fetched keep what was stored
+        for them and are reported as failed rather than removed.
+
+        :param discovered: Iterable - Every URL found this crawl
+            (Default: only the pages that were fetched).
+        :return: Dict - Lists of new, changed, removed and failed URLs and
+            the number of unchanged pages.
+        """
+        seen = set(self.new) | set(self.changed) | set(self.unchanged)
+        found = seen.union(discovered) if discovered is not None else seen
+        removed = sorted(self._previous - found)
+        failed = sorted((self._previous & found) - seen)
+        with self._lock:
+            self._conn.executemany("DELETE FROM pages WHERE url = ?;", [(url,) for url in removed])
+            self._conn.commit()
+        self._previous = seen | set(failed)
+        return {
+            "new": sorted(self.new),
+            "changed": sorted(self.changed),
+            "removed": removed,
+            "failed": failed,
+            "unchanged": len(self.unchanged),
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+
+
+def open_page_cache(out_path):
+    """ Opens the page cache kept in the output folder. """
+    return PageCache(os.path.join(out_path, CACHE_FILE))
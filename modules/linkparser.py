@@ -0,0 +1,98 @@
+#!/usr/bin/python
+from bs4 import BeautifulSoup
+from lxml import etree
+
+PARSERS = ('lxml', 'html.parser')
+DEFAULT_PARSER = 'lxml'
+
+# Tags whose attributes point to other resources, in the order they are read.
+LINK_ATTRIBUTES = {
+    'a': ('href',),
+    'area': ('href',),
+    'frame': ('src',),
+    'iframe': ('src',),
+    'img': ('src',),
+    'script': ('src',),
+}
+
+
+class _LinkTarget:
+    """ lxml parser target collecting the title and link attributes.
+
+    lxml calls back into the target while it parses, so the page is
+    never built into a tree and is walked only once.
+    """
+
+    def __init__(self):
+        self.links = []
+        self.title = None
+        self._title = None
+
+    def start(self, tag, attrib):
+        attributes = LINK_ATTRIBUTES.get(tag)
+        if attributes is not None:
+            for name in attributes:
+                value = attrib.get(name)
+                if value is not None:
+                    self.links.append(value)
+        elif tag == 'title' and self.title is None and self._title is None:
+            self._title = []
+
+    def data(self, data):
+        if self._title is not None:
+            self._title.append(data)
+
+    def end(self, tag):
+        if tag == 'title' and self._title is not None:
+            self.title = ''.join(self._title).strip() or None
+            self._title = None
+
+    def close(self):
+        return self.title, self.links
+
+
+def parse_lxml(html_content):
+    """ Extracts the title and links of a page in one pass with lxml.
+
+    Besides <a> and <area> targets, the sources of frames, images and
+    scripts are returned too, so that they are classified as well.
+
+    :param html_content: String - Decoded page body.
+    :return: Tuple (title, links) - String or None, List of Strings.
+    """
+    target = _LinkTarget()
+    parser = etree.HTMLParser(target=target, recover=True)
+    try:
+        parser.feed(html_content)
+        return parser.close()
+    except etree.LxmlError:
+        return target.title, target.links
+
+
+def parse_soup(html_content):
+    """ Extracts the title and <a>/<area> links of a page with BeautifulSoup.
+
+    :param html_content: String - Decoded page body.
+    :return: Tuple (title, links) - String or None, List of Strings.
+    """
+    soup = BeautifulSoup(html_content, features="html.parser")
+
+    page_title = None
+    if soup.title and soup.title.string:
+        page_title = soup.title.string.strip()
+
+    links = [tag.get('href') for name in ('a', 'area') for tag in soup.find_all(name)]
+    return page_title, links
+
+
+def get_parser(name):
+    """ Returns the link extractor of the given backend.
+
+    :param name: String - One of PARSERS.
+    :return: Function - Takes the page body, returns (title, links).
+    """
+    if name == 'html.parser':
+        return parse_soup
+    if name == 'lxml':
+        return parse_lxml
+    raise ValueError(f"Unknown parser '{name}', expected one of: {', '.join(PARSERS)}")
@@ -0,0 +1,153 @@
+#!/usr/bin/python
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+INDEX_FILE = 'index.db'
+
+
+class PageStore:
+    """ Page bodies fetched by the crawler, for the extractor to reuse.
+
+    Bodies are stored once per content, zlib-compressed, under
+    `objects/<first two hex digits>/<sha256>`; an SQLite index maps every
+    URL to the digest of its last fetched body, when it was fetched and
+    the response it came with (see response_details()), so the extractor
+    can archive it as it was served. Pages shared by many URLs (error
+    pages, mirrors) take space only once.
+    """
+
+    def __init__(self, path, since=None, level=6):
+        """
+        :param path: String - Folder of the store, created if missing.
+        :param since: Float - Epoch time; bodies fetched before it are
+            treated as missing, so an old store never serves stale pages.
+        :param level: Integer - zlib compression level.
+        """
+        self.path = path
+        self.since = since
+        self.level = level
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.join(path, 'objects'), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(path, INDEX_FILE), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                digest TEXT,
+                fetched REAL,
+                response TEXT
+            );
+        """)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(pages);")]
+        if 'response' not in columns:
+            # Stores written before responses were kept.
+            self._conn.execute("ALTER TABLE pages ADD COLUMN response TEXT;")
+        self._conn.commit()
+
+    def _object_path(self, digest):
+        return os.path.join(self.path, 'objects', digest[:2], digest)
+
+    def put(self, url, body, response=None):
+        """ Stores the body fetched for a URL.
+
+        :param url: String - URL the body was fetched from.
+        :param body: Bytes - Raw page body.
+        :param response: Dict - Response the body came with, from
+            response_details().
+        :return: String - Hex SHA-256 digest of the body.
+        """
+        digest = hashlib.sha256(body).hexdigest()
+        object_path = self._object_path(digest)
+        if not os.path.exists(object_path):
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            # Written under a temporary name, so readers never see half a body.
+            temp_path = f"{object_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as object_file:
+                object_file.write(zlib.compress(body, self.level))
+            os.replace(temp_path, object_path)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO pages(url, digest, fetched, response) "
+                               "VALUES(?, ?, ?, ?);",
+                               (url, digest, time.time(),
+                                json.dumps(response) if response is not None else None))
+            self._conn.commit()
+        return digest
+
+    def touch(self, url):
+        """ Marks the stored body of a URL as current, e.g. after a 304.
+        The response stored with the body is kept, as it still describes it.
+
+        :param url: String - URL confirmed to be unchanged.
+        :return: Boolean - True if a body was stored for the URL.
+        """
+        with self._lock:
+            cursor = self._conn.execute("UPDATE pages SET fetched = ? WHERE url = ?;",
+                                        (time.time(), url))
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def get(self, url):
+        """ Returns the stored body of a URL.
+
+        :param url: String - URL to look up.
+        :return: Bytes or None if the URL is missing or stale.
+        """
+        return self.get_record(url)[0]
+
+    def get_record(self, url):
+        """ Returns the stored body of a URL and the response it came with.
+
+        :param url: String - URL to look up.
+        :return: Tuple (body, response) - Bytes and Dict, (None, None) if
+            the URL is missing or stale; response is None if it wasn't kept.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT digest, fetched, response FROM pages "
+                                     "WHERE url = ?;", (url,)).fetchone()
+        body = None
+        response = None
+        if row is not None and (self.since is None or row[1] >= self.since):
+            try:
+                with open(self._object_path(row[0]), 'rb') as object_file:
+                    body = zlib.decompress(object_file.read())
+            except (OSError, zlib.error):
+                body = None
+        if body is not None and row[2]:
+            response = json.loads(row[2])
+        with self._lock:
+            if body is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return body, response
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def response_details(response, url):
+    """ What a WARC record needs to know about a response, as plain data.
+
+    :param response: Response - As returned by open_url().
+    :param url: String - URL that was requested.
+    :return: Dict - Final URL, status, reason, (name, value) headers and
+        the headers the request was sent with.
+    """
+    headers = getattr(response, 'headers', None)
+    return {
+        "url": getattr(response, 'url', None) or url.strip(),
+        "status": getattr(response, 'status', 200),
+        "reason": getattr(response, 'reason', 'OK'),
+        "headers": [list(header) for header in headers.items()] if headers is not None else [],
+        "request_headers": dict(getattr(response, 'request_headers', None) or {}),
+    }
@@ -0,0 +1,104 @@
+#!/usr/bin/python
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+
+_UNPAIRED = object()
+
+
+def _chain(source, target, fetched=_UNPAIRED):
+    """ Copies the outcome of a finished future into another one, paired
+    with the fetched value if the future is a scan. """
+    try:
+        result = source.result()
+    except BaseException as err:
+        target.set_exception(err)
+        return
+    target.set_result(result if fetched is _UNPAIRED else (fetched, result))
+
+
+def run_pipeline(items, fetch, scan=None, fetch_workers=1, scan_workers=1,
+                 ordered=True, max_pending=None, scan_executor=None):
+    """ Fetches and scans items on two bounded worker pools.
+
+    Items are pulled from `items` lazily and at most `max_pending` of them
+    are in flight at once, so a long input file is streamed rather than
+    read up front, and fetching never runs far ahead of the consumer.
+    A fetched item is handed to the scan pool as soon as it is ready;
+    slow scans don't hold fetch workers and vice versa.
+
+    :param items: Iterable - Items to process (e.g. lines of links.txt).
+    :param fetch: Callable(item) - First stage, e.g. a download.
+    :param scan: Callable(fetched) - Optional second stage.
+    :param fetch_workers: Integer - Concurrent fetches.
+    :param scan_workers: Integer - Concurrent scans.
+    :param ordered: Boolean - Yield in input order rather than as done.
+    :param max_pending: Integer - Items in flight (Default: twice the
+        number of workers).
+    :param scan_executor: Executor - Runs the scans instead of a thread
+        pool, e.g. a ProcessPoolExecutor for CPU-bound scans; owned by
+        the caller. `scan` and the fetched values must then be picklable.
+    :return: Generator of (item, Future) - The future is done and holds
+        the fetched value, or (fetched, scanned) with a scan stage, or
+        the exception a stage raised.
+    """
+    fetch_workers = max(1, int(fetch_workers or 1))
+    scan_workers = max(1, int(scan_workers or 1))
+    if max_pending is None:
+        max_pending = 2 * (fetch_workers + (scan_workers if scan else 0))
+    max_pending = max(1, int(max_pending))
+
+    fetch_pool = ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix="torcrawl-fetch")
+    own_scan_pool = scan is not None and scan_executor is None
+    scan_pool = scan_executor
+    if own_scan_pool:
+        scan_pool = ThreadPoolExecutor(max_workers=scan_workers, thread_name_prefix="torcrawl-scan")
+
+    def submit(item):
+        result = Future()
+
+        def fetched(fetch_future):
+            if (scan is None or fetch_future.cancelled()
+                    or fetch_future.exception() is not None):
+                _chain(fetch_future, result)
+                return
+            fetched = fetch_future.result()
+            try:
+                scan_future = scan_pool.submit(scan, fetched)
+            except RuntimeError as err:
+                # The pipeline was closed while this item was being fetched.
+                result.set_exception(err)
+                return
+            scan_future.add_done_callback(lambda done: _chain(done, result, fetched))
+
+        fetch_pool.submit(fetch, item).add_done_callback(fetched)
+        return result
+
+    pending = deque()
+    try:
+        for item in items:
+            pending.append((item, submit(item)))
+            # Backpressure: don't pull the next item until one is out.
+            if len(pending) >= max_pending:
+                yield _next_done(pending, ordered)
+        while pending:
+            yield _next_done(pending, ordered)
+    finally:
+        # Fetch callbacks submit to the scan pool, so it goes second.
+        fetch_pool.shutdown(wait=True, cancel_futures=True)
+        if own_scan_pool:
+            scan_pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _next_done(pending, ordered):
+    """ Removes and returns the next (item, future) to hand out. """
+    if ordered:
+        item, future = pending.popleft()
+        wait([future])
+        return item, future
+
+    done, _ = wait([future for _, future in pending], return_when=FIRST_COMPLETED)
+    index = next(index for index, (_, future) in enumerate(pending) if future in done)
+    item, future = pending[index]
+    del pending[index]
+    return item, future
@@ -0,0 +1,171 @@
+#!/usr/bin/python
+import re
+
+try:
+    from re import _constants as sre_constants
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+# Numbered/named back-references can't survive being merged with other
+# patterns, since the group numbers shift.
+_BACKREFERENCE = re.compile(r'\\[1-9]|\(\?P=|\(\?\(')
+_UNSEARCHED = object()
+
+
+def _required_literals(items):
+    """ Finds literals of which every match of a parsed pattern contains one.
+
+    :param items: List - Output of sre_parse for (part of) a pattern.
+    :return: Set of Strings, or None if no such literal is known.
+    """
+    best = None
+
+    def consider(candidate):
+        nonlocal best
+        if candidate and all(candidate) and (
+                best is None or min(map(len, candidate)) > min(map(len, best))):
+            best = candidate
+
+    run = []
+    for op, value in items:
+        if op is sre_constants.LITERAL:
+            run.append(chr(value))
+            continue
+        consider({''.join(run)})
+        run = []
+        if op is sre_constants.SUBPATTERN:
+            consider(_required_literals(value[-1]))
+        elif op is sre_constants.BRANCH:
+            branches = [_required_literals(branch) for branch in value[1]]
+            if all(branches):
+                consider(set().union(*branches))
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and value[0] >= 1:
+            consider(_required_literals(value[2]))
+    consider({''.join(run)})
+    return best
+
+
+class PatternScanner:
+    """ Matches many regex patterns against a text in a single pass.
+
+    The patterns are merged into one alternation with a named group per
+    pattern, so every page is scanned once however many patterns there
+    are. The alternation reports one pattern per span of text, so each
+    span it matched is re-checked for the other patterns (e.g. an onion
+    address inside a URL), finding what scanning per pattern would.
+    Patterns that can't be merged (back-references) are scanned on their own.
+
+    Before scanning, a text is checked for the literal substrings that
+    every match requires; texts that contain none of them are skipped.
+    """
+
+    def __init__(self, patterns, flags=re.IGNORECASE):
+        """
+        :param patterns: List - Regex pattern strings, already validated.
+        :param flags: Integer - Flags the patterns are compiled with.
+        """
+        self.patterns = list(patterns)
+        self.flags = flags
+        self._names = {}
+        self._merged = []
+        self._separate = []
+        merged = []
+        for index, pattern in enumerate(self.patterns):
+            name = f"p{index}"
+            if not _BACKREFERENCE.search(pattern):
+                try:
+                    re.compile(f"(?P<{name}>{pattern})", flags)
+                except re.error:
+                    pass
+                else:
+                    self._names[name] = pattern
+                    self._merged.append((name, re.compile(pattern, flags)))
+                    merged.append(f"(?P<{name}>{pattern})")
+                    continue
+            self._separate.append((pattern, re.compile(pattern, flags)))
+        self._combined = re.compile('|'.join(merged), flags) if merged else None
+        self._literals = self._prefilter()
+
+    def _prefilter(self):
+        """ Collects the literals a text must contain for any pattern to match.
+
+        :return: Tuple of Strings, or None if some pattern has no literal.
+        """
+        literals = set()
+        for pattern in self.patterns:
+            try:
+                required = _required_literals(sre_parse.parse(pattern, self.flags))
+            except Exception:
+                required = None
+            if not required:
+                return None
+            literals.update(required)
+        if self.flags & re.IGNORECASE:
+            literals = {literal.lower() for literal in literals}
+        return tuple(literals)
+
+    def may_match(self, text):
+        """ Cheap check whether any pattern could match the text.
+
+        :param text: String - Text to check.
+        :return: Boolean - False only if no pattern can match.
+        """
+        if self._literals is None:
+            return True
+        if self.flags & re.IGNORECASE:
+            text = text.lower()
+        return any(literal in text for literal in self._literals)
+
+    def scan(self, text):
+        """ Finds every match of every pattern.
+
+        :param text: String - Text to scan.
+        :return: Generator of (pattern, match) - Pattern string and matched text.
+        """
+        if not self.patterns or not self.may_match(text):
+            return
+        if self._combined is not None:
+            yield from self._scan_merged(text)
+        for pattern, compiled in self._separate:
+            for match in compiled.finditer(text):
+                if match.group():
+                    yield pattern, match.group()
+
+    def _scan_merged(self, text):
+        """ Runs the alternation, re-checking every matched span for the
+        patterns that lost it.
+
+        :param text: String - Text to scan.
+        :return: Generator of (pattern, match).
+        """
+        # Where each pattern's last reported match ended, so no pattern
+        # reports overlapping matches of its own.
+        resume = {}
+        # Next match of each pattern, as last searched for. Searching moves
+        # forward only, so each pattern is searched for across the text at
+        # most once however many spans are re-checked.
+        upcoming = {}
+        for match in self._combined.finditer(text):
+            if not match.group():
+                continue
+            start, end = match.span()
+            if start >= resume.get(match.lastgroup, 0):
+                resume[match.lastgroup] = end
+                yield self._names[match.lastgroup], match.group()
+            for name, compiled in self._merged:
+                if name == match.lastgroup:
+                    continue
+                while True:
+                    position = max(start, resume.get(name, 0))
+                    found = upcoming.get(name, _UNSEARCHED)
+                    if found is _UNSEARCHED or (found is not None and found.start() < position):
+                        found = upcoming[name] = compiled.search(text, position)
+                    if found is None or found.start() >= end:
+                        break
+                    if not found.group():
+                        upcoming[name] = compiled.search(text, found.start() + 1)
+                        continue
+                    resume[name] = found.end()
+                    yield self._names[name], found.group()
@@ -0,0 +1,103 @@
+#!/usr/bin/python
+import threading
+import time
+
+
+class _HostState:
+    """ Token bucket and AIMD bookkeeping for a single host. """
+    __slots__ = ('delay', 'tokens', 'updated', 'latency')
+
+    def __init__(self, delay, now):
+        self.delay = delay
+        self.tokens = 1.0
+        self.updated = now
+        self.latency = None
+
+
+class HostScheduler:
+    """ Per-host politeness scheduler.
+
+    Every host gets its own token bucket that refills at one token per
+    `delay` seconds, so requests to one host are spaced out while requests
+    to other hosts go ahead in the meantime. The delay of a host backs off
+    multiplicatively when it errors or slows down and recovers additively
+    (AIMD) back to `min_delay` while it behaves.
+    """
+
+    def __init__(self, min_delay=0.0, max_delay=60.0, backoff=2.0,
+                 recovery=None, latency_factor=2.0, clock=time.monotonic):
+        """
+        :param min_delay: Float - Minimum seconds between requests to a host.
+        :param max_delay: Float - Ceiling for the backed-off delay.
+        :param backoff: Float - Multiplier applied to the delay on trouble.
+        :param recovery: Float - Seconds removed from the delay per success
+            (Default: min_delay, or 0.25 when min_delay is 0).
+        :param latency_factor: Float - A response slower than this multiple
+            of the host's average latency counts as trouble.
+        :param clock: Callable - Monotonic time source.
+        """
+        self.min_delay = max(0.0, float(min_delay))
+        self.max_delay = max(self.min_delay, float(max_delay))
+        self.backoff = float(backoff)
+        self.recovery = float(recovery) if recovery is not None else (self.min_delay or 0.25)
+        self.latency_factor = float(latency_factor)
+        self._clock = clock
+        self._hosts = {}
+        self._cond = threading.Condition()
+
+    def _state(self, host, now):
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.min_delay, now)
+        return state
+
+    def delay(self, host):
+        """ Current delay in seconds enforced for the host. """
+        with self._cond:
+            state = self._hosts.get(host)
+            return state.delay if state is not None else self.min_delay
+
+    def acquire(self, host):
+        """ Blocks until a request to the host is allowed.
+
+        :param host: String - Host (netloc) about to be requested.
+        :return: None
+        """
+        with self._cond:
+            while True:
+                now = self._clock()
+                state = self._state(host, now)
+                if state.delay <= 0:
+                    return
+                elapsed = now - state.updated
+                state.tokens = min(1.0, state.tokens + elapsed / state.delay)
+                state.updated = now
+                if state.tokens >= 1.0:
+                    state.tokens -= 1.0
+                    return
+                self._cond.wait((1.0 - state.tokens) * state.delay)
+
+    def release(self, host, latency=None, error=False):
+        """ Reports the outcome of a request and adapts the host's delay.
+
+        :param host: String - Host (netloc) that was requested.
+        :param latency: Float - Seconds the request took, if known.
+        :param error: Boolean - Whether the request failed.
+        :return: None
+        """
+        with self._cond:
+            state = self._state(host, self._clock())
+            slow = False
+            if latency is not None:
+                if state.latency is not None:
+                    slow = latency > state.latency * self.latency_factor
+                    state.latency = 0.8 * state.latency + 0.2 * latency
+                else:
+                    state.latency = latency
+
+            if error or slow:
+                state.delay = min(self.max_delay,
+                                  max(state.delay, self.recovery) * self.backoff)
+            else:
+                state.delay = max(self.min_delay, state.delay - self.recovery)
+            self._cond.notify_all()
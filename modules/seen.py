@@ -0,0 +1,200 @@
+#!/usr/bin/python
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+
+SEEN_STORES = ('memory', 'bloom', 'sqlite')
+DEFAULT_BLOOM_CAPACITY = 1000000
+DEFAULT_BLOOM_ERROR = 0.001
+
+
+class MemorySeenStore:
+    """ Exact in-memory set of seen keys. """
+
+    def __init__(self):
+        self._keys = set()
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key):
+        """ Marks a key as seen.
+
+        :param key: String - Key to mark.
+        :return: Boolean - True if the key wasn't seen before.
+        """
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        return True
+
+    def close(self):
+        pass
+
+
+class _BloomFilter:
+    """ Fixed-size Bloom filter over a bytearray. """
+    __slots__ = ('capacity', 'count', 'size', 'hashes', 'bits')
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.count = 0
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, first, second):
+        # Double hashing: h1 + i * h2 gives k independent enough positions.
+        return [(first + index * second) % self.size for index in range(self.hashes)]
+
+    def contains(self, positions):
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in positions)
+
+    def add(self, positions):
+        bits = self.bits
+        for pos in positions:
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+
+class BloomSeenStore:
+    """ Scalable Bloom filter of seen keys.
+
+    Memory stays fixed while a filter fills up. When it is full, a new
+    filter of twice the capacity and half the error rate is added, so
+    the overall false-positive rate stays below `error_rate`. A false
+    positive makes the crawler treat a new link as already seen.
+    """
+
+    def __init__(self, capacity=DEFAULT_BLOOM_CAPACITY, error_rate=DEFAULT_BLOOM_ERROR):
+        """
+        :param capacity: Integer - Keys the first filter is sized for.
+        :param error_rate: Float - Upper bound of the false-positive rate.
+        """
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        self.capacity = max(1, int(capacity))
+        self.error_rate = error_rate
+        # Filter i gets error_rate / 2 ** (i + 1); the series sums to error_rate.
+        self._filters = [_BloomFilter(self.capacity, error_rate / 2)]
+        self._count = 0
+
+    @staticmethod
+    def _hash(key):
+        digest = hashlib.blake2b(key.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+    def __contains__(self, key):
+        first, second = self._hash(key)
+        return any(bloom.contains(bloom.positions(first, second)) for bloom in self._filters)
+
+    def __len__(self):
+        return self._count
+
+    def add(self, key):
+        """ Marks a key as seen.
+
+        :param key: String - Key to mark.
+        :return: Boolean - True if the key wasn't (probably) seen before.
+        """
+        first, second = self._hash(key)
+        for bloom in self._filters:
+            if bloom.contains(bloom.positions(first, second)):
+                return False
+        current = self._filters[-1]
+        if current.count >= current.capacity:
+            error_rate = self.error_rate / 2 ** (len(self._filters) + 1)
+            current = _BloomFilter(current.capacity * 2, error_rate)
+            self._filters.append(current)
+        current.add(current.positions(first, second))
+        self._count += 1
+        return True
+
+    def close(self):
+        pass
+
+
+class SqliteSeenStore:
+    """ Exact set of seen keys kept on disk in SQLite.
+
+    Inserts are committed in batches; the open transaction is visible
+    to this store's own lookups, so nothing is missed in between.
+    """
+
+    def __init__(self, path, batch_size=1000, reset=True):
+        """
+        :param path: String - Database file, created if missing.
+        :param batch_size: Integer - Inserts per commit.
+        :param reset: Boolean - Forget keys left by an earlier run.
+        """
+        self.path = path
+        self.batch_size = max(1, int(batch_size))
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        self._conn.execute("PRAGMA synchronous=NORMAL;")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY) WITHOUT ROWID;")
+        if reset:
+            self._conn.execute("DELETE FROM seen;")
+        self._conn.commit()
+
+    def __contains__(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM seen WHERE key = ?;", (key,)).fetchone()
+        return row is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM seen;").fetchone()[0]
+
+    def add(self, key):
+        """ Marks a key as seen.
+
+        :param key: String - Key to mark.
+        :return: Boolean - True if the key wasn't seen before.
+        """
+        with self._lock:
+            cursor = self._conn.execute("INSERT OR IGNORE INTO seen(key) VALUES(?);", (key,))
+            self._pending += 1
+            if self._pending >= self.batch_size:
+                self._conn.commit()
+                self._pending = 0
+            return cursor.rowcount == 1
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+
+
+def open_seen_store(kind='memory', path=None, capacity=DEFAULT_BLOOM_CAPACITY,
+                    error_rate=DEFAULT_BLOOM_ERROR):
+    """ Creates the dedupe store used for links and findings.
+
+    Only the dedupe keys live in the store. The crawler still keeps every
+    link it discovers in memory (URL table and link list) for its results
+    and exports, so a bloom or sqlite store lowers
+    the memory a crawl needs per URL but doesn't keep it flat.
+
+    :param kind: String - One of SEEN_STORES.
+    :param path: String - Folder for the sqlite store's database.
+    :param capacity: Integer - Initial capacity of the bloom store.
+    :param error_rate: Float - False-positive rate of the bloom store.
+    :return: Store with add(), __contains__, __len__ and close().
+    """
+    if kind == 'memory':
+        return MemorySeenStore()
+    if kind == 'bloom':
+        return BloomSeenStore(capacity, error_rate)
+    if kind == 'sqlite':
+        return SqliteSeenStore(os.path.join(path or '.', 'seen.db'))
+    raise ValueError(f"Unknown seen store '{kind}', expected one of: {', '.join(SEEN_STORES)}")
@@ -0,0 +1,158 @@
+#!/usr/bin/python
+import os
+import sqlite3
+import time
+
+STATE_FILE = 'crawl_state.db'
+
+
+class CrawlState:
+    """ Checkpoints a crawl to SQLite so that it can be resumed.
+
+    Every discovered link is a row of `pages` in discovery order, with
+    the depth it was found at and whether it has been crawled. Edges,
+    findings and pattern matches are kept in tables of their own.
+    Changes are committed in batches of pages (or every few seconds),
+    so an interrupted crawl loses at most one batch, which is simply
+    fetched again on resume.
+    """
+
+    def __init__(self, state_dir, resume=False, batch_size=100, interval=5.0,
+                 clock=time.monotonic):
+        """
+        :param state_dir: String - Folder holding the state database.
+        :param resume: Boolean - Keep the state of an earlier run.
+        :param batch_size: Integer - Crawled pages per commit.
+        :param interval: Float - Seconds after which a commit is due anyway.
+        :param clock: Callable - Monotonic time source.
+        """
+        os.makedirs(state_dir, exist_ok=True)
+        self.path = os.path.join(state_dir, STATE_FILE)
+        self.batch_size = max(1, int(batch_size))
+        self.interval = float(interval)
+        self._clock = clock
+        self._pending = 0
+        self._committed = clock()
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        cur = self._conn.cursor()
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                seq INTEGER PRIMARY KEY,
+                url TEXT UNIQUE,
+                depth INTEGER,
+                done INTEGER DEFAULT 0,
+                status INTEGER,
+                title TEXT
+            );
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS edges (
+                from_url TEXT,
+                to_url TEXT,
+                PRIMARY KEY (from_url, to_url)
+            ) WITHOUT ROWID;
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS findings (
+                category TEXT,
+                value TEXT,
+                from_url TEXT,
+                PRIMARY KEY (category, value, from_url)
+            ) WITHOUT ROWID;
+        """)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS matches (
+                pattern TEXT,
+                value TEXT,
+                PRIMARY KEY (pattern, value)
+            ) WITHOUT ROWID;
+        """)
+        self._conn.commit()
+        self.resume = resume
+
+    def resumable(self, start_url):
+        """ Whether resuming was asked for and the stored state belongs to
+        a crawl of start_url.
+
+        :param start_url: String - URL the crawl starts from.
+        :return: Boolean
+        """
+        if not self.resume:
+            return False
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'start_url';").fetchone()
+        return row is not None and row[0] == start_url
+
+    def begin(self, start_url):
+        """ Starts a fresh state for a crawl of start_url. """
+        cur = self._conn.cursor()
+        for table in ('meta', 'pages', 'edges', 'findings', 'matches'):
+            cur.execute(f"DELETE FROM {table};")
+        cur.execute("INSERT INTO meta(key, value) VALUES('start_url', ?);", (start_url,))
+        self.add_page(start_url, 0)
+        self.commit()
+
+    def add_page(self, url, depth):
+        """ Records a newly discovered link, to be crawled at its depth. """
+        self._conn.execute("INSERT OR IGNORE INTO pages(url, depth) VALUES(?, ?);", (url, depth))
+
+    def page_done(self, url, status=None, title=None):
+        """ Records that a page was crawled and commits when a batch is due.
+
+        :param url: String - URL of the page.
+        :param status: Integer - HTTP status of the page.
+        :param title: String - Title of the page.
+        :return: None
+        """
+        self._conn.execute("UPDATE pages SET done = 1, status = ?, title = ? WHERE url = ?;",
+                           (status, title, url))
+        self._pending += 1
+        if (self._pending >= self.batch_size
+                or self._clock() - self._committed >= self.interval):
+            self.commit()
+
+    def add_edge(self, from_url, to_url):
+        self._conn.execute("INSERT OR IGNORE INTO edges(from_url, to_url) VALUES(?, ?);",
+                           (from_url, to_url))
+
+    def add_finding(self, category, value, from_url):
+        self._conn.execute("INSERT OR IGNORE INTO findings(category, value, from_url) "
+                           "VALUES(?, ?, ?);", (category, value, from_url))
+
+    def add_match(self, pattern, value):
+        self._conn.execute("INSERT OR IGNORE INTO matches(pattern, value) VALUES(?, ?);",
+                           (pattern, value))
+
+    def commit(self):
+        """ Writes the current batch to disk. """
+        self._conn.commit()
+        self._pending = 0
+        self._committed = self._clock()
+
+    def pages(self):
+        """ Yields (url, depth, done, title) for every link, in discovery order. """
+        yield from self._conn.execute("SELECT url, depth, done, title FROM pages ORDER BY seq;")
+
+    def edges(self):
+        """ Yields (from_url, to_url) grouped by source page. """
+        yield from self._conn.execute("SELECT from_url, to_url FROM edges;")
+
+    def findings(self):
+        """ Yields (category, value, from_url) for every finding. """
+        yield from self._conn.execute("SELECT category, value, from_url FROM findings;")
+
+    def matches(self):
+        """ Yields (pattern, value) for every pattern match. """
+        yield from self._conn.execute("SELECT pattern, value FROM matches;")
+
+    def close(self):
+        if self._conn is not None:
+            self.commit()
+            self._conn.close()
+            self._conn = None
@@ -1,3 +1,4 @@
+import contextlib
 import io
 import os.path
 import socket
@@ -13,6 +14,7 @@ from modules.checker import get_random_proxy
 from modules.checker import check_tor
 from modules.checker import check_ip
 from modules.checker import setup_proxy_connection
+from modules.transport import install_transport
 
 
 class TestCheckFunctions(unittest.TestCase):
@@ -255,10 +257,25 @@ class TestCheckFunctions(unittest.TestCase):
 
     def test_check_ip_prints_ip(self):
         fake_response = io.StringIO('{"ip": "1.2.3.4"}')
-        with mock.patch("modules.checker.urlopen", return_value=fake_response), \
+        with mock.patch("modules.checker.open_url", return_value=fake_response), \
              mock.patch("modules.checker.load", return_value={"ip": "1.2.3.4"}):
             check_ip()
 
+    def test_check_ip_uses_installed_transport(self):
+        tor_transport = mock.Mock()
+        tor_transport.urlopen.return_value = io.BytesIO(b'{"ip": "5.6.7.8"}')
+        install_transport(tor_transport)
+        self.addCleanup(install_transport, None)
+
+        buffer = io.StringIO()
+        with contextlib.redirect_stdout(buffer):
+            check_ip()
+
+        tor_transport.urlopen.assert_called_once()
+        self.assertEqual("https://api.ipify.org/?format=json",
+                         tor_transport.urlopen.call_args.args[0])
+        self.assertIn("## Your IP: 5.6.7.8", buffer.getvalue())
+
     def test_setup_proxy_connection_invalid_format(self):
         # Should not throw on malformed string
         with mock.patch.dict("sys.modules", {"socks": mock.Mock()}), \
@@ -277,3 +294,43 @@ class TestCheckFunctions(unittest.TestCase):
              mock.patch.object(socket, "getaddrinfo"):
             setup_proxy_connection("host:9050")
         fake_socks.setdefaultproxy.assert_called_once()
+
+    def test_get_proxy_transport_binds_proxies_per_request(self):
+        with mock.patch.object(checker, "_proxies_cache", ["127.0.0.1:9050", "bad", "10.0.0.1:1080"]), \
+             mock.patch.object(checker, "_proxy_transport", None), \
+             mock.patch.object(socket, "socket") as socket_mock:
+            transport = checker.get_proxy_transport()
+            self.assertIs(transport, checker.get_proxy_transport())
+            socket_mock.assert_not_called()
+        self.assertEqual(["127.0.0.1", "10.0.0.1"],
+                         [endpoint.host for endpoint in transport.pool.endpoints])
+        self.assertEqual("weighted", transport.pool.strategy)
+        self.assertEqual(checker.PROXY_COOLDOWN, transport.pool.cooldown)
+
+    def test_get_proxy_transport_keeps_proxies_on_destination_errors(self):
+        import socks
+        from urllib.error import URLError
+
+        unreachable = URLError(socks.GeneralProxyError(
+            "Socket error", socks.SOCKS5Error("0x04: Host unreachable")))
+        refused = URLError(socks.ProxyConnectionError(
+            "Error connecting to SOCKS5 proxy", ConnectionRefusedError()))
+        with mock.patch.object(checker, "_proxies_cache", ["127.0.0.1:9050"]), \
+             mock.patch.object(checker, "_proxy_transport", None):
+            transport = checker.get_proxy_transport()
+        with mock.patch("modules.transport.fetch", side_effect=unreachable):
+            for _ in range(5):
+                with self.assertRaises(URLError):
+                    transport.urlopen("http://dead.onion/")
+        self.assertEqual(1, len(transport.pool.healthy()))
+
+        with mock.patch("modules.transport.fetch", side_effect=refused):
+            for _ in range(transport.pool.max_failures):
+                with self.assertRaises(URLError):
+                    transport.urlopen("http://dead.onion/")
+        self.assertEqual([], transport.pool.healthy())
+
+    def test_get_proxy_transport_without_proxies(self):
+        with mock.patch.object(checker, "_proxies_cache", []), \
+             mock.patch.object(checker, "_proxy_transport", None):
+            self.assertIsNone(checker.get_proxy_transport())
@@ -9,6 +9,7 @@ import urllib.request
 import json
 import sqlite3
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 
 from modules.crawler import Crawler
 from modules.checker import url_canon
@@ -25,6 +26,7 @@ class TestCrawlerFunctions(unittest.TestCase):
     def tearDown(self):
         """ Test Suite Teardown. """
         # Remove test folder.
+        self.crawler.writer.close()
         shutil.rmtree(self.out_path)
 
     def test_excludes(self):
@@ -41,6 +43,35 @@ class TestCrawlerFunctions(unittest.TestCase):
             self.assertTrue(self.crawler.excludes(link),
                             f'Test Fail:: Link: {link} - not excluded')
 
+    def test_excludes_classifies_by_extension_table(self):
+        """Configured file classes are logged under their category and not crawled."""
+        _uri = 'http://www.torcrawl.com'
+        cases = {f'{_uri}/dl/backup.tar.gz': 'archives',
+                 f'{_uri}/v/clip.MP4': 'video',
+                 f'{_uri}/static/app.js?v=2': 'scripts',
+                 'MAILTO:test@torcrawl.com': 'emails'}
+        for link, category in cases.items():
+            self.assertTrue(self.crawler.excludes(link), f'{link} not excluded')
+            self.assertEqual(1, len(self.crawler.findings[category]), category)
+        self.assertFalse(self.crawler.excludes(f'{_uri}/page.php'))
+        self.assertIn("archives", self.crawler.export_payload()["data"])
+
+    def test_extension_table_is_configurable(self):
+        with tempfile.NamedTemporaryFile('w+', delete=False, encoding='utf-8') as ext_file:
+            ext_file.write("images: png\nfonts: .woff, woff2\nbad category: x\n")
+            ext_file_path = ext_file.name
+        self.addCleanup(os.remove, ext_file_path)
+
+        with patch('modules.crawler.DEFAULT_EXTENSIONS_FILE', ext_file_path):
+            crawler = Crawler(self.crawler.website, 0, 0, self.out_path, False, False)
+
+        self.assertEqual({'png': 'images', 'woff': 'fonts', 'woff2': 'fonts'},
+                         crawler.extension_categories)
+        self.assertTrue(crawler.excludes('/static/font.woff2'))
+        self.assertEqual({'/static/font.woff2'}, crawler.findings["fonts"])
+        # Without a line for it, a pdf is a regular link again.
+        self.assertFalse(crawler.excludes('/docs/manual.pdf'))
+
     def test_canonical(self):
         """ Test crawler.canonical function.
         Return True if the function successfully normalizes the provided
@@ -71,6 +102,7 @@ class TestCrawlerFunctions(unittest.TestCase):
         now = self.crawler.timestamp
         img_link = 'https://torcrawl.com/res/test-image.png'
         self.assertTrue(self.crawler.excludes(img_link))
+        self.crawler.writer.flush()
 
         img_file = f"{self.out_path}/{now}_images.txt"
         with open(img_file, 'r', encoding='UTF-8') as f:
@@ -82,6 +114,7 @@ class TestCrawlerFunctions(unittest.TestCase):
         now = self.crawler.timestamp
         script_link = 'https://torcrawl.com/static/app.js'
         self.assertTrue(self.crawler.excludes(script_link))
+        self.crawler.writer.flush()
 
         scripts_file = f"{self.out_path}/{now}_scripts.txt"
         with open(scripts_file, 'r', encoding='UTF-8') as f:
@@ -144,26 +177,60 @@ class TestCrawlerFunctions(unittest.TestCase):
         self.assertIn("https://torcrawl.com/deep/custom-path", result)
         self.assertIn("https://torcrawl.com/deep/second-path", result)
 
+    @patch.object(Crawler, "_make_request")
+    def test_crawl_attributes_custom_pattern_matches(self, mock_request):
+        """Matches of custom patterns are kept per pattern; only link-like ones are crawled."""
+        html = b"<p>Wallet 1BoatSLRHtKNngkdXEeobR76b53LETtpyT and /deep/path</p>"
+
+        class FakeResponse:
+            status = 200
+
+            def read(self_inner):
+                return html
+
+        mock_request.return_value = FakeResponse()
+        wallet = r"\b1[a-km-zA-HJ-NP-Z1-9]{25,34}\b"
+
+        with tempfile.NamedTemporaryFile('w+', delete=False, encoding='utf-8') as regex_file:
+            regex_file.write(f"{wallet}\n/deep/[a-z-]+\n")
+            regex_file_path = regex_file.name
+
+        self.addCleanup(lambda: os.path.exists(regex_file_path) and os.remove(regex_file_path))
+
+        with patch('modules.crawler.DEFAULT_REGEX_FILE', regex_file_path):
+            crawler = Crawler(self.crawler.website, 1, 0, self.out_path, False, False)
+
+        result = crawler.crawl()
+        matches = crawler.export_payload()["data"]["matches"]
+
+        self.assertEqual(["1BoatSLRHtKNngkdXEeobR76b53LETtpyT"], matches[wallet])
+        self.assertEqual(["/deep/path"], matches["/deep/[a-z-]+"])
+        self.assertIn("https://torcrawl.com/deep/path", result)
+        self.assertFalse(any("1BoatSLR" in link for link in result))
+
 
     def test_make_request_with_random_ua_and_proxy(self):
         crawler = Crawler("http://example.com", 0, 0, self.out_path, False, False, random_ua=True, random_proxy=True)
-        with mock.patch("modules.crawler.get_random_proxy", return_value="proxy:9050") as proxy_mock, \
-             mock.patch("modules.crawler.setup_proxy_connection") as setup_mock, \
+        proxy_transport = mock.Mock()
+        with mock.patch("modules.crawler.get_proxy_transport", return_value=proxy_transport) as proxy_mock, \
              mock.patch("modules.crawler.get_random_user_agent", return_value="UA") as ua_mock, \
              mock.patch("modules.crawler.urllib.request.urlopen") as urlopen_mock:
             crawler._make_request("http://example.com")
         proxy_mock.assert_called_once()
-        setup_mock.assert_called_once_with("proxy:9050")
-        req_arg = urlopen_mock.call_args[0][0]
+        # The proxy is bound to this request only; urllib's global opener is untouched.
+        urlopen_mock.assert_not_called()
+        req_arg = proxy_transport.urlopen.call_args[0][0]
         self.assertIsInstance(req_arg, urllib.request.Request)
         # urllib stores header keys normalized to title-case "User-agent"
         self.assertEqual(req_arg.get_header("User-agent"), "UA")
 
     def test_make_request_without_randoms(self):
         crawler = Crawler("http://example.com", 0, 0, self.out_path, False, False, random_ua=False, random_proxy=False)
-        with mock.patch("modules.crawler.urllib.request.urlopen") as urlopen_mock:
+        with mock.patch("modules.crawler.open_url") as open_url_mock:
             crawler._make_request("http://example.com")
-        urlopen_mock.assert_called_once_with("http://example.com")
+        open_url_mock.assert_called_once_with(
+            "http://example.com", accept_types=mock.ANY, max_bytes=crawler.max_page_bytes,
+            scheduler=crawler.scheduler)
 
     def test_crawl_collects_links(self):
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -185,3 +252,294 @@ class TestCrawlerFunctions(unittest.TestCase):
 
             self.assertIn("https://example.com", result)
             self.assertIn("https://example.com/page1", result)
+
+    def _fake_site(self):
+        """Return a _make_request replacement serving a small in-memory site."""
+        pages = {
+            "https://torcrawl.com": b"<a href='/a'>a</a><a href='/b'>b</a>",
+            "https://torcrawl.com/a": b"<a href='/c'>c</a><a href='/b'>b</a>",
+            "https://torcrawl.com/b": b"<a href='/d'>d</a><a href='tel:123'>t</a>",
+            "https://torcrawl.com/c": b"<title>C</title><a href='/a'>a</a>",
+            "https://torcrawl.com/d": b"<img src='/x.png'><a href='/x.png'>x</a>",
+        }
+
+        class FakeResponse:
+            status = 200
+
+            def __init__(self, body):
+                self.body = body
+
+            def read(self):
+                return self.body
+
+        def fake_request(url):
+            if url not in pages:
+                raise urllib.error.URLError("not found")
+            return FakeResponse(pages[url])
+
+        return fake_request
+
+    def test_concurrent_crawl_matches_serial(self):
+        """The concurrent engine yields the same results as the serial one."""
+        payloads = []
+        results = []
+        for workers in (1, 4):
+            with tempfile.TemporaryDirectory() as temp_dir:
+                crawler = Crawler("https://torcrawl.com", 3, 0, temp_dir,
+                                  False, False, workers=workers)
+                with mock.patch.object(crawler, "_make_request",
+                                       side_effect=self._fake_site()):
+                    results.append(sorted(crawler.crawl()))
+                payloads.append(crawler.export_payload())
+
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(payloads[0], payloads[1])
+        self.assertIn("https://torcrawl.com/d", results[1])
+
+    def test_seen_stores_give_the_same_crawl(self):
+        """Bloom and sqlite dedupe stores find the same links as the in-memory set."""
+        results = {}
+        for store in ("memory", "bloom", "sqlite"):
+            with tempfile.TemporaryDirectory() as temp_dir:
+                crawler = Crawler("https://torcrawl.com", 3, 0, temp_dir,
+                                  False, False, seen_store=store)
+                with mock.patch.object(crawler, "_make_request",
+                                       side_effect=self._fake_site()):
+                    results[store] = crawler.crawl()
+                crawler.seen.close()
+
+        self.assertEqual(results["memory"], results["bloom"])
+        self.assertEqual(results["memory"], results["sqlite"])
+
+    def test_interrupted_crawl_resumes_without_refetching(self):
+        """A resumed crawl only fetches what wasn't crawled and ends up the same."""
+        fake_request = self._fake_site()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            crawler = Crawler("https://torcrawl.com", 3, 0, temp_dir, False, False)
+            with mock.patch.object(crawler, "_make_request", side_effect=fake_request):
+                expected = crawler.crawl()
+            expected_payload = crawler.export_payload()
+
+        def interrupted_request(url):
+            if url.endswith("/c"):
+                raise KeyboardInterrupt
+            return fake_request(url)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            state_dir = os.path.join(temp_dir, "state")
+            crawler = Crawler("https://torcrawl.com", 3, 0, temp_dir, False, False,
+                              state_dir=state_dir)
+            with mock.patch.object(crawler, "_make_request", side_effect=interrupted_request):
+                with self.assertRaises(KeyboardInterrupt):
+                    crawler.crawl()
+            crawler.state.close()
+
+            resumed = Crawler("https://torcrawl.com", 3, 0, temp_dir, False, False,
+                              state_dir=state_dir, resume=True)
+            with mock.patch.object(resumed, "_make_request",
+                                   side_effect=fake_request) as request_mock:
+                result = resumed.crawl()
+            resumed.state.close()
+
+        fetched = [call.args[0] for call in request_mock.call_args_list]
+        self.assertEqual(["https://torcrawl.com/c", "https://torcrawl.com/d"], fetched)
+        self.assertEqual(expected, result)
+        self.assertEqual(expected_payload, resumed.export_payload())
+        self.assertEqual(2, resumed.pages["https://torcrawl.com/d"]["depth"])
+
+    def test_incremental_recrawl_reuses_unchanged_pages(self):
+        """A re-crawl reuses what it extracted from unchanged pages and reports the diff."""
+        fake_request = self._fake_site()
+
+        class NotModified:
+            status = 304
+            headers = {"ETag": '"v2"'}
+
+            def read(self):
+                return b""
+
+        def recrawl_request(url):
+            if url == "https://torcrawl.com/a":
+                return NotModified()
+            if url == "https://torcrawl.com/d":
+                raise urllib.error.URLError("gone")
+            return fake_request(url)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            crawler = Crawler("https://torcrawl.com", 3, 0, temp_dir, False, False,
+                              incremental=True)
+            with mock.patch.object(crawler, "_make_request", side_effect=fake_request):
+                expected = crawler.crawl()
+            with open(os.path.join(temp_dir, f"{crawler.timestamp}_changes.json"),
+                      encoding="UTF-8") as changes_file:
+                self.assertEqual(5, len(json.load(changes_file)["new"]))
+
+            recrawl = Crawler("https://torcrawl.com", 3, 0, temp_dir, False, False,
+                              incremental=True)
+            with mock.patch.object(recrawl, "_make_request", side_effect=recrawl_request), \
+                    mock.patch.object(recrawl, "_extract_page",
+                                      wraps=recrawl._extract_page) as extract_mock:
+                result = recrawl.crawl()
+            with open(os.path.join(temp_dir, f"{recrawl.timestamp}_changes.json"),
+                      encoding="UTF-8") as changes_file:
+                changes = json.load(changes_file)
+
+        self.assertEqual(expected, result)
+        self.assertEqual(0, extract_mock.call_count)
+        # /d was still linked to, it just couldn't be fetched this time.
+        self.assertEqual({"new": [], "changed": [], "removed": [],
+                          "failed": ["https://torcrawl.com/d"], "unchanged": 4}, changes)
+        self.assertEqual("C", recrawl.titles["https://torcrawl.com/c"])
+
+    def test_incremental_request_is_conditional(self):
+        """Pages crawled before are requested with their stored validators."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            crawler = Crawler("https://torcrawl.com", 1, 0, temp_dir, False, False,
+                              incremental=True)
+            crawler.page_cache.store("https://torcrawl.com", {"ETag": '"v1"'}, "h", {})
+            with mock.patch("modules.crawler.open_url") as open_mock:
+                crawler._make_request("https://torcrawl.com")
+                crawler._make_request("https://torcrawl.com/new")
+            crawler.page_cache.close()
+
+        request = open_mock.call_args_list[0].args[0]
+        self.assertEqual('"v1"', request.get_header("If-none-match"))
+        self.assertEqual("https://torcrawl.com/new", open_mock.call_args_list[1].args[0])
+
+    def test_crawl_keeps_bodies_in_page_store(self):
+        """Fetched bodies end up in the page store, keyed by URL."""
+        from modules.pagestore import PageStore
+
+        fake_request = self._fake_site()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = PageStore(os.path.join(temp_dir, "pages"))
+            crawler = Crawler("https://torcrawl.com", 3, 0, temp_dir, False, False,
+                              workers=2, page_store=store)
+            with mock.patch.object(crawler, "_make_request", side_effect=fake_request):
+                crawler.crawl()
+            body, response = store.get_record("https://torcrawl.com/c")
+            missing = store.get("https://torcrawl.com/x.png")
+            store.close()
+
+        self.assertEqual(b"<title>C</title><a href='/a'>a</a>", body)
+        # Kept with the body, for WARC records written by the extractor.
+        self.assertEqual(("https://torcrawl.com/c", 200),
+                         (response["url"], response["status"]))
+        self.assertIsNone(missing)
+        # Fetch metadata for the -DB pages table.
+        self.assertEqual(200, crawler.pages["https://torcrawl.com/c"]["status"])
+        self.assertEqual(len(body), crawler.pages["https://torcrawl.com/c"]["bytes"])
+        self.assertEqual(5, len(crawler.pages))
+
+    def test_concurrent_crawl_keeps_requests_in_flight(self):
+        """Several requests are in flight at once, up to the worker cap."""
+        import threading
+        import time
+
+        fake_request = self._fake_site()
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        def slow_request(url):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.05)
+            with lock:
+                state["active"] -= 1
+            return fake_request(url)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            crawler = Crawler("https://torcrawl.com", 2, 0, temp_dir,
+                              False, False, workers=2)
+            with mock.patch.object(crawler, "_make_request",
+                                   side_effect=slow_request):
+                crawler.crawl()
+
+        self.assertEqual(2, state["peak"])
+
+    def test_fetch_all_keeps_a_bounded_window(self):
+        """Only about twice the workers are fetched ahead of the parser."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            crawler = Crawler("https://torcrawl.com", 1, 0, temp_dir,
+                              False, False, workers=2)
+        pulled = []
+
+        def items():
+            for index in range(50):
+                pulled.append(index)
+                yield f"https://torcrawl.com/{index}"
+
+        ahead = []
+        with mock.patch.object(crawler, "_fetch", side_effect=lambda item: item), \
+                ThreadPoolExecutor(max_workers=2) as executor:
+            for consumed, (item, page) in enumerate(crawler._fetch_all(items(), executor)):
+                self.assertEqual(item, page)
+                ahead.append(len(pulled) - consumed)
+
+        self.assertEqual(50, len(ahead))
+        self.assertEqual(4, max(ahead))
+
+    def test_crawl_fetches_each_url_once_and_records_depth(self):
+        """Deeper steps never re-fetch pages and every link keeps its depth."""
+        fake_request = self._fake_site()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            crawler = Crawler("https://torcrawl.com", 5, 0, temp_dir, False, False)
+            with mock.patch.object(crawler, "_make_request",
+                                   side_effect=fake_request) as request_mock:
+                result = crawler.crawl()
+
+        fetched = [call.args[0] for call in request_mock.call_args_list]
+        self.assertEqual(len(fetched), len(set(fetched)))
+        self.assertEqual(["https://torcrawl.com",
+                          "https://torcrawl.com/a",
+                          "https://torcrawl.com/b",
+                          "https://torcrawl.com/c",
+                          "https://torcrawl.com/d"], result)
+        self.assertEqual(0, crawler.pages["https://torcrawl.com"]["depth"])
+        self.assertEqual(1, crawler.pages["https://torcrawl.com/b"]["depth"])
+        self.assertEqual(2, crawler.pages["https://torcrawl.com/d"]["depth"])
+
+    def test_crawl_logs_skipped_and_truncated_pages(self):
+        from modules.transport import ContentRejected
+
+        class FakeResponse:
+            status = 200
+            truncated = True
+
+            def read(self):
+                return b"<a href='/dump'>dump</a>"
+
+        def fake_request(url):
+            if url.endswith('/dump'):
+                raise ContentRejected(url, "application/octet-stream (unknown bytes)")
+            return FakeResponse()
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            crawler = Crawler("https://torcrawl.com", 2, 0, temp_dir, True, False,
+                              max_page_bytes=1024)
+            with mock.patch.object(crawler, "_make_request", side_effect=fake_request):
+                crawler.crawl()
+            with open(os.path.join(temp_dir, "crawler.log"), encoding="UTF-8") as log_file:
+                log = log_file.read()
+
+        self.assertIn("WARN: Truncated to 1024 bytes: https://torcrawl.com", log)
+        self.assertIn("SKIP: Not a page: https://torcrawl.com/dump", log)
+        self.assertNotIn("[INFO] Parsed: [200] https://torcrawl.com/dump", log)
+
+    def test_parse_page_backends(self):
+        html = ("<title>T</title><a href='/a'>a</a><img src='/i.png'>"
+                "<iframe src='/frame'></iframe>")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            soup_crawler = Crawler("https://torcrawl.com", 1, 0, temp_dir, False, False,
+                                   parser="html.parser")
+            lxml_crawler = Crawler("https://torcrawl.com", 1, 0, temp_dir, False, False,
+                                   parser="lxml")
+            soup_links, lxml_links = [], []
+            self.assertTrue(soup_crawler._parse_page("https://torcrawl.com", html, soup_links))
+            self.assertTrue(lxml_crawler._parse_page("https://torcrawl.com", html, lxml_links))
+
+        self.assertEqual(["https://torcrawl.com/a"], soup_links)
+        self.assertEqual(["https://torcrawl.com/a", "https://torcrawl.com/frame"], lxml_links)
+        self.assertEqual("T", lxml_crawler.titles["https://torcrawl.com"])
+        self.assertEqual({"/i.png"}, lxml_crawler.findings["images"])
@@ -70,6 +70,16 @@ class TestExportFunctions(unittest.TestCase):
         self.assertEqual(scripts_section[0].text, "https://torcrawl.com/static/app.js")
         self.assertEqual(telephones_section[0].text, "tel:012-013-104-5")
 
+    def test_export_xml_includes_configured_categories(self):
+        prefix = f"{self.crawler.timestamp}_results_test"
+        self.crawler.findings["archives"].add("https://torcrawl.com/dump.zip")
+
+        payload = self.crawler.export_payload()
+        export_xml(self.out_path, prefix, payload["data"], verbose=False)
+
+        root = ET.parse(os.path.join(self.out_path, f"{prefix}.xml")).getroot()
+        self.assertEqual("https://torcrawl.com/dump.zip", root.find("archives")[0].text)
+
     def test_export_database_stores_nodes_edges_and_titles(self):
         prefix = f"{self.crawler.timestamp}_results_test_db"
         self.crawler.findings["links"].update({"https://torcrawl.com", "https://torcrawl.com/about"})
@@ -96,6 +106,45 @@ class TestExportFunctions(unittest.TestCase):
             self.assertIn(("https://torcrawl.com", "https://torcrawl.com/about"), edges)
 
 
+    def test_export_database_stores_pages_and_yara_matches(self):
+        prefix = f"{self.crawler.timestamp}_results_test_yara_db"
+        self.crawler.findings["links"].update({"https://torcrawl.com", "https://torcrawl.com/about"})
+        pages = {
+            "https://torcrawl.com": {"status": 200, "bytes": 512, "elapsed": 0.25,
+                                     "fetched_at": "2026-10-18T10:00:00+00:00"},
+            "https://torcrawl.com/about": {"status": 200, "bytes": 128, "elapsed": 0.5,
+                                           "fetched_at": "2026-10-18T10:00:01+00:00"},
+        }
+        matches = {"https://torcrawl.com": [
+            {"rule": "keyword_search", "namespace": "keywords", "tags": ["kw"],
+             "meta": {"score": 90}, "strings": [{"identifier": "$a", "offset": 7, "length": 8}]},
+            {"rule": "email_filter", "namespace": "keywords", "tags": [],
+             "meta": {"score": 20}, "strings": []},
+        ]}
+
+        payload = self.crawler.export_payload()
+        for _ in range(2):
+            export_database(self.out_path, prefix, payload["data"], payload["edges"],
+                            payload["titles"], payload["resources"], pages=pages,
+                            yara_matches=matches)
+
+        conn = sqlite3.connect(os.path.join(self.out_path, f"{prefix}.db"))
+        with conn:
+            cur = conn.cursor()
+            cur.execute("SELECT url, status, bytes, score FROM pages ORDER BY url;")
+            self.assertEqual([("https://torcrawl.com", 200, 512, 110),
+                              ("https://torcrawl.com/about", 200, 128, None)], cur.fetchall())
+
+            cur.execute("SELECT rule, tags, score, offsets FROM yara_matches ORDER BY score DESC;")
+            rows = cur.fetchall()
+            self.assertEqual(2, len(rows))
+            self.assertEqual(("keyword_search", "kw", 90), rows[0][:3])
+            self.assertEqual([{"identifier": "$a", "offset": 7, "length": 8}], json.loads(rows[0][3]))
+
+            cur.execute("EXPLAIN QUERY PLAN SELECT url FROM yara_matches WHERE rule = ?;", ("x",))
+            self.assertIn("idx_yara_matches_rule", " ".join(str(row) for row in cur.fetchall()))
+
+
 if __name__ == '__main__':
     unittest.main()
 
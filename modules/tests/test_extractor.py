@@ -1,4 +1,5 @@
 import contextlib
+import gzip
 import io
 import os
 import tempfile
@@ -6,6 +7,7 @@ import unittest
 from unittest import mock
 
 import modules.extractor as extractor_mod
+from modules import yararules
 from modules.extractor import (
     text,
     check_yara,
@@ -15,9 +17,15 @@ from modules.extractor import (
     url_to_terminal,
     extractor,
 )
+from modules.pagestore import PageStore
 
 
 class TestExtractorFunctions(unittest.TestCase):
+    def setUp(self):
+        # Compiled rules are cached per process; tests swap in fake modules.
+        self.addCleanup(yararules._rules_cache.clear)
+        yararules._rules_cache.clear()
+
     def test_text_strips_scripts_and_styles(self):
         html = "<html><head><style>.x{}</style></head><body>Hello<script>ignored()</script><p>World</p></body></html>"
         self.assertEqual("Hello World", text(html))
@@ -25,15 +33,23 @@ class TestExtractorFunctions(unittest.TestCase):
     def test_check_yara_returns_matches_and_uses_text_mode(self):
         fake_yara = mock.Mock()
         rules_mock = mock.Mock()
-        rules_mock.match.return_value = ["hit"]
+        rules_mock.match.return_value = [mock.Mock(rule="hit", namespace="keywords",
+                                                   tags=["kw"], meta={"score": 90},
+                                                   strings=[(3, "$a", b"keyword")])]
         fake_yara.compile.return_value = rules_mock
 
         with mock.patch.dict("sys.modules", {"yara": fake_yara}):
             result = check_yara("<html><body>Keyword</body></html>", yara=1)
+            check_yara("<html><body>Other</body></html>", yara=1)
 
-        self.assertEqual(["hit"], result)
+        self.assertEqual([{"rule": "hit", "namespace": "keywords", "tags": ["kw"],
+                           "meta": {"score": 90},
+                           "strings": [{"identifier": "$a", "offset": 3, "length": 7}]}],
+                         result)
+        rules_mock.match.assert_called_with(data="other")
+        # Compiled once, matched for every page.
         fake_yara.compile.assert_called_once()
-        rules_mock.match.assert_called_once()
+        self.assertEqual(2, rules_mock.match.call_count)
 
     def test_check_yara_returns_none_when_raw_missing(self):
         with mock.patch.dict("sys.modules", {"yara": mock.Mock()}):
@@ -61,6 +77,122 @@ class TestExtractorFunctions(unittest.TestCase):
                 with open(os.path.join(temp_dir, filename), "rb") as f:
                     self.assertEqual(b"content", f.read())
 
+    def test_input_file_to_folder_reads_page_store_first(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = PageStore(os.path.join(temp_dir, "pages"))
+            store.put("http://example.com/stored.htm", b"stored")
+            input_path = os.path.join(temp_dir, "urls.txt")
+            with open(input_path, "w", encoding="utf-8") as f:
+                f.writelines(["http://example.com/stored.htm\n",
+                              "http://example.com/missing.htm\n"])
+
+            with mock.patch.object(extractor_mod, "open_url") as open_mock:
+                open_mock.return_value.read.return_value = b"fetched"
+                input_file_to_folder(input_path, temp_dir, yara=None, page_store=store)
+            store.close()
+
+            self.assertEqual(1, open_mock.call_count)
+            self.assertEqual("http://example.com/missing.htm\n", open_mock.call_args.args[0])
+            for filename, content in (("stored.htm", b"stored"), ("missing.htm", b"fetched")):
+                with open(os.path.join(temp_dir, filename), "rb") as f:
+                    self.assertEqual(content, f.read())
+
+    def test_input_file_to_folder_concurrent_keeps_names_and_order(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            rules_path = os.path.join(temp_dir, "odd.yar")
+            with open(rules_path, "w", encoding="utf-8") as f:
+                f.write('rule odd { meta: score = 50 strings: $a = /page[13579]/ '
+                        'condition: $a }')
+            yararules.configure_rules([rules_path])
+            self.addCleanup(yararules.configure_rules, None)
+
+            input_path = os.path.join(temp_dir, "urls.txt")
+            with open(input_path, "w", encoding="utf-8") as f:
+                f.writelines([f"http://example.com/page{index}.htm\n" for index in range(8)]
+                             + ["http://example.com/\n", "http://example.com/\n"])
+
+            def fake_request(url, *args, **kwargs):
+                return url.strip().encode() + b" page1"
+
+            with mock.patch.object(extractor_mod, "_make_request_with_ua",
+                                   side_effect=fake_request):
+                buffer = io.StringIO()
+                with contextlib.redirect_stdout(buffer):
+                    # Two scan workers: matched in a pool of processes.
+                    input_file_to_folder(input_path, temp_dir, yara=0,
+                                         fetch_workers=4, scan_workers=2)
+
+            created = [line.rsplit("/", 1)[1] for line in buffer.getvalue().splitlines()
+                       if line.startswith("# File created on")]
+            self.assertEqual([f"page{index}.htm" for index in range(8)]
+                             + ["index.htm", "index.htm(1)"], created)
+            with open(os.path.join(temp_dir, "page5.htm"), "rb") as f:
+                self.assertEqual(b"http://example.com/page5.htm page1", f.read())
+
+    def test_input_file_to_folder_min_score(self):
+        low = [{"rule": "low", "namespace": "k", "tags": [], "meta": {"score": 20}, "strings": []}]
+        high = [{"rule": "high", "namespace": "k", "tags": [], "meta": {"score": 90}, "strings": []}]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_path = os.path.join(temp_dir, "urls.txt")
+            with open(input_path, "w", encoding="utf-8") as f:
+                f.writelines(["http://example.com/low.htm\n", "http://example.com/high.htm\n"])
+
+            with mock.patch.object(extractor_mod, "_make_request_with_ua",
+                                   side_effect=lambda url, *args, **kwargs: url.encode()), \
+                    mock.patch.object(extractor_mod, "scan_page",
+                                      side_effect=lambda raw, yara: low if b"low" in raw else high):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results = input_file_to_folder(input_path, temp_dir, yara=0, min_score=50)
+
+            self.assertEqual({"http://example.com/high.htm": high}, results)
+            self.assertTrue(os.path.exists(os.path.join(temp_dir, "high.htm")))
+            self.assertFalse(os.path.exists(os.path.join(temp_dir, "low.htm")))
+
+    def test_input_file_to_folder_warc(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            store = PageStore(os.path.join(temp_dir, "pages"))
+            # Crawled pages keep their response, and become response records too.
+            store.put("http://example.com/stored.htm", b"stored",
+                      {"url": "http://example.com/stored.htm", "status": 203,
+                       "reason": "Non-Authoritative", "headers": [["Content-Type", "text/plain"]],
+                       "request_headers": {"User-Agent": "crawler-ua"}})
+            store.put("http://example.com/bare.htm", b"bare")
+            input_path = os.path.join(temp_dir, "urls.txt")
+            with open(input_path, "w", encoding="utf-8") as f:
+                f.writelines(["http://example.com/stored.htm\n",
+                              "http://example.com/fetched.htm\n",
+                              "http://example.com/bare.htm\n"])
+
+            response = mock.Mock(url="http://example.com/fetched.htm", status=200,
+                                 reason="OK", headers={"Content-Type": "text/html"},
+                                 request_headers={"User-Agent": "extractor-ua"})
+            response.read.return_value = b"fetched"
+            with mock.patch.object(extractor_mod, "open_url", return_value=response):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    input_file_to_folder(input_path, temp_dir, yara=None, page_store=store,
+                                         warc=True)
+            store.close()
+
+            self.assertFalse(os.path.exists(os.path.join(temp_dir, "fetched.htm")))
+            warcs = [name for name in os.listdir(temp_dir) if name.endswith(".warc.gz")]
+            self.assertEqual(1, len(warcs))
+            with gzip.open(os.path.join(temp_dir, warcs[0]), "rb") as f:
+                data = f.read()
+            self.assertEqual(2, data.count(b"WARC-Type: response\r\n"))
+            self.assertEqual(2, data.count(b"WARC-Type: request\r\n"))
+            self.assertIn(b"HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n", data)
+            self.assertIn(b"HTTP/1.1 203 Non-Authoritative\r\nContent-Type: text/plain\r\n", data)
+            self.assertIn(b"User-Agent: crawler-ua\r\n", data)
+            self.assertIn(b"User-Agent: extractor-ua\r\n", data)
+            # Only a stored page without a response falls back to a resource.
+            self.assertEqual(1, data.count(b"WARC-Type: resource\r\n"))
+            cdx = [name for name in os.listdir(temp_dir) if name.endswith(".cdx")]
+            with open(os.path.join(temp_dir, cdx[0]), encoding="utf-8") as f:
+                entries = [line.split()[2:5] for line in f.readlines()[1:]]
+            self.assertEqual([["http://example.com/bare.htm", "text/html", "-"],
+                              ["http://example.com/fetched.htm", "text/html", "200"],
+                              ["http://example.com/stored.htm", "text/plain", "203"]], entries)
+
     def test_input_file_to_terminal_prints_content_and_no_matches(self):
         with tempfile.NamedTemporaryFile(mode="w+", delete=False) as temp_file:
             temp_file.write("example.com\n")
@@ -69,7 +201,7 @@ class TestExtractorFunctions(unittest.TestCase):
 
         with mock.patch.object(
             extractor_mod, "_make_request_with_ua", return_value=b"body"
-        ), mock.patch.object(extractor_mod, "check_yara", return_value=[]):
+        ), mock.patch.object(extractor_mod, "scan_page", return_value=[]):
             buffer = io.StringIO()
             with contextlib.redirect_stdout(buffer):
                 input_file_to_terminal(temp_file_path, yara=1, random_ua=False, random_proxy=False)
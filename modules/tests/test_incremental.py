@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+
+from modules.incremental import PageCache, content_hash, open_page_cache
+
+
+class TestPageCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.path = os.path.join(self.temp_dir.name, "incremental.db")
+
+    def test_content_hash(self):
+        self.assertEqual(content_hash("<p>a</p>"), content_hash("<p>a</p>"))
+        self.assertNotEqual(content_hash("<p>a</p>"), content_hash("<p>b</p>"))
+
+    def test_round_trip(self):
+        extracted = {"title": "Home", "links": ["/a"], "matches": [["x+", "xx"]]}
+        cache = PageCache(self.path)
+        self.assertEqual({}, cache.conditional_headers("https://torcrawl.com"))
+        self.assertIsNone(cache.lookup("https://torcrawl.com"))
+        cache.store("https://torcrawl.com", {"ETag": '"v1"'}, "h1", extracted)
+        cache.store("https://torcrawl.com/old", {}, "h2", extracted)
+        self.assertEqual({"new": ["https://torcrawl.com", "https://torcrawl.com/old"],
+                          "changed": [], "removed": [], "failed": [], "unchanged": 0},
+                         cache.finish())
+        cache.close()
+
+        cache = open_page_cache(self.temp_dir.name)
+        self.assertEqual({"If-None-Match": '"v1"'},
+                         cache.conditional_headers("https://torcrawl.com"))
+        self.assertEqual(("h1", extracted), cache.lookup("https://torcrawl.com"))
+        cache.unchanged_page("https://torcrawl.com",
+                             {"ETag": '"v2"', "Last-Modified": "Sat, 17 Oct 2026 10:00:00 GMT"})
+        cache.store("https://torcrawl.com/new", {}, "h3", extracted)
+        changes = cache.finish()
+        cache.close()
+
+        self.assertEqual({"new": ["https://torcrawl.com/new"], "changed": [],
+                          "removed": ["https://torcrawl.com/old"], "failed": [],
+                          "unchanged": 1}, changes)
+        cache = PageCache(self.path)
+        self.assertEqual({"If-None-Match": '"v2"',
+                          "If-Modified-Since": "Sat, 17 Oct 2026 10:00:00 GMT"},
+                         cache.conditional_headers("https://torcrawl.com"))
+        self.assertIsNone(cache.lookup("https://torcrawl.com/old"))
+        cache.store("https://torcrawl.com/new", {}, "h4", extracted)
+        self.assertEqual(["https://torcrawl.com/new"], cache.finish()["changed"])
+        cache.close()
+
+    def test_failed_pages_are_kept(self):
+        cache = PageCache(self.path)
+        cache.store("https://torcrawl.com", {}, "h1", {})
+        cache.store("https://torcrawl.com/down", {}, "h2", {"title": "Down"})
+        cache.finish()
+        cache.close()
+
+        # Still linked to, but the fetch failed: not removed.
+        cache = PageCache(self.path)
+        cache.keep("https://torcrawl.com")
+        changes = cache.finish(["https://torcrawl.com", "https://torcrawl.com/down"])
+        self.assertEqual([], changes["removed"])
+        self.assertEqual(["https://torcrawl.com/down"], changes["failed"])
+        self.assertEqual(("h2", {"title": "Down"}), cache.lookup("https://torcrawl.com/down"))
+        # No longer linked to at all: removed.
+        self.assertEqual(["https://torcrawl.com/down"], cache.finish()["removed"])
+        cache.close()
@@ -0,0 +1,40 @@
+import unittest
+
+from modules.linkparser import get_parser, parse_lxml, parse_soup
+
+_PAGE = """<!DOCTYPE html>
+<html><head><title> Index &amp; more </title>
+<script src="/app.js"></script></head>
+<body>
+<a href="/a">a</a><a name="anchor">no href</a>
+<map><area href="/b"></map>
+<img src="/logo.png"><iframe src="/frame"></iframe>
+<a href="mailto:test@torcrawl.com">mail</a>
+</body></html>"""
+
+
+class TestLinkParser(unittest.TestCase):
+    def test_lxml_extracts_title_and_link_attributes(self):
+        title, links = parse_lxml(_PAGE)
+        self.assertEqual("Index & more", title)
+        self.assertEqual(["/app.js", "/a", "/b", "/logo.png", "/frame",
+                          "mailto:test@torcrawl.com"], links)
+
+    def test_lxml_finds_every_anchor_the_soup_parser_finds(self):
+        _, soup_links = parse_soup(_PAGE)
+        _, lxml_links = parse_lxml(_PAGE)
+        for link in soup_links:
+            if link is not None:
+                self.assertIn(link, lxml_links)
+
+    def test_lxml_handles_empty_and_broken_markup(self):
+        self.assertEqual((None, []), parse_lxml(""))
+        self.assertEqual((None, ["x"]), parse_lxml("<a href=x><b><title"))
+        title, links = parse_lxml('<?xml version="1.0" encoding="utf-8"?><a href="y">')
+        self.assertEqual(["y"], links)
+
+    def test_get_parser(self):
+        self.assertIs(parse_lxml, get_parser("lxml"))
+        self.assertIs(parse_soup, get_parser("html.parser"))
+        with self.assertRaises(ValueError):
+            get_parser("regex")
@@ -0,0 +1,66 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from modules.pagestore import PageStore
+
+
+class TestPageStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def test_round_trip(self):
+        store = PageStore(self.temp_dir.name)
+        digest = store.put("https://torcrawl.com/a", b"<p>same</p>")
+        self.assertEqual(digest, store.put("https://torcrawl.com/b", b"<p>same</p>"))
+        self.assertEqual(b"<p>same</p>", store.get("https://torcrawl.com/a"))
+        self.assertEqual(b"<p>same</p>", store.get("https://torcrawl.com/b"))
+        self.assertIsNone(store.get("https://torcrawl.com/c"))
+        self.assertEqual((2, 1), (store.hits, store.misses))
+
+        # One compressed object for both URLs.
+        objects = [name for _, _, names in os.walk(os.path.join(self.temp_dir.name, "objects"))
+                   for name in names]
+        self.assertEqual([digest], objects)
+        store.close()
+
+    def test_stale_pages_are_misses(self):
+        store = PageStore(self.temp_dir.name)
+        store.put("https://torcrawl.com/a", b"old")
+        store.put("https://torcrawl.com/b", b"old")
+        store.close()
+
+        store = PageStore(self.temp_dir.name, since=time.time() + 1)
+        self.assertIsNone(store.get("https://torcrawl.com/a"))
+        store.since = time.time() - 1
+        self.assertTrue(store.touch("https://torcrawl.com/a"))
+        self.assertFalse(store.touch("https://torcrawl.com/c"))
+        self.assertEqual(b"old", store.get("https://torcrawl.com/a"))
+        store.close()
+
+    def test_response_is_kept_with_the_body(self):
+        response = {"url": "https://torcrawl.com/a", "status": 200, "reason": "OK",
+                    "headers": [["Content-Type", "text/html"]],
+                    "request_headers": {"User-Agent": "ua"}}
+        store = PageStore(self.temp_dir.name)
+        store.put("https://torcrawl.com/a", b"body", response)
+        store.put("https://torcrawl.com/b", b"body")
+        store.touch("https://torcrawl.com/a")
+        self.assertEqual((b"body", response), store.get_record("https://torcrawl.com/a"))
+        self.assertEqual((b"body", None), store.get_record("https://torcrawl.com/b"))
+        self.assertEqual((None, None), store.get_record("https://torcrawl.com/c"))
+        store.close()
+
+    def test_index_without_responses_is_upgraded(self):
+        conn = sqlite3.connect(os.path.join(self.temp_dir.name, "index.db"))
+        conn.execute("CREATE TABLE pages (url TEXT PRIMARY KEY, digest TEXT, fetched REAL);")
+        conn.commit()
+        conn.close()
+
+        store = PageStore(self.temp_dir.name)
+        store.put("https://torcrawl.com/a", b"body", {"status": 200})
+        self.assertEqual({"status": 200}, store.get_record("https://torcrawl.com/a")[1])
+        store.close()
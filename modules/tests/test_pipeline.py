@@ -0,0 +1,81 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from urllib.error import URLError
+
+from modules.pipeline import run_pipeline
+
+
+class TestRunPipeline(unittest.TestCase):
+    def test_ordered_results_and_errors(self):
+        def fetch(item):
+            if item == 3:
+                raise URLError("unreachable")
+            # Later items finish first.
+            time.sleep(0.01 * (5 - item))
+            return item * 10
+
+        results = list(run_pipeline(range(5), fetch, lambda value: value + 1,
+                                    fetch_workers=4, scan_workers=2))
+
+        self.assertEqual([0, 1, 2, 3, 4], [item for item, _ in results])
+        self.assertEqual([(0, 1), (10, 11), (20, 21)],
+                         [future.result() for _, future in results[:3]])
+        self.assertIsInstance(results[3][1].exception(), URLError)
+        self.assertEqual((40, 41), results[4][1].result())
+
+    def test_unordered_results_come_as_done(self):
+        def fetch(item):
+            time.sleep(0.2 if item == 0 else 0)
+            return item
+
+        results = list(run_pipeline(range(3), fetch, fetch_workers=3, ordered=False))
+
+        self.assertEqual(0, results[-1][0])
+        self.assertEqual({0, 1, 2}, {future.result() for _, future in results})
+
+    def test_input_is_streamed_with_backpressure(self):
+        pulled = []
+
+        def items():
+            for item in range(100):
+                pulled.append(item)
+                yield item
+
+        results = run_pipeline(items(), lambda item: item, fetch_workers=2, max_pending=4)
+        next(results)
+        self.assertLessEqual(len(pulled), 4)
+        results.close()
+
+    def test_fetch_and_scan_overlap(self):
+        lock = threading.Lock()
+        active = {"fetch": 0, "scan": 0, "both": False}
+
+        def track(stage, delta):
+            with lock:
+                active[stage] += delta
+                if active["fetch"] and active["scan"]:
+                    active["both"] = True
+
+        def fetch(item):
+            track("fetch", 1)
+            time.sleep(0.02)
+            track("fetch", -1)
+            return item
+
+        def scan(value):
+            track("scan", 1)
+            time.sleep(0.02)
+            track("scan", -1)
+            return value
+
+        list(run_pipeline(range(6), fetch, scan, fetch_workers=2, scan_workers=2))
+        self.assertTrue(active["both"])
+
+    def test_scans_in_a_process_pool(self):
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            results = list(run_pipeline(["a", "bb"], str.upper, len, fetch_workers=2,
+                                        scan_executor=executor))
+
+        self.assertEqual([("A", 1), ("BB", 2)], [future.result() for _, future in results])
@@ -0,0 +1,53 @@
+import re
+import unittest
+
+from modules.scanner import PatternScanner
+
+_URL = r'(?:(?:https?|ftp|file):\/\/|www\.)[^\s"\'<>]+'
+_ONION = r'[a-z2-7]{16}\.onion'
+_PGP = r'-----BEGIN PGP PUBLIC KEY BLOCK-----'
+
+
+class TestPatternScanner(unittest.TestCase):
+    def test_single_pass_reports_the_matching_pattern(self):
+        scanner = PatternScanner([_URL, _ONION, _PGP])
+        text = ("Mirror: abcdefghijklmnop.onion, site http://torcrawl.com/a\n"
+                "-----BEGIN PGP PUBLIC KEY BLOCK-----")
+        self.assertEqual([(_ONION, "abcdefghijklmnop.onion"),
+                          (_URL, "http://torcrawl.com/a"),
+                          (_PGP, "-----BEGIN PGP PUBLIC KEY BLOCK-----")],
+                         list(scanner.scan(text)))
+
+    def test_overlapping_patterns_are_all_reported(self):
+        onion_v3 = r'[a-z2-7]{56}\.onion'
+        address = "a" * 56 + ".onion"
+        scanner = PatternScanner([_URL, onion_v3])
+        text = f"bare {address} and in a link http://{address}/page"
+        self.assertEqual([(onion_v3, address),
+                          (_URL, f"http://{address}/page"),
+                          (onion_v3, address)],
+                         list(scanner.scan(text)))
+
+    def test_overlapping_match_past_the_span_is_whole(self):
+        scanner = PatternScanner([_URL, r'onion/x \w+'])
+        self.assertEqual([(_URL, "http://abcdefghijklmnop.onion/x"),
+                          (r'onion/x \w+', "onion/x mirror")],
+                         list(scanner.scan("http://abcdefghijklmnop.onion/x mirror")))
+
+    def test_prefilter_skips_pages_without_candidates(self):
+        scanner = PatternScanner([_URL, _ONION, _PGP])
+        self.assertFalse(scanner.may_match("<p>Nothing to see here</p>"))
+        self.assertTrue(scanner.may_match("<p>WWW.TORCRAWL.COM</p>"))
+        self.assertEqual([], list(scanner.scan("<p>Nothing to see here</p>")))
+
+    def test_prefilter_is_disabled_without_required_literals(self):
+        scanner = PatternScanner([_URL, r'\b[13][a-km-zA-HJ-NP-Z1-9]{25,34}\b'])
+        self.assertTrue(scanner.may_match("<p>Nothing to see here</p>"))
+        matches = list(scanner.scan("BTC 1BoatSLRHtKNngkdXEeobR76b53LETtpyT"))
+        self.assertEqual(1, len(matches))
+
+    def test_backreferences_are_scanned_separately(self):
+        scanner = PatternScanner([r'(["\'])secret\1', _URL], re.IGNORECASE)
+        matches = list(scanner.scan("'secret' at https://torcrawl.com"))
+        self.assertIn((r'(["\'])secret\1', "'secret'"), matches)
+        self.assertIn((_URL, "https://torcrawl.com"), matches)
@@ -0,0 +1,55 @@
+import threading
+import time
+import unittest
+
+from modules.scheduler import HostScheduler
+
+
+class TestHostScheduler(unittest.TestCase):
+    def test_same_host_requests_are_spaced(self):
+        scheduler = HostScheduler(min_delay=0.2)
+        scheduler.acquire("a.onion")
+        started = time.monotonic()
+        scheduler.acquire("a.onion")
+        self.assertGreaterEqual(time.monotonic() - started, 0.15)
+
+    def test_other_hosts_are_not_blocked(self):
+        scheduler = HostScheduler(min_delay=5)
+        scheduler.acquire("a.onion")
+
+        # A waiter on the throttled host must not hold up other hosts.
+        waiter = threading.Thread(target=scheduler.acquire, args=("a.onion",), daemon=True)
+        waiter.start()
+        started = time.monotonic()
+        scheduler.acquire("b.onion")
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertTrue(waiter.is_alive())
+
+    def test_zero_delay_never_waits(self):
+        scheduler = HostScheduler(min_delay=0)
+        started = time.monotonic()
+        for _ in range(50):
+            scheduler.acquire("a.onion")
+        self.assertLess(time.monotonic() - started, 0.5)
+
+    def test_errors_back_off_and_successes_recover(self):
+        scheduler = HostScheduler(min_delay=1, max_delay=8)
+        scheduler.release("a.onion", error=True)
+        self.assertEqual(2, scheduler.delay("a.onion"))
+        scheduler.release("a.onion", error=True)
+        scheduler.release("a.onion", error=True)
+        scheduler.release("a.onion", error=True)
+        self.assertEqual(8, scheduler.delay("a.onion"))
+
+        for _ in range(10):
+            scheduler.release("a.onion", latency=0.1)
+        self.assertEqual(1, scheduler.delay("a.onion"))
+        self.assertEqual(1, scheduler.delay("b.onion"))
+
+    def test_latency_spike_backs_off(self):
+        scheduler = HostScheduler(min_delay=0, recovery=0.5)
+        scheduler.release("a.onion", latency=1.0)
+        scheduler.release("a.onion", latency=1.1)
+        self.assertEqual(0, scheduler.delay("a.onion"))
+        scheduler.release("a.onion", latency=5.0)
+        self.assertEqual(1.0, scheduler.delay("a.onion"))
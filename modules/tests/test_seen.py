@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+from modules.seen import BloomSeenStore, MemorySeenStore, SqliteSeenStore, open_seen_store
+
+
+class TestSeenStores(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def _check_exact(self, store):
+        self.assertTrue(store.add("https://torcrawl.com/a"))
+        self.assertFalse(store.add("https://torcrawl.com/a"))
+        self.assertTrue(store.add("images\thttps://torcrawl.com/a"))
+        self.assertIn("https://torcrawl.com/a", store)
+        self.assertNotIn("https://torcrawl.com/b", store)
+        self.assertEqual(2, len(store))
+
+    def test_memory_store(self):
+        self._check_exact(MemorySeenStore())
+
+    def test_sqlite_store(self):
+        path = os.path.join(self.temp_dir.name, 'seen.db')
+        store = SqliteSeenStore(path, batch_size=1)
+        self._check_exact(store)
+        store.close()
+
+        self.assertEqual(2, len(SqliteSeenStore(path, reset=False)))
+        self.assertEqual(0, len(SqliteSeenStore(path)))
+
+    def test_bloom_store_grows_and_keeps_error_rate(self):
+        store = BloomSeenStore(capacity=1000, error_rate=0.01)
+        added = sum(store.add(f"https://torcrawl.com/{index}") for index in range(5000))
+        # A false positive rejects a new key, within the error rate.
+        self.assertGreater(added, 4950)
+        self.assertGreater(len(store._filters), 1)
+        for index in range(5000):
+            self.assertIn(f"https://torcrawl.com/{index}", store)
+
+        false_positives = sum(f"https://other.onion/{index}" in store for index in range(10000))
+        self.assertLess(false_positives / 10000, 0.01)
+
+    def test_open_seen_store(self):
+        self.assertIsInstance(open_seen_store('memory'), MemorySeenStore)
+        self.assertIsInstance(open_seen_store('bloom', error_rate=0.1), BloomSeenStore)
+        store = open_seen_store('sqlite', self.temp_dir.name)
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir.name, 'seen.db')))
+        store.close()
+        with self.assertRaises(ValueError):
+            open_seen_store('lmdb')
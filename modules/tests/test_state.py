@@ -0,0 +1,54 @@
+import tempfile
+import unittest
+
+from modules.state import CrawlState
+
+
+class TestCrawlState(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def test_round_trip(self):
+        state = CrawlState(self.temp_dir.name)
+        state.begin("https://torcrawl.com")
+        state.add_page("https://torcrawl.com/a", 1)
+        state.add_page("https://torcrawl.com/a", 1)
+        state.add_edge("https://torcrawl.com", "https://torcrawl.com/a")
+        state.add_finding("images", "/logo.png", "https://torcrawl.com")
+        state.add_match("[a-z2-7]{16}\\.onion", "abcdefghijklmnop.onion")
+        state.page_done("https://torcrawl.com", 200, "Home")
+        state.close()
+
+        state = CrawlState(self.temp_dir.name, resume=True)
+        self.assertTrue(state.resumable("https://torcrawl.com"))
+        self.assertFalse(state.resumable("https://other.onion"))
+        self.assertEqual([("https://torcrawl.com", 0, 1, "Home"),
+                          ("https://torcrawl.com/a", 1, 0, None)], list(state.pages()))
+        self.assertEqual([("https://torcrawl.com", "https://torcrawl.com/a")], list(state.edges()))
+        self.assertEqual([("images", "/logo.png", "https://torcrawl.com")], list(state.findings()))
+        self.assertEqual(1, len(list(state.matches())))
+        state.close()
+
+        # Without resume the old state is ignored and replaced on begin().
+        state = CrawlState(self.temp_dir.name)
+        self.assertFalse(state.resumable("https://torcrawl.com"))
+        state.begin("https://torcrawl.com")
+        self.assertEqual([("https://torcrawl.com", 0, 0, None)], list(state.pages()))
+        state.close()
+
+    def test_commits_are_batched(self):
+        state = CrawlState(self.temp_dir.name, batch_size=3, interval=3600)
+        state.begin("https://torcrawl.com")
+        reader = CrawlState(self.temp_dir.name, resume=True)
+
+        for index in range(2):
+            state.add_page(f"https://torcrawl.com/{index}", 1)
+            state.page_done(f"https://torcrawl.com/{index}")
+        self.assertEqual(1, len(list(reader.pages())))
+
+        state.add_page("https://torcrawl.com/2", 1)
+        state.page_done("https://torcrawl.com/2")
+        self.assertEqual(4, len(list(reader.pages())))
+        reader.close()
+        state.close()
@@ -0,0 +1,618 @@
+import gzip
+import http.server
+import socketserver
+import threading
+import time
+import tracemalloc
+import unittest
+import zlib
+from urllib.error import HTTPError
+from unittest import mock
+
+from modules import transport
+from modules.scheduler import HostScheduler
+from modules.transport import ConnectionPool, ContentRejected, EndpointPool, SocksProxy, SocksTransport
+from modules.transport import configure_connections, fetch, transfer_stats
+from modules.transport import LatencyTracker, RequestPolicy, configure_requests
+from modules.transport import install_transport, open_url, parse_endpoints
+
+
+class _Socks5StandIn(socketserver.ThreadingTCPServer):
+    """ Minimal SOCKS5 server that records the credentials of every
+    connection and answers the tunnelled HTTP request itself. """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, body=b"hello"):
+        super().__init__(('127.0.0.1', 0), _Socks5Handler)
+        self.body = body
+        self.reply = 0
+        self.credentials = []
+        self.targets = []
+        self.lock = threading.Lock()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+class _Socks5Handler(socketserver.StreamRequestHandler):
+    def _read(self, size):
+        return self.rfile.read(size)
+
+    def handle(self):
+        _, n_methods = self._read(2)
+        methods = self._read(n_methods)
+        username = password = None
+        if 2 in methods:
+            self.wfile.write(b"\x05\x02")
+            _, ulen = self._read(2)
+            username = self._read(ulen).decode()
+            plen = self._read(1)[0]
+            password = self._read(plen).decode()
+            self.wfile.write(b"\x01\x00")
+        else:
+            self.wfile.write(b"\x05\x00")
+
+        _, _, _, atyp = self._read(4)
+        if atyp == 3:
+            host = self._read(self._read(1)[0]).decode()
+        else:
+            host = '.'.join(str(b) for b in self._read(4))
+        port = int.from_bytes(self._read(2), 'big')
+        with self.server.lock:
+            self.server.credentials.append((username, password))
+            self.server.targets.append((host, port))
+        self.wfile.write(bytes([5, self.server.reply]) + b"\x00\x01\x00\x00\x00\x00\x00\x00")
+        if self.server.reply:
+            return
+
+        while self.rfile.readline() not in (b"\r\n", b""):
+            pass
+        body = self.server.body
+        self.wfile.write(b"HTTP/1.1 200 OK\r\nContent-Length: " + str(len(body)).encode()
+                         + b"\r\nConnection: close\r\n\r\n" + body)
+
+
+class TestSocksTransport(unittest.TestCase):
+    def setUp(self):
+        self.server = _Socks5StandIn()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.addCleanup(install_transport, None)
+
+    def test_requests_are_tunnelled_with_remote_dns(self):
+        install_transport(SocksTransport([('127.0.0.1', self.server.port)]))
+        body = open_url("http://l0r3m1p5um.onion/page", timeout=5).read()
+
+        self.assertEqual(b"hello", body)
+        self.assertEqual([("l0r3m1p5um.onion", 80)], self.server.targets)
+        self.assertEqual([(None, None)], self.server.credentials)
+
+    def test_isolation_uses_distinct_credentials_per_worker(self):
+        socks_transport = SocksTransport([('127.0.0.1', self.server.port)], isolate=True)
+        install_transport(socks_transport)
+        barrier = threading.Barrier(3)
+
+        def worker():
+            barrier.wait()
+            for _ in range(2):
+                open_url("http://l0r3m1p5um.onion/", timeout=5).read()
+
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(6, len(self.server.credentials))
+        usernames = {user for user, _ in self.server.credentials}
+        passwords = {password for _, password in self.server.credentials}
+        self.assertEqual(3, len(usernames))
+        self.assertEqual(1, len(passwords))
+
+    def test_destination_failures_dont_eject_the_endpoint(self):
+        # 0x04: host unreachable, as TOR answers for a dead onion service.
+        self.server.reply = 4
+        socks_transport = SocksTransport(EndpointPool([('127.0.0.1', self.server.port)],
+                                                      max_failures=1))
+        for _ in range(3):
+            with self.assertRaises(transport.URLError):
+                socks_transport.urlopen("http://l0r3m1p5um.onion/", timeout=5)
+        self.assertEqual(1, len(socks_transport.pool.healthy()))
+
+    def test_unreachable_endpoint_is_ejected(self):
+        closed = socketserver.TCPServer(('127.0.0.1', 0), socketserver.BaseRequestHandler)
+        port = closed.server_address[1]
+        closed.server_close()
+        socks_transport = SocksTransport(EndpointPool([('127.0.0.1', port)], max_failures=1))
+        with self.assertRaises(transport.URLError):
+            socks_transport.urlopen("http://l0r3m1p5um.onion/", timeout=5)
+        self.assertEqual([], socks_transport.pool.healthy())
+
+    def test_open_url_without_transport_fetches_directly(self):
+        install_transport(None)
+        with mock.patch.object(transport, "fetch") as fetch_mock:
+            open_url("http://example.com")
+        fetch_mock.assert_called_once_with("http://example.com", timeout=mock.ANY,
+                                           deadline=mock.ANY)
+
+
+class TestEndpointPool(unittest.TestCase):
+    A = SocksProxy('127.0.0.1', 9050)
+    B = SocksProxy('127.0.0.1', 9052)
+
+    def test_parse_endpoints(self):
+        self.assertEqual([self.A, self.B],
+                         parse_endpoints("127.0.0.1:9050, 127.0.0.1:9052"))
+        with self.assertRaises(ValueError):
+            parse_endpoints("127.0.0.1")
+
+    def test_least_outstanding_then_lowest_latency(self):
+        pool = EndpointPool([self.A, self.B])
+        first = pool.acquire()
+        second = pool.acquire()
+        self.assertEqual({self.A, self.B}, {first, second})
+
+        pool.release(self.A, latency=2.0)
+        pool.release(self.B, latency=0.5)
+        self.assertEqual(self.B, pool.acquire())
+        self.assertEqual(self.A, pool.acquire())
+
+    def test_failing_endpoint_is_ejected_and_health_checked_back(self):
+        now = [0.0]
+        probes = []
+
+        def health_check(endpoint):
+            probes.append(endpoint)
+            return True
+
+        pool = EndpointPool([self.A, self.B], max_failures=2, cooldown=10,
+                            health_check=health_check, clock=lambda: now[0])
+        for _ in range(2):
+            pool.acquire(exclude=[self.B])
+            pool.release(self.A, error=True)
+        self.assertEqual([self.B], pool.healthy())
+        self.assertEqual(self.B, pool.acquire())
+        self.assertEqual(self.B, pool.acquire())
+        self.assertEqual([], probes)
+
+        now[0] = 11.0
+        pool.acquire()
+        self.assertEqual([self.A], probes)
+        self.assertEqual([self.A, self.B], pool.healthy())
+
+    def test_transport_spreads_requests_over_endpoints(self):
+        servers = [_Socks5StandIn(), _Socks5StandIn()]
+        for server in servers:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.addCleanup(server.server_close)
+            self.addCleanup(server.shutdown)
+        self.addCleanup(install_transport, None)
+
+        install_transport(SocksTransport([('127.0.0.1', s.port) for s in servers]))
+        barrier = threading.Barrier(4)
+
+        def worker():
+            barrier.wait()
+            open_url("http://l0r3m1p5um.onion/", timeout=5).read()
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(all(server.targets for server in servers))
+        self.assertEqual(4, sum(len(server.targets) for server in servers))
+
+    def test_weighted_strategy_prefers_fast_endpoints_and_evicts_dead_ones(self):
+        pool = EndpointPool([self.A, self.B], max_failures=1, cooldown=None,
+                            strategy='weighted')
+        pool.release(pool.acquire(exclude=[self.B]), latency=0.1)
+        pool.release(pool.acquire(exclude=[self.A]), latency=10.0)
+        picks = [pool.acquire() for _ in range(200)]
+        self.assertGreater(picks.count(self.A), picks.count(self.B) * 5)
+
+        pool.release(self.A, error=True)
+        self.assertEqual([self.B], pool.healthy())
+        self.assertTrue(all(pool.acquire() == self.B for _ in range(20)))
+
+
+class _KeepAliveHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        if self.path in ("/archive", "/big"):
+            body = b"x" * 200000
+            self.send_response(200)
+            content_type = "application/zip" if self.path == "/archive" else "text/html; charset=utf-8"
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if self.path == "/moved":
+            self.send_response(302)
+            self.send_header("Location", "/page")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        status = 404 if self.path == "/missing" else 200
+        body = f"path={self.path}".encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _start_http_server(handler):
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    server.connections = 0
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.server = _start_http_server(_KeepAliveHandler)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        configure_connections()
+        self.addCleanup(configure_connections)
+
+    def test_keep_alive_connection_is_reused(self):
+        for index in range(5):
+            response = fetch(f"{self.base}/page{index}", timeout=5)
+            self.assertEqual(200, response.status)
+            self.assertEqual(f"path=/page{index}".encode(), response.read())
+        self.assertEqual(1, self.server.connections)
+
+    def test_redirects_and_http_errors(self):
+        response = fetch(f"{self.base}/moved", timeout=5)
+        self.assertEqual(f"{self.base}/page", response.url)
+        self.assertEqual(b"path=/page", response.read())
+
+        with self.assertRaises(HTTPError) as ctx:
+            fetch(f"{self.base}/missing", timeout=5)
+        self.assertEqual(404, ctx.exception.code)
+        self.assertEqual(1, self.server.connections)
+
+    def test_unaccepted_content_type_is_rejected_unread(self):
+        with self.assertRaises(ContentRejected) as ctx:
+            fetch(f"{self.base}/archive", timeout=5, accept_types=("text/html",))
+        self.assertIn("application/zip", str(ctx.exception.reason))
+
+        response = fetch(f"{self.base}/big", timeout=5, accept_types=("text/html",))
+        self.assertFalse(response.truncated)
+        self.assertEqual(200000, len(response.read()))
+
+    def test_body_is_truncated_at_max_bytes(self):
+        response = fetch(f"{self.base}/big", timeout=5, max_bytes=1000)
+        self.assertTrue(response.truncated)
+        self.assertEqual(1000, len(response.read()))
+
+        # The half-read connection is discarded rather than reused.
+        self.assertEqual(b"path=/after", fetch(f"{self.base}/after", timeout=5).read())
+        self.assertEqual(2, self.server.connections)
+
+    def test_idle_connections_are_evicted(self):
+        configure_connections(idle_timeout=0.05)
+        fetch(f"{self.base}/a", timeout=5)
+        time.sleep(0.1)
+        fetch(f"{self.base}/b", timeout=5)
+        self.assertEqual(2, self.server.connections)
+
+    def test_connections_per_host_are_capped(self):
+        pool = ConnectionPool(max_per_host=1)
+        key = ('http', '127.0.0.1', self.server.server_address[1], None)
+        first, _ = pool.get(key, 5)
+        acquired = threading.Event()
+
+        def second():
+            connection, _ = pool.get(key, 5)
+            acquired.set()
+            pool.put(key, connection)
+
+        thread = threading.Thread(target=second, daemon=True)
+        thread.start()
+        self.assertFalse(acquired.wait(0.2))
+        pool.put(key, first)
+        self.assertTrue(acquired.wait(2))
+        thread.join()
+
+
+_bomb = []
+
+
+def _gzip_bomb():
+    """ About 50 KB of gzip that inflates to 50 MB. """
+    if not _bomb:
+        _bomb.append(gzip.compress(b"\0" * (50 * 1024 * 1024)))
+    return _bomb[0]
+
+
+class _CompressingHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    page = b"<html>" + b"<p>onion mirror listing</p>" * 400 + b"</html>"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        encoding = self.path.strip('/')
+        self.server.accept_encoding = self.headers.get('Accept-Encoding')
+        if encoding == 'gzip':
+            body = gzip.compress(self.page)
+        elif encoding == 'deflate':
+            body = zlib.compress(self.page)
+        elif encoding == 'raw-deflate':
+            compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+            body = compressor.compress(self.page) + compressor.flush()
+            encoding = 'deflate'
+        elif encoding == 'br':
+            body = transport.brotli.compress(self.page)
+        elif encoding == 'bomb':
+            body = _gzip_bomb()
+            encoding = 'gzip'
+        elif encoding == 'corrupt-br':
+            body = b"not a brotli stream" * 10
+            encoding = 'br'
+        else:
+            body = self.page
+            encoding = None
+        self.send_response(200)
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TestContentEncoding(unittest.TestCase):
+    def setUp(self):
+        self.server = _start_http_server(_CompressingHandler)
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        configure_connections()
+        self.addCleanup(configure_connections)
+
+    def _assert_decoded(self, encoding):
+        wire_before = transfer_stats.wire_bytes
+        decoded_before = transfer_stats.decoded_bytes
+        body = fetch(f"{self.base}/{encoding}", timeout=5).read()
+
+        self.assertEqual(_CompressingHandler.page, body)
+        wire = transfer_stats.wire_bytes - wire_before
+        decoded = transfer_stats.decoded_bytes - decoded_before
+        self.assertEqual(len(_CompressingHandler.page), decoded)
+        return wire
+
+    def test_gzip_and_deflate_are_decoded(self):
+        for encoding in ('gzip', 'deflate', 'raw-deflate'):
+            wire = self._assert_decoded(encoding)
+            self.assertLess(wire, len(_CompressingHandler.page) / 10)
+        self.assertIn('gzip', self.server.accept_encoding)
+
+    def test_identity_counts_same_bytes(self):
+        wire = self._assert_decoded('identity')
+        self.assertEqual(len(_CompressingHandler.page), wire)
+
+    @unittest.skipIf(transport.brotli is None, "brotli is not installed")
+    def test_brotli_is_decoded(self):
+        wire = self._assert_decoded('br')
+        self.assertLess(wire, len(_CompressingHandler.page) / 10)
+        self.assertIn('br', self.server.accept_encoding)
+
+    def test_compressed_body_is_not_inflated_past_the_cap(self):
+        _gzip_bomb()
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+        response = fetch(f"{self.base}/bomb", timeout=5, max_bytes=1024 * 1024)
+        _, peak = tracemalloc.get_traced_memory()
+
+        self.assertTrue(response.truncated)
+        self.assertEqual(1024 * 1024, len(response.read()))
+        self.assertLess(peak, 8 * 1024 * 1024)
+
+    @unittest.skipIf(transport.brotli is None, "brotli is not installed")
+    def test_brotli_body_is_not_inflated_past_the_cap(self):
+        decoder = transport._BrotliDecoder()
+        bomb = transport.brotli.compress(b"\0" * (20 * 1024 * 1024))
+        self.assertLess(len(decoder.decompress(bomb, 1024 * 1024)), 2 * 1024 * 1024)
+
+
+    @unittest.skipIf(transport.brotli is None, "brotli is not installed")
+    def test_corrupt_body_raises_url_error_and_frees_the_slot(self):
+        configure_connections(max_per_host=1)
+        with self.assertRaises(transport.URLError):
+            fetch(f"{self.base}/corrupt-br", timeout=5)
+
+        # The only connection slot of the host must be free again.
+        bodies = []
+        thread = threading.Thread(
+            target=lambda: bodies.append(fetch(f"{self.base}/identity", timeout=5).read()),
+            daemon=True)
+        thread.start()
+        thread.join(5)
+        self.assertEqual([_CompressingHandler.page], bodies)
+
+
+class _SlowHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"ok"):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.hits[self.path] = self.server.hits.get(self.path, 0) + 1
+            hits = self.server.hits[self.path]
+        if self.path == "/flaky":
+            self._send(503 if hits <= 2 else 200)
+        elif self.path == "/missing":
+            self._send(404)
+        elif self.path == "/slow":
+            time.sleep(1)
+            self._send(200)
+        elif self.path == "/drip":
+            self.send_response(200)
+            self.send_header("Content-Length", "10")
+            self.end_headers()
+            for _ in range(10):
+                self.wfile.write(b"x")
+                self.wfile.flush()
+                time.sleep(0.1)
+        elif self.path == "/hedge":
+            # Only the first (primary) request hangs on a "slow circuit".
+            if hits == 1:
+                time.sleep(2)
+            self._send(200, f"answer-{hits}".encode())
+        else:
+            self._send(200)
+
+
+class TestRequestPolicy(unittest.TestCase):
+    def setUp(self):
+        self.server = _start_http_server(_SlowHandler)
+        self.server.hits = {}
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        configure_connections()
+        self.addCleanup(configure_connections)
+        self.addCleanup(configure_requests, RequestPolicy())
+        install_transport(None)
+
+    def test_transient_errors_are_retried_with_backoff(self):
+        configure_requests(RequestPolicy(retries=2, backoff=0.01))
+        self.assertEqual(b"ok", open_url(f"{self.base}/flaky").read())
+        self.assertEqual(3, self.server.hits["/flaky"])
+
+    def test_retries_wait_for_the_host_scheduler(self):
+        configure_requests(RequestPolicy(retries=2, backoff=0.01))
+        scheduler = HostScheduler(min_delay=0.1)
+        host = f"127.0.0.1:{self.server.server_address[1]}"
+        scheduler.acquire(host)
+        started = time.monotonic()
+        self.assertEqual(b"ok", open_url(f"{self.base}/flaky", scheduler=scheduler).read())
+        scheduler.release(host)
+        # Each 503 doubled the host's delay: 0.2 s, then 0.4 s.
+        self.assertGreaterEqual(time.monotonic() - started, 0.55)
+        self.assertEqual(3, self.server.hits["/flaky"])
+        self.assertAlmostEqual(0.3, scheduler.delay(host))
+
+    def test_client_errors_are_not_retried(self):
+        configure_requests(RequestPolicy(retries=3, backoff=0.01))
+        with self.assertRaises(HTTPError):
+            open_url(f"{self.base}/missing")
+        self.assertEqual(1, self.server.hits["/missing"])
+
+    def test_read_timeout(self):
+        configure_requests(RequestPolicy(read_timeout=0.2, retries=0))
+        started = time.monotonic()
+        with self.assertRaises(transport.URLError):
+            open_url(f"{self.base}/slow")
+        self.assertLess(time.monotonic() - started, 0.9)
+
+    def test_total_deadline(self):
+        # A byte every 100 ms never trips the read timeout.
+        configure_requests(RequestPolicy(read_timeout=5, total_timeout=0.3, retries=3,
+                                         backoff=0.01))
+        started = time.monotonic()
+        with self.assertRaises(transport.URLError):
+            open_url(f"{self.base}/drip")
+        self.assertLess(time.monotonic() - started, 0.6)
+        # Once the deadline has passed nothing is retried.
+        self.assertEqual(1, self.server.hits["/drip"])
+
+    def test_slow_request_is_hedged(self):
+        configure_requests(RequestPolicy(hedge=True, retries=0))
+        host = f"127.0.0.1:{self.server.server_address[1]}"
+        latencies = LatencyTracker()
+        for _ in range(10):
+            latencies.add(host, 0.05)
+
+        with mock.patch.object(transport, "_latencies", latencies):
+            started = time.monotonic()
+            body = open_url(f"{self.base}/hedge").read()
+
+        self.assertEqual(b"answer-2", body)
+        self.assertLess(time.monotonic() - started, 1.5)
+        self.assertEqual(2, self.server.hits["/hedge"])
+
+    def test_losing_request_is_abandoned_on_a_daemon_thread(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        threads = []
+
+        def send(transport_, url, timeout, options, credentials=None, endpoint=None):
+            threads.append(threading.current_thread())
+            if len(threads) == 1:
+                release.wait(5)
+                return "primary"
+            return "hedge"
+
+        with mock.patch.object(transport, "_send", side_effect=send):
+            self.assertEqual("hedge", transport._hedged_send(None, "http://a.onion", 5, {}, 0.05))
+        # The primary is still running, and won't hold up the exit.
+        self.assertTrue(threads[0].is_alive())
+        self.assertTrue(all(thread.daemon for thread in threads))
+
+    def test_hedge_goes_to_another_endpoint(self):
+        fast, slow = SocksProxy('127.0.0.1', 9050), SocksProxy('127.0.0.1', 9052)
+        pool = EndpointPool([fast, slow], strategy='weighted')
+        pool.release(pool.acquire(exclude=[slow]), latency=0.01)
+        pool.release(pool.acquire(exclude=[fast]), latency=100.0)
+        ports = []
+
+        def fake_fetch(url, timeout=None, proxy=None, **options):
+            ports.append(proxy.port)
+            if len(ports) == 1:
+                time.sleep(0.5)
+            return f"answer-{len(ports)}"
+
+        with mock.patch.object(transport, "fetch", side_effect=fake_fetch):
+            answer = transport._hedged_send(SocksTransport(pool), "http://a.onion", 5, {}, 0.05)
+        self.assertEqual("answer-2", answer)
+        self.assertEqual(2, len(set(ports)))
+
+    def test_hedge_installs_a_socks_transport_for_plain_tor(self):
+        import torcrawl
+
+        with mock.patch.object(torcrawl, "install_transport") as install_mock, \
+                mock.patch.object(torcrawl.socks, "setdefaultproxy") as default_mock:
+            torcrawl.connect_tor("127.0.0.1", 9050, hedge=True)
+        socks_transport = install_mock.call_args.args[0]
+        self.assertIsInstance(socks_transport, SocksTransport)
+        self.assertEqual([SocksProxy('127.0.0.1', 9050)], socks_transport.pool.endpoints)
+        # The duplicate authenticates onto another circuit than the primary.
+        self.assertNotEqual(socks_transport.credentials(),
+                            socks_transport.credentials(hedge=True))
+        default_mock.assert_not_called()
+
+    def test_latency_tracker_p95(self):
+        latencies = LatencyTracker(min_samples=5)
+        self.assertIsNone(latencies.p95("a.onion"))
+        for latency in range(1, 21):
+            latencies.add("a.onion", float(latency))
+        self.assertEqual(19.0, latencies.p95("a.onion"))
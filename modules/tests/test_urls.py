@@ -0,0 +1,64 @@
+import unittest
+
+from modules.urls import URL, EdgeList, ResourceIndex, URLTable, parse_url
+
+
+class TestURL(unittest.TestCase):
+    def test_parsed_forms(self):
+        url = URL("HTTP://WWW.TorCrawl.com/Res/Logo.PNG?v=1#top")
+        self.assertTrue(url.valid)
+        self.assertEqual("http", url.scheme)
+        self.assertEqual("www.torcrawl.com", url.netloc)
+        self.assertEqual("torcrawl.com", url.domain)
+        self.assertEqual("png", url.extension)
+        self.assertEqual("http://torcrawl.com/Res/Logo.PNG?v=1#top", url.normalized)
+
+    def test_relative_and_extensionless_links(self):
+        self.assertEqual("js", URL("static/app.js?v=2").extension)
+        self.assertEqual("", URL("/archive.d/").extension)
+        self.assertEqual("", URL("/about").domain)
+
+    def test_malformed_url(self):
+        url = URL("http://[::1/page.pdf")
+        self.assertFalse(url.valid)
+        self.assertEqual("pdf", url.extension)
+        self.assertEqual("http://[::1/page.pdf", url.normalized)
+
+    def test_parse_url_is_memoized(self):
+        self.assertIs(parse_url("https://torcrawl.com/a"), parse_url("https://torcrawl.com/a"))
+        with self.assertRaises(AttributeError):
+            parse_url("https://torcrawl.com/a").title = "slots only"
+
+
+class TestURLTable(unittest.TestCase):
+    def test_intern_round_trip(self):
+        table = URLTable()
+        first = table.intern("https://torcrawl.com/a")
+        self.assertEqual(first, table.intern("https://torcrawl.com/" + "a"))
+        self.assertNotEqual(first, table.intern("https://torcrawl.com/b"))
+        self.assertEqual("https://torcrawl.com/a", table.url(first))
+        self.assertIn("https://torcrawl.com/b", table)
+        self.assertEqual(2, len(table))
+
+    def test_edges_are_packed_id_pairs(self):
+        table = URLTable()
+        edges = EdgeList(table)
+        edges.add(("https://torcrawl.com", "https://torcrawl.com/a"))
+        edges.add(("https://torcrawl.com", "https://torcrawl.com/a"))
+        edges.add(("https://torcrawl.com", "https://torcrawl.com/b"))
+        edges.add(("https://torcrawl.com/a", "https://torcrawl.com"))
+        self.assertEqual(3, len(edges))
+        self.assertEqual("I", edges._pairs.typecode)
+        self.assertEqual({("https://torcrawl.com", "https://torcrawl.com/a"),
+                          ("https://torcrawl.com", "https://torcrawl.com/b"),
+                          ("https://torcrawl.com/a", "https://torcrawl.com")}, set(edges))
+
+    def test_resources_export_as_strings(self):
+        table = URLTable()
+        images = ResourceIndex(table)
+        images.add("https://torcrawl.com", "/b.png")
+        images.add("https://torcrawl.com", "/a.png")
+        images.add("https://torcrawl.com", "/b.png")
+        images.add("https://torcrawl.com/x", "/a.png")
+        self.assertEqual({"https://torcrawl.com": ["/a.png", "/b.png"],
+                          "https://torcrawl.com/x": ["/a.png"]}, images.export())
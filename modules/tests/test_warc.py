@@ -0,0 +1,90 @@
+import datetime
+import gzip
+import os
+import tempfile
+import unittest
+
+from modules.warc import CDX_HEADER, WarcWriter, surt
+
+
+def _clock(tz=None):
+    return datetime.datetime(2026, 10, 18, 12, 30, 5, tzinfo=tz)
+
+
+def _read_record(path, offset, length):
+    with open(path, 'rb') as warc_file:
+        warc_file.seek(offset)
+        return gzip.decompress(warc_file.read(length))
+
+
+class TestWarcWriter(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.path = self.temp_dir.name
+
+    def _cdx(self):
+        with open(os.path.join(self.path, "pages.cdx"), encoding="UTF-8") as cdx_file:
+            return cdx_file.readlines()
+
+    def test_surt(self):
+        self.assertEqual("com,torcrawl)/a/b?x=1", surt("http://www.TorCrawl.com/a/b?x=1"))
+        self.assertEqual("onion,abc)/", surt("http://abc.onion"))
+
+    def test_response_and_request_records(self):
+        writer = WarcWriter(self.path, "pages", clock=_clock)
+        name = writer.write_response(
+            "http://torcrawl.com/a?x=1", 200, "OK",
+            [("Content-Type", "text/html; charset=utf-8"), ("Content-Encoding", "gzip"),
+             ("Content-Length", "3")],
+            b"<p>hello</p>", {"User-Agent": "ua"})
+        writer.close()
+
+        self.assertEqual("pages-00000.warc.gz", name)
+        with gzip.open(os.path.join(self.path, name), 'rb') as warc_file:
+            data = warc_file.read()
+        self.assertEqual(3, data.count(b"WARC/1.1\r\n"))
+        self.assertIn(b"WARC-Type: warcinfo\r\n", data)
+        self.assertIn(b"WARC-Date: 2026-10-18T12:30:05Z\r\n", data)
+        self.assertIn(b"HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n"
+                      b"Content-Length: 12\r\n\r\n<p>hello</p>", data)
+        self.assertNotIn(b"Content-Encoding", data)
+        self.assertIn(b"GET /a?x=1 HTTP/1.1\r\nHost: torcrawl.com\r\nUser-Agent: ua\r\n", data)
+        self.assertIn(b"WARC-Concurrent-To: <urn:uuid:", data)
+
+        lines = self._cdx()
+        self.assertEqual(CDX_HEADER, lines[0])
+        fields = lines[1].split()
+        self.assertEqual(["com,torcrawl)/a?x=1", "20261018123005", "http://torcrawl.com/a?x=1",
+                          "text/html", "200"], fields[:5])
+        self.assertEqual(name, fields[10])
+        record = _read_record(os.path.join(self.path, name), int(fields[9]), int(fields[8]))
+        self.assertTrue(record.startswith(b"WARC/1.1\r\nWARC-Type: response\r\n"))
+        self.assertTrue(record.endswith(b"<p>hello</p>\r\n\r\n"))
+
+    def test_rotation_and_sorted_index(self):
+        writer = WarcWriter(self.path, "pages", max_size=1, clock=_clock)
+        names = [writer.write_resource(f"http://torcrawl.com/{page}", b"body " + page.encode())
+                 for page in ("c", "a", "b")]
+        writer.close()
+
+        self.assertEqual(["pages-00000.warc.gz", "pages-00001.warc.gz", "pages-00002.warc.gz"],
+                         names)
+        lines = self._cdx()
+        keys = [line.split()[0] for line in lines[1:]]
+        self.assertEqual(["com,torcrawl)/a", "com,torcrawl)/b", "com,torcrawl)/c"], keys)
+        for line in lines[1:]:
+            fields = line.split()
+            record = _read_record(os.path.join(self.path, fields[10]),
+                                  int(fields[9]), int(fields[8]))
+            self.assertIn(b"WARC-Type: resource\r\n", record)
+            self.assertIn(f"WARC-Target-URI: {fields[2]}".encode(), record)
+
+        # A second run continues the numbering and keeps one index.
+        writer = WarcWriter(self.path, "pages", clock=_clock)
+        self.assertEqual("pages-00003.warc.gz",
+                         writer.write_resource("http://torcrawl.com/d", b"d"))
+        writer.close()
+        lines = self._cdx()
+        self.assertEqual(1, lines.count(CDX_HEADER))
+        self.assertEqual(5, len(lines))
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import time
+import unittest
+
+from modules.writer import BufferedWriter
+
+
+def _read(path):
+    if not os.path.exists(path):
+        return ''
+    with open(path, encoding='UTF-8') as file:
+        return file.read()
+
+
+class TestBufferedWriter(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.path = os.path.join(self.temp_dir.name, 'out.txt')
+
+    def test_lines_are_batched_until_size_threshold(self):
+        writer = BufferedWriter(max_lines=3, interval=3600)
+        self.addCleanup(writer.close)
+        writer.write(self.path, 'a\n')
+        writer.write(self.path, 'b\n')
+        self.assertEqual('', _read(self.path))
+        writer.write(self.path, 'c\n')
+        self.assertEqual('a\nb\nc\n', _read(self.path))
+
+    def test_time_threshold_flushes(self):
+        now = [0.0]
+        writer = BufferedWriter(max_lines=100, interval=5, clock=lambda: now[0])
+        self.addCleanup(writer.close)
+        writer.write(self.path, 'a\n')
+        now[0] = 6.0
+        writer.write(self.path, 'b\n')
+        self.assertEqual('a\nb\n', _read(self.path))
+
+    def test_one_handle_per_file_and_close_flushes(self):
+        other = os.path.join(self.temp_dir.name, 'other.txt')
+        writer = BufferedWriter(max_lines=100, interval=3600)
+        for index in range(50):
+            writer.write(self.path, f'{index}\n')
+            writer.write(other, f'{index}\n')
+        self.assertEqual(2, len(writer._files))
+        writer.close()
+        self.assertEqual(50, len(_read(self.path).splitlines()))
+        self.assertEqual(50, len(_read(other).splitlines()))
+        self.assertEqual({}, writer._files)
+
+        # The writer stays usable and appends after a close.
+        writer.write(self.path, 'again\n')
+        writer.close()
+        self.assertTrue(_read(self.path).endswith('49\nagain\n'))
+
+    def test_open_errors_reach_the_caller(self):
+        writer = BufferedWriter()
+        with self.assertRaises(OSError):
+            writer.write(os.path.join(self.temp_dir.name, 'missing', 'x.txt'), 'a\n')
+
+    def test_background_writes(self):
+        writer = BufferedWriter(max_lines=2, interval=3600, background=True)
+        self.addCleanup(writer.close)
+        writer.write(self.path, 'a\n')
+        writer.write(self.path, 'b\n')
+        deadline = time.monotonic() + 2
+        while _read(self.path) != 'a\nb\n' and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual('a\nb\n', _read(self.path))
+        writer.write(self.path, 'c\n')
+        writer.close()
+        self.assertEqual('a\nb\nc\n', _read(self.path))
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+
+import yara
+
+from modules import yararules
+from modules.yararules import YaraRules, configure_rules, get_rules, page_score, rule_files
+
+RULE = 'rule %s { strings: $a = "%s" condition: $a }'
+
+
+class TestYaraRules(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.addCleanup(configure_rules, None)
+        self.addCleanup(yararules._rules_cache.clear)
+
+    def _write(self, name, content):
+        path = os.path.join(self.temp_dir.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='UTF-8') as rule_file:
+            rule_file.write(content)
+        return path
+
+    def test_compiled_once_and_reloaded_on_change(self):
+        path = self._write('one.yar', RULE % ('first', 'alpha'))
+        clock = [0.0]
+        rules = YaraRules([path], check_interval=10, clock=lambda: clock[0])
+
+        self.assertEqual(['first'], [match.rule for match in rules.match(b'alpha')])
+        self.assertEqual([], rules.match(b'beta'))
+        self.assertEqual(1, rules.compilations)
+
+        # Touching the file without changing it doesn't recompile.
+        os.utime(path, ns=(1, 1))
+        clock[0] = 20.0
+        rules.match(b'alpha')
+        self.assertEqual(1, rules.compilations)
+
+        self._write('one.yar', RULE % ('second', 'beta'))
+        # Not checked again before the interval is over.
+        clock[0] = 25.0
+        self.assertEqual([], rules.match(b'beta'))
+        clock[0] = 30.0
+        self.assertEqual(['second'], [match.rule for match in rules.match(b'beta')])
+        self.assertEqual(2, rules.compilations)
+
+    def test_folders_and_precompiled_bundles(self):
+        self._write('rules/a.yar', RULE % ('in_a', 'alpha'))
+        self._write('rules/nested/b.yara', RULE % ('in_b', 'beta'))
+        self._write('rules/readme.txt', 'not a rule')
+        bundle = os.path.join(self.temp_dir.name, 'bundle.yarc')
+        yara.compile(source=RULE % ('in_bundle', 'gamma')).save(bundle)
+
+        sources = [os.path.join(self.temp_dir.name, 'rules'), bundle]
+        self.assertEqual(3, len(rule_files(sources)))
+        rules = YaraRules(sources)
+        found = {match.rule for match in rules.match(b'alpha beta gamma')}
+        self.assertEqual({'in_a', 'in_b', 'in_bundle'}, found)
+
+    def test_get_rules_is_shared_per_sources(self):
+        path = self._write('one.yar', RULE % ('first', 'alpha'))
+        configure_rules([path])
+        self.assertIs(get_rules(), get_rules([path]))
+        self.assertEqual(['first'], [match.rule for match in get_rules().match(b'alpha')])
+        self.assertIsNot(get_rules(), get_rules([self._write('two.yar', RULE % ('x', 'y'))]))
+
+    def test_match_details_and_page_score(self):
+        path = self._write('scored.yar', 'rule high : kw { meta: score = 90 strings: $a = "alpha" '
+                                         'condition: $a } '
+                                         'rule low { meta: score = 20 strings: $b = "beta" '
+                                         'condition: $b } '
+                                         'rule unscored { strings: $c = "alpha" condition: $c }')
+        matches = [yararules.match_details(match)
+                   for match in YaraRules([path]).match(b'alpha beta alpha')]
+
+        high = next(match for match in matches if match["rule"] == "high")
+        self.assertEqual(["kw"], high["tags"])
+        self.assertEqual({"score": 90}, high["meta"])
+        self.assertEqual([0, 11], [string["offset"] for string in high["strings"]])
+        self.assertEqual(110, page_score(matches))
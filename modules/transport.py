@@ -0,0 +1,936 @@
+#!/usr/bin/python
+import http.client
+import io
+import itertools
+import random
+import secrets
+import socket
+import sys
+import threading
+import time
+import urllib.request
+import zlib
+from collections import defaultdict, deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from urllib.error import HTTPError, URLError
+from urllib.parse import urljoin, urlsplit
+
+import socks  # noqa - pysocks
+
+try:
+    import brotli  # optional - only advertised when installed
+except ImportError:
+    brotli = None
+else:
+    # brotli < 1.2 can't cap its output, so one small brotli body could
+    # inflate to gigabytes; br isn't asked for then.
+    if not hasattr(brotli.Decompressor, 'can_accept_more_data'):
+        brotli = None
+
+# Errors raised by the content decoders on a corrupt body.
+_DECODE_ERRORS = (zlib.error,) if brotli is None else (zlib.error, brotli.error)
+
+SocksProxy = namedtuple('SocksProxy', ['host', 'port', 'username', 'password'],
+                        defaults=(None, None))
+
+
+class SocksHTTPConnection(http.client.HTTPConnection):
+    """ HTTPConnection that connects through its own SOCKS5 proxy. """
+
+    def __init__(self, *args, proxy=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.proxy = proxy
+
+    def connect(self):
+        self.sock = socks.create_connection(
+            (self.host, self.port), self.timeout, self.source_address,
+            proxy_type=socks.PROXY_TYPE_SOCKS5,
+            proxy_addr=self.proxy.host,
+            proxy_port=int(self.proxy.port),
+            proxy_rdns=True,
+            proxy_username=self.proxy.username,
+            proxy_password=self.proxy.password)
+
+
+class SocksHTTPSConnection(http.client.HTTPSConnection):
+    """ HTTPSConnection that connects through its own SOCKS5 proxy. """
+
+    def __init__(self, *args, proxy=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.proxy = proxy
+
+    def connect(self):
+        sock = socks.create_connection(
+            (self.host, self.port), self.timeout, self.source_address,
+            proxy_type=socks.PROXY_TYPE_SOCKS5,
+            proxy_addr=self.proxy.host,
+            proxy_port=int(self.proxy.port),
+            proxy_rdns=True,
+            proxy_username=self.proxy.username,
+            proxy_password=self.proxy.password)
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+
+
+def parse_endpoints(value):
+    """ Parses a comma separated list of SOCKS5 endpoints.
+
+    :param value: String - Endpoints in "host:port,host:port" format.
+    :return: List of SocksProxy.
+    """
+    endpoints = []
+    for item in str(value).split(','):
+        item = item.strip()
+        if not item:
+            continue
+        host, sep, port = item.rpartition(':')
+        if not sep or not host or not port.isdigit():
+            raise ValueError(f"invalid SOCKS endpoint '{item}', expected host:port")
+        endpoints.append(SocksProxy(host, int(port)))
+    if not endpoints:
+        raise ValueError("no SOCKS endpoint given")
+    return endpoints
+
+
+def _probe_endpoint(endpoint, timeout=5):
+    """ Health check: whether the endpoint accepts TCP connections. """
+    try:
+        with socket.create_connection((endpoint.host, int(endpoint.port)), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def _is_proxy_failure(err):
+    """ Whether a failed request means the SOCKS endpoint itself failed:
+    it couldn't be reached, refused our credentials or broke the protocol.
+    Errors about the destination (SOCKS replies such as "host
+    unreachable", timeouts while waiting for it) say nothing about the
+    endpoint and don't count against it.
+    """
+    reason = err.reason if isinstance(err, URLError) else err
+    if not isinstance(reason, socks.ProxyError):
+        return False
+    # PySocks wraps whatever went wrong during negotiation, replies included.
+    while isinstance(reason, socks.GeneralProxyError) and reason.socket_err is not None:
+        reason = reason.socket_err
+    # TOR answers CONNECT only once the destination is reached, or not.
+    return not isinstance(reason, (socks.SOCKS5Error, socket.timeout))
+
+
+class _EndpointStats:
+    __slots__ = ('outstanding', 'latency', 'failures', 'ejected_until')
+
+    def __init__(self):
+        self.outstanding = 0
+        self.latency = None
+        self.failures = 0
+        self.ejected_until = None
+
+
+class EndpointPool:
+    """ Load-balanced pool of SOCKS endpoints (e.g. several TOR daemons).
+
+    With the default "least-outstanding" strategy requests go to the
+    healthy endpoint with the fewest outstanding requests, ties broken by
+    the lowest average latency. The "weighted" strategy picks at random,
+    weighted by health score and inverse latency. An endpoint failing
+    `max_failures` times in a row is ejected for `cooldown` seconds and only
+    re-admitted once a health check succeeds (never, if cooldown is None).
+    """
+
+    def __init__(self, endpoints, max_failures=3, cooldown=30.0,
+                 health_check=_probe_endpoint, clock=time.monotonic,
+                 strategy='least-outstanding'):
+        """
+        :param endpoints: List - SocksProxy (or (host, port)) endpoints.
+        :param max_failures: Integer - Consecutive failures before ejection.
+        :param cooldown: Float - Seconds an ejected endpoint sits out, None
+            to evict it for good.
+        :param health_check: Callable - Returns True if an endpoint is back.
+        :param clock: Callable - Monotonic time source.
+        :param strategy: String - "least-outstanding" or "weighted".
+        """
+        if strategy not in ('least-outstanding', 'weighted'):
+            raise ValueError(f"unknown balancing strategy '{strategy}'")
+        self.strategy = strategy
+        self.endpoints = [SocksProxy(*endpoint) for endpoint in endpoints]
+        if not self.endpoints:
+            raise ValueError("EndpointPool needs at least one endpoint")
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self._health_check = health_check
+        self._clock = clock
+        self._stats = {endpoint: _EndpointStats() for endpoint in self.endpoints}
+        self._lock = threading.Lock()
+
+    def healthy(self):
+        """ Endpoints currently admitted to the rotation. """
+        with self._lock:
+            return [ep for ep in self.endpoints if self._stats[ep].ejected_until is None]
+
+    def _revive(self):
+        """ Health-checks ejected endpoints whose cooldown has elapsed. """
+        if self.cooldown is None:
+            return
+        now = self._clock()
+        with self._lock:
+            due = [ep for ep in self.endpoints
+                   if self._stats[ep].ejected_until is not None
+                   and self._stats[ep].ejected_until <= now]
+            # Push the deadline out so concurrent callers don't probe too.
+            for endpoint in due:
+                self._stats[endpoint].ejected_until = now + self.cooldown
+        for endpoint in due:
+            if self._health_check(endpoint):
+                with self._lock:
+                    self._stats[endpoint].ejected_until = None
+                    self._stats[endpoint].failures = 0
+
+    def acquire(self, exclude=()):
+        """ Picks the endpoint for the next request and marks it busy.
+
+        :param exclude: Iterable - Endpoints to avoid if any other is usable.
+        :return: SocksProxy
+        """
+        self._revive()
+        with self._lock:
+            candidates = [ep for ep in self.endpoints
+                          if self._stats[ep].ejected_until is None]
+            preferred = [ep for ep in candidates if ep not in exclude]
+            candidates = preferred or candidates
+            if not candidates:
+                # Everything is ejected: use the one coming back soonest.
+                candidates = [min(self.endpoints, key=lambda ep: self._stats[ep].ejected_until)]
+            if self.strategy == 'weighted':
+                endpoint = random.choices(candidates, weights=self._weights(candidates))[0]
+            else:
+                endpoint = min(candidates, key=lambda ep: (self._stats[ep].outstanding,
+                                                           self._stats[ep].latency or 0.0))
+            self._stats[endpoint].outstanding += 1
+            return endpoint
+
+    def _weights(self, candidates):
+        """ Health-scored, latency-weighted selection weights. """
+        known = [self._stats[ep].latency for ep in candidates
+                 if self._stats[ep].latency is not None]
+        # Unmeasured endpoints are assumed average so they still get tried.
+        default = sum(known) / len(known) if known else 1.0
+        weights = []
+        for endpoint in candidates:
+            stats = self._stats[endpoint]
+            latency = stats.latency if stats.latency is not None else default
+            weights.append(1.0 / ((1 + stats.failures) * max(latency, 0.001)))
+        return weights
+
+    def release(self, endpoint, latency=None, error=False):
+        """ Reports the outcome of a request made through the endpoint.
+
+        :param endpoint: SocksProxy - Endpoint returned by acquire().
+        :param latency: Float - Seconds until the response arrived.
+        :param error: Boolean - Whether the endpoint failed to connect.
+        :return: None
+        """
+        with self._lock:
+            stats = self._stats[endpoint]
+            stats.outstanding = max(0, stats.outstanding - 1)
+            if error:
+                stats.failures += 1
+                if stats.failures >= self.max_failures and stats.ejected_until is None:
+                    stats.ejected_until = float('inf') if self.cooldown is None \
+                        else self._clock() + self.cooldown
+                return
+            stats.failures = 0
+            if latency is not None:
+                stats.latency = latency if stats.latency is None \
+                    else 0.8 * stats.latency + 0.2 * latency
+
+
+Timeouts = namedtuple('Timeouts', ['connect', 'read', 'total'], defaults=(None,))
+
+
+def _timeouts(timeout):
+    """ Normalises a Float or Timeouts value into Timeouts. """
+    if isinstance(timeout, Timeouts):
+        return timeout
+    if timeout is None:
+        timeout = socket.getdefaulttimeout()
+    return Timeouts(timeout, timeout)
+
+
+class ContentRejected(URLError):
+    """ The response's media type was not one the caller accepts. """
+
+    def __init__(self, url, reason):
+        super().__init__(reason)
+        self.url = url
+
+
+class Response:
+    """ HTTP response whose body has been read off the connection. """
+    __slots__ = ('url', 'status', 'reason', 'headers', 'body', 'truncated', 'request_headers')
+
+    def __init__(self, url, status, reason, headers, body, truncated=False,
+                 request_headers=None):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        self.truncated = truncated
+        self.request_headers = request_headers
+
+    def read(self):
+        return self.body
+
+    def getcode(self):
+        return self.status
+
+
+class ConnectionPool:
+    """ Keep-alive HTTP/1.1 connections, keyed per host and per proxy.
+
+    Idle connections are reused by later requests to the same host over the
+    same proxy (for onion services this skips the rendezvous negotiation),
+    closed once idle for `idle_timeout` seconds, and at most
+    `max_per_host` connections to one host are checked out at a time.
+    """
+
+    def __init__(self, max_per_host=8, idle_timeout=30.0, clock=time.monotonic):
+        """
+        :param max_per_host: Integer - Concurrent connections per host.
+        :param idle_timeout: Float - Seconds before an idle connection closes.
+        :param clock: Callable - Monotonic time source.
+        """
+        self.max_per_host = max(1, int(max_per_host))
+        self.idle_timeout = float(idle_timeout)
+        self._clock = clock
+        self._idle = defaultdict(deque)
+        self._slots = {}
+        self._lock = threading.Lock()
+        self._last_sweep = clock()
+
+    @staticmethod
+    def _connect(key, timeout):
+        scheme, host, port, proxy = key
+        if scheme == 'https':
+            if proxy is not None:
+                return SocksHTTPSConnection(host, port, timeout=timeout, proxy=proxy)
+            return http.client.HTTPSConnection(host, port, timeout=timeout)
+        if proxy is not None:
+            return SocksHTTPConnection(host, port, timeout=timeout, proxy=proxy)
+        return http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def _slot(self, key):
+        host_key = key[:3]
+        with self._lock:
+            slot = self._slots.get(host_key)
+            if slot is None:
+                slot = self._slots[host_key] = threading.BoundedSemaphore(self.max_per_host)
+            return slot
+
+    def _sweep(self, now):
+        """ Closes idle connections past the idle timeout. Needs the lock. """
+        expired = []
+        for key, idle in self._idle.items():
+            while idle and now - idle[0][1] > self.idle_timeout:
+                expired.append(idle.popleft()[0])
+        self._last_sweep = now
+        return expired
+
+    def get(self, key, timeout):
+        """ Checks out a connection for the key, reusing an idle one if any.
+
+        :param key: Tuple - (scheme, host, port, proxy).
+        :param timeout: Float - Connect timeout for a new connection.
+        :return: Tuple (connection, Boolean reused).
+        """
+        self._slot(key).acquire()
+        now = self._clock()
+        with self._lock:
+            expired = []
+            if now - self._last_sweep > self.idle_timeout / 2:
+                expired = self._sweep(now)
+            idle = self._idle.get(key)
+            connection = None
+            while idle and connection is None:
+                candidate, last_used = idle.pop()
+                if now - last_used > self.idle_timeout:
+                    expired.append(candidate)
+                else:
+                    connection = candidate
+        for stale in expired:
+            stale.close()
+
+        if connection is None:
+            return self._connect(key, timeout), False
+        connection.timeout = timeout
+        return connection, True
+
+    def put(self, key, connection, reusable=True):
+        """ Returns a checked out connection, keeping it if reusable. """
+        try:
+            if reusable and connection.sock is not None:
+                with self._lock:
+                    self._idle[key].append((connection, self._clock()))
+            else:
+                connection.close()
+        finally:
+            self._slot(key).release()
+
+    def close(self):
+        """ Closes every idle connection. """
+        with self._lock:
+            idle = [conn for conns in self._idle.values() for conn, _ in conns]
+            self._idle.clear()
+        for connection in idle:
+            connection.close()
+
+
+class TransferStats:
+    """ Counts bytes received on the wire versus bytes after decoding. """
+
+    def __init__(self):
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, wire_bytes, decoded_bytes):
+        with self._lock:
+            self.wire_bytes += wire_bytes
+            self.decoded_bytes += decoded_bytes
+
+    def summary(self):
+        """ One line report of the savings from content-encoding. """
+        saved = 0.0
+        if self.decoded_bytes:
+            saved = 100.0 * (1 - self.wire_bytes / self.decoded_bytes)
+        return (f"{self.wire_bytes} byte(s) on the wire, {self.decoded_bytes} "
+                f"decoded ({saved:.1f}% saved by compression)")
+
+
+transfer_stats = TransferStats()
+
+
+class _DeflateDecoder:
+    """ "deflate" is zlib-wrapped per the RFC, but raw in some servers. """
+
+    def __init__(self):
+        self._decoder = zlib.decompressobj()
+        self._first = True
+
+    def decompress(self, chunk, max_length=0):
+        if self._first:
+            self._first = False
+            try:
+                return self._decoder.decompress(chunk, max_length)
+            except zlib.error:
+                self._decoder = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._decoder.decompress(chunk, max_length)
+
+    def flush(self):
+        return self._decoder.flush()
+
+
+class _BrotliDecoder:
+    def __init__(self):
+        self._decoder = brotli.Decompressor()
+
+    def decompress(self, chunk, max_length=0):
+        if not max_length:
+            return self._decoder.process(chunk)
+        return self._decoder.process(chunk, output_buffer_limit=max_length)
+
+    def flush(self):
+        return b''
+
+
+def accept_encoding():
+    """ Value of the Accept-Encoding header for the available decoders. """
+    return 'gzip, deflate, br' if brotli is not None else 'gzip, deflate'
+
+
+def _content_decoder(encoding):
+    """ Streaming decoder for a Content-Encoding, None for identity. """
+    encoding = (encoding or '').strip().lower()
+    if encoding in ('gzip', 'x-gzip'):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == 'deflate':
+        return _DeflateDecoder()
+    if encoding == 'br' and brotli is not None:
+        return _BrotliDecoder()
+    return None
+
+
+def _read_body(response, max_bytes=None, deadline=None, chunk_size=65536,
+               sock=None, read_timeout=None):
+    """ Reads the response body in chunks, decoding it on the fly.
+
+    Every read returns whatever has arrived and waits no longer than the
+    read timeout or the time left until the deadline, so a server that
+    trickles bytes can't stretch a request past the deadline.
+
+    :param response: http.client.HTTPResponse - Response to read.
+    :param max_bytes: Integer - Stop after this many decoded bytes; a
+        compressed chunk is never inflated much past it.
+    :param deadline: Float - time.monotonic() by which reading must end.
+    :param chunk_size: Integer - Most bytes read off the socket at a time.
+    :param sock: socket - Socket of the response, whose timeout is set
+        before every read.
+    :param read_timeout: Float - Seconds to wait for data.
+    :return: Tuple (bytes body, Boolean truncated).
+    """
+    decoder = _content_decoder(response.getheader('Content-Encoding'))
+    parts = []
+    size = 0
+    wire_bytes = 0
+    truncated = False
+    while True:
+        timeout = _remaining(read_timeout, deadline)
+        if sock is not None:
+            sock.settimeout(timeout)
+        chunk = response.read1(chunk_size)
+        if not chunk:
+            # read1() leaves a complete response open; read() finishes it
+            # so the connection can be reused.
+            response.read()
+            break
+        wire_bytes += len(chunk)
+        if decoder:
+            # One byte over the budget is enough to know the body is cut.
+            data = decoder.decompress(chunk, max_bytes - size + 1 if max_bytes else 0)
+        else:
+            data = chunk
+        parts.append(data)
+        size += len(data)
+        if max_bytes and size >= max_bytes:
+            truncated = size > max_bytes or bool(response.read(1))
+            break
+    if decoder and not truncated:
+        parts.append(decoder.flush())
+    body = b''.join(parts)
+    if max_bytes and len(body) > max_bytes:
+        body = body[:max_bytes]
+        truncated = True
+    transfer_stats.add(wire_bytes, len(body))
+    return body, truncated
+
+
+def _remaining(timeout, deadline):
+    """ Shortens a timeout to the time left until the deadline.
+
+    :param timeout: Float - Seconds, None for no timeout.
+    :param deadline: Float - time.monotonic() by which the request must end.
+    :return: Float
+    :raises socket.timeout: If the deadline has passed.
+    """
+    if deadline is None:
+        return timeout
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise socket.timeout("total deadline exceeded")
+    return left if timeout is None else min(timeout, left)
+
+
+def _media_type(response):
+    """ Lower-cased media type of the response, '' if not declared. """
+    content_type = response.getheader('Content-Type') or ''
+    return content_type.split(';', 1)[0].strip().lower()
+
+
+_connection_pool = None
+_REDIRECT_CODES = (301, 302, 303, 307, 308)
+_MAX_REDIRECTS = 10
+_DEFAULT_USER_AGENT = f"Python-urllib/{sys.version_info[0]}.{sys.version_info[1]}"
+
+
+def connection_pool():
+    """ Process wide connection pool shared by the crawler and extractor. """
+    global _connection_pool
+    if _connection_pool is None:
+        _connection_pool = ConnectionPool()
+    return _connection_pool
+
+
+def configure_connections(max_per_host=8, idle_timeout=30.0):
+    """ Replaces the shared connection pool with one using these limits. """
+    global _connection_pool
+    if _connection_pool is not None:
+        _connection_pool.close()
+    _connection_pool = ConnectionPool(max_per_host, idle_timeout)
+
+
+def _request_parts(request):
+    """ Splits a String URL or urllib Request into (url, headers). """
+    if isinstance(request, urllib.request.Request):
+        return request.full_url, dict(request.header_items())
+    return str(request).strip(), {}
+
+
+def _round_trip(key, url, path, headers, timeouts, deadline=None,
+                accept_types=None, max_bytes=None):
+    """ Sends one GET over a pooled connection and reads the response.
+
+    A reused keep-alive connection may have been closed by the server in
+    the meantime; that case is retried once on a fresh connection. Bodies
+    of a type outside `accept_types` are not read at all.
+    """
+    pool = connection_pool()
+    for attempt in range(2):
+        try:
+            connect_timeout = _remaining(timeouts.connect, deadline)
+        except socket.timeout as err:
+            raise URLError(err) from err
+        connection, reused = pool.get(key, connect_timeout)
+        try:
+            if connection.sock is None:
+                connection.connect()
+            connection.sock.settimeout(_remaining(timeouts.read, deadline))
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            media_type = _media_type(response)
+            if accept_types and 200 <= response.status < 300 \
+                    and media_type and media_type not in accept_types:
+                pool.put(key, connection, reusable=False)
+                length = response.getheader('Content-Length') or 'unknown'
+                raise ContentRejected(url, f"{media_type} ({length} bytes)")
+            body, truncated = _read_body(response, max_bytes, deadline,
+                                         sock=connection.sock, read_timeout=timeouts.read)
+        except (http.client.RemoteDisconnected, ConnectionResetError,
+                BrokenPipeError) as err:
+            pool.put(key, connection, reusable=False)
+            if reused and attempt == 0:
+                continue
+            raise URLError(err) from err
+        except ContentRejected:
+            raise
+        except (OSError, http.client.HTTPException, *_DECODE_ERRORS) as err:
+            pool.put(key, connection, reusable=False)
+            if isinstance(err, (URLError, http.client.IncompleteRead,
+                                http.client.InvalidURL)):
+                raise
+            raise URLError(err) from err
+        except BaseException:
+            # Whatever went wrong, the host's connection slot is given back.
+            pool.put(key, connection, reusable=False)
+            raise
+        pool.put(key, connection, reusable=not (truncated or response.will_close))
+        return response, body, truncated
+
+
+def fetch(request, timeout=None, proxy=None, accept_types=None, max_bytes=None,
+          deadline=None):
+    """ GETs a URL over a pooled keep-alive connection, following redirects.
+    Compressed bodies (gzip, deflate and, with brotli installed, br) are
+    requested and transparently decoded.
+
+    :param request: String or urllib.request.Request - What to fetch.
+    :param timeout: Float or Timeouts - Seconds allowed to connect, between
+        reads and (with Timeouts.total) for the whole request.
+    :param proxy: SocksProxy - Proxy to bind the connection to, if any.
+    :param accept_types: Iterable - Media types to read; others are
+        rejected before their body is downloaded.
+    :param max_bytes: Integer - Body size cap; larger bodies are truncated.
+    :param deadline: Float - time.monotonic() by which the request must be
+        done, e.g. shared by its retries (Default: Timeouts.total from now).
+    :return: Response
+    :raises HTTPError: For 4xx/5xx answers.
+    :raises ContentRejected: For a media type outside accept_types.
+    :raises URLError: If the host can't be reached.
+    """
+    url, headers = _request_parts(request)
+    headers.setdefault('User-Agent', _DEFAULT_USER_AGENT)
+    headers.setdefault('Accept-Encoding', accept_encoding())
+    headers['Connection'] = 'keep-alive'
+    timeouts = _timeouts(timeout)
+    if deadline is None and timeouts.total:
+        deadline = time.monotonic() + timeouts.total
+
+    for _ in range(_MAX_REDIRECTS + 1):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise URLError(f"unsupported URL: {url}")
+        try:
+            port = parts.port or (443 if parts.scheme == 'https' else 80)
+        except ValueError as err:
+            raise http.client.InvalidURL(f"{url}: {err}") from err
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        key = (parts.scheme, parts.hostname, port, proxy)
+
+        response, body, truncated = _round_trip(key, url, path, headers, timeouts,
+                                                deadline, accept_types, max_bytes)
+        location = response.getheader('Location')
+        if response.status in _REDIRECT_CODES and location:
+            url = urljoin(url, location)
+            continue
+        if response.status >= 400:
+            raise HTTPError(url, response.status, response.reason,
+                            response.headers, io.BytesIO(body))
+        return Response(url, response.status, response.reason, response.headers, body,
+                        truncated, dict(headers))
+
+    raise HTTPError(url, response.status, "Too many redirects", response.headers, None)
+
+
+class SocksTransport:
+    """ Binds requests to SOCKS5 endpoints per connection instead of
+    monkeypatching `socket.socket` for the whole process. Connections are
+    pooled per endpoint (and per credentials), so they are kept alive.
+
+    Requests are spread over the endpoint pool. With `isolate` enabled
+    every thread authenticates with its own username/password pair; TOR's
+    IsolateSOCKSAuth (on by default for every SocksPort) then puts each
+    worker on a separate circuit.
+    """
+
+    def __init__(self, endpoints, isolate=False):
+        """
+        :param endpoints: List or EndpointPool - SOCKS5 endpoints to use.
+        :param isolate: Boolean - Distinct SOCKS credentials per thread.
+        """
+        self.pool = endpoints if isinstance(endpoints, EndpointPool) else EndpointPool(endpoints)
+        self.isolate = isolate
+        self._session = secrets.token_hex(8)
+        self._worker_ids = itertools.count(1)
+        self._local = threading.local()
+
+    def credentials(self, hedge=False):
+        """ SOCKS credentials of the calling thread.
+
+        :param hedge: Boolean - Credentials for a hedged duplicate, which TOR
+            routes over a different circuit than the thread's own.
+        :return: Tuple (username, password) - (None, None) without isolation.
+        """
+        if not self.isolate:
+            return ("torcrawl-hedge", self._session) if hedge else (None, None)
+        worker_id = getattr(self._local, 'worker_id', None)
+        if worker_id is None:
+            worker_id = self._local.worker_id = next(self._worker_ids)
+        suffix = "-hedge" if hedge else ""
+        return f"torcrawl-{worker_id}{suffix}", self._session
+
+    def urlopen(self, url, timeout=None, credentials=None, endpoint=None, **options):
+        """ Fetches the URL through an endpoint picked from the pool.
+
+        :param credentials: Tuple - SOCKS credentials to use instead of the
+            calling thread's own.
+        :param endpoint: SocksProxy - Endpoint already acquired from the
+            pool, e.g. to keep a hedge off the endpoint of its primary.
+        :param options: Keyword arguments passed on to fetch().
+        """
+        if endpoint is None:
+            endpoint = self.pool.acquire()
+        username, password = credentials or self.credentials()
+        proxy = SocksProxy(endpoint.host, endpoint.port, username, password)
+        started = time.monotonic()
+        try:
+            response = fetch(url, timeout=timeout, proxy=proxy, **options)
+        except (HTTPError, ContentRejected):
+            # The endpoint delivered an answer; the server just refused.
+            self.pool.release(endpoint, time.monotonic() - started)
+            raise
+        except OSError as err:
+            if _is_proxy_failure(err):
+                self.pool.release(endpoint, error=True)
+            else:
+                # The endpoint relayed the request; the destination failed.
+                self.pool.release(endpoint)
+            raise
+        self.pool.release(endpoint, time.monotonic() - started)
+        return response
+
+
+class RequestPolicy:
+    """ Timeouts, retries and hedging applied by open_url(). """
+
+    def __init__(self, connect_timeout=30.0, read_timeout=60.0, total_timeout=300.0,
+                 retries=2, backoff=1.0, max_backoff=30.0, hedge=False):
+        """
+        :param connect_timeout: Float - Seconds to establish a connection.
+        :param read_timeout: Float - Seconds to wait between reads.
+        :param total_timeout: Float - Seconds for a whole request (None: no limit).
+        :param retries: Integer - Retries of transient failures.
+        :param backoff: Float - Base of the exponential retry backoff.
+        :param max_backoff: Float - Ceiling of a single backoff.
+        :param hedge: Boolean - Duplicate requests slower than the host's p95.
+        """
+        self.timeouts = Timeouts(connect_timeout, read_timeout, total_timeout)
+        self.retries = max(0, int(retries))
+        self.backoff = float(backoff)
+        self.max_backoff = float(max_backoff)
+        self.hedge = hedge
+
+    def delay(self, attempt):
+        """ Exponential backoff with full jitter for the given retry. """
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+
+class LatencyTracker:
+    """ Recent request latencies per host. """
+
+    def __init__(self, window=100, min_samples=10):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, host, latency):
+        with self._lock:
+            samples = self._samples.get(host)
+            if samples is None:
+                samples = self._samples[host] = deque(maxlen=self.window)
+            samples.append(latency)
+
+    def p95(self, host):
+        """ 95th percentile latency of the host, None until enough samples. """
+        with self._lock:
+            samples = sorted(self._samples.get(host, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[int(0.95 * (len(samples) - 1))]
+
+
+def _is_transient(err):
+    """ Whether a failed request is worth retrying. """
+    if isinstance(err, (ContentRejected, http.client.InvalidURL)):
+        return False
+    if isinstance(err, HTTPError):
+        return err.code in (429, 500, 502, 503, 504)
+    if isinstance(err, URLError):
+        return isinstance(err.reason, OSError)
+    return isinstance(err, (OSError, http.client.HTTPException))
+
+
+_installed_transport = None
+_request_policy = RequestPolicy()
+_latencies = LatencyTracker()
+
+
+def install_transport(transport):
+    """ Installs the transport used by open_url() (None for direct). """
+    global _installed_transport
+    _installed_transport = transport
+
+
+def configure_requests(policy):
+    """ Sets the RequestPolicy used by open_url(). """
+    global _request_policy
+    _request_policy = policy
+
+
+def _send(transport, url, timeout, options, credentials=None, endpoint=None):
+    if transport is None:
+        return fetch(url, timeout=timeout, **options)
+    if credentials is not None or endpoint is not None:
+        return transport.urlopen(url, timeout=timeout, credentials=credentials,
+                                 endpoint=endpoint, **options)
+    return transport.urlopen(url, timeout=timeout, **options)
+
+
+def _send_async(transport, url, timeout, options, credentials, endpoint=None):
+    """ Starts _send() on a daemon thread of its own.
+
+    The request that loses a hedge is abandoned rather than waited for, so
+    it must not keep the process alive once the crawl is done.
+
+    :return: Future - Holds the response or the raised error.
+    """
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(_send(transport, url, timeout, options, credentials, endpoint))
+        except BaseException as err:
+            future.set_exception(err)
+
+    threading.Thread(target=run, name="torcrawl-hedge", daemon=True).start()
+    return future
+
+
+def _hedged_send(transport, url, timeout, options, threshold):
+    """ Sends the request and, if no answer came within `threshold`
+    seconds, a duplicate over a different circuit; first answer wins.
+    With several endpoints the duplicate also goes to another endpoint. """
+    credentials = hedge_credentials = endpoint = None
+    if isinstance(transport, SocksTransport):
+        # Resolved here: the request threads have no identity of their own.
+        credentials = transport.credentials()
+        hedge_credentials = transport.credentials(hedge=True)
+        endpoint = transport.pool.acquire()
+
+    primary = _send_async(transport, url, timeout, options, credentials, endpoint)
+    done, _ = wait([primary], timeout=threshold)
+    if done:
+        return primary.result()
+
+    hedge_endpoint = None
+    if endpoint is not None:
+        hedge_endpoint = transport.pool.acquire(exclude=[endpoint])
+    hedge = _send_async(transport, url, timeout, options, hedge_credentials, hedge_endpoint)
+    pending = [primary, hedge]
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+    return primary.result()
+
+
+def open_url(url, timeout=None, transport=None, scheduler=None, **options):
+    """ Fetches the URL (String or urllib Request) with the installed
+    transport, or over a direct pooled connection.
+
+    Transient failures are retried with exponential backoff and jitter,
+    all attempts within one total timeout; with hedging enabled, a request
+    slower than the host's p95 latency is duplicated over a different
+    circuit (see RequestPolicy).
+
+    With a scheduler, the caller holds its slot for the first attempt;
+    each failed attempt is reported to it and every retry waits for the
+    host's (backed-off) turn again.
+
+    :param url: String or urllib.request.Request - What to open.
+    :param timeout: Float or Timeouts - Overrides the policy's timeouts.
+    :param transport: SocksTransport - Overrides the installed transport.
+    :param scheduler: HostScheduler - Per-host politeness for retries.
+    :param options: Keyword arguments passed on to fetch().
+    :return: Response
+    """
+    policy = _request_policy
+    transport = transport or _installed_transport
+    if timeout is None:
+        timeout = policy.timeouts
+    host = urlsplit(_request_parts(url)[0]).netloc.lower()
+    # One deadline for every attempt, hedges and redirects included.
+    deadline = options.get('deadline')
+    if deadline is None and _timeouts(timeout).total:
+        deadline = options['deadline'] = time.monotonic() + _timeouts(timeout).total
+
+    attempt = 0
+    while True:
+        started = time.monotonic()
+        threshold = _latencies.p95(host) if policy.hedge else None
+        try:
+            if threshold is not None:
+                response = _hedged_send(transport, url, timeout, options, threshold)
+            else:
+                response = _send(transport, url, timeout, options)
+        except Exception as err:
+            backoff = delay = policy.delay(attempt)
+            if scheduler is not None:
+                delay = max(backoff, scheduler.delay(host))
+            if attempt >= policy.retries or not _is_transient(err) or (
+                    deadline is not None and time.monotonic() + delay >= deadline):
+                raise
+            if scheduler is None:
+                time.sleep(delay)
+            else:
+                # The failure backs the host off; the retry waits its turn.
+                scheduler.release(host, time.monotonic() - started, error=True)
+                time.sleep(backoff)
+                scheduler.acquire(host)
+            attempt += 1
+            continue
+        _latencies.add(host, time.monotonic() - started)
+        return response
@@ -0,0 +1,180 @@
+#!/usr/bin/python
+from array import array
+from functools import lru_cache
+from urllib.parse import urlsplit, urlunsplit
+
+URL_CACHE_SIZE = 65536
+
+
+class URL:
+    """ A link parsed once, with the forms the crawler compares it by.
+
+    Instances are shared through `parse_url()`'s cache and must be
+    treated as read-only.
+    """
+    __slots__ = ('raw', 'valid', 'scheme', 'netloc', 'domain', 'path',
+                 'extension', 'normalized')
+
+    def __init__(self, raw):
+        """
+        :param raw: String - Link as found on the page.
+        """
+        self.raw = raw
+        try:
+            parts = urlsplit(raw)
+        except ValueError:
+            # Malformed (e.g. an unclosed IPv6 bracket).
+            self.valid = False
+            self.scheme = self.netloc = self.domain = ''
+            self.path = raw.lower()
+            self.extension = _extension(self.path)
+            self.normalized = raw.strip().lower()
+            return
+
+        self.valid = True
+        self.scheme = parts.scheme.lower()
+        self.netloc = parts.netloc.lower()
+        # Domains are compared with and without a leading "www.".
+        self.domain = self.netloc[4:] if self.netloc.startswith('www.') else self.netloc
+        self.path = parts.path.lower()
+        self.extension = _extension(self.path)
+        self.normalized = urlunsplit(parts._replace(netloc=self.domain))
+
+    def __repr__(self):
+        return f"URL({self.raw!r})"
+
+
+def _extension(path):
+    """ Lower-case extension of the last path segment, without the dot. """
+    segment = path.rsplit('/', 1)[-1]
+    if '.' not in segment:
+        return ''
+    return segment.rsplit('.', 1)[-1]
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def parse_url(raw):
+    """ Parses a link, reusing the result for links seen before.
+
+    :param raw: String - Link as found on the page.
+    :return: URL
+    """
+    return URL(raw)
+
+
+class URLTable:
+    """ Maps every URL to a compact integer ID and back.
+
+    Each distinct URL string is stored once; edges and resources keep
+    the IDs and only turn them back into strings at export time.
+    """
+    __slots__ = ('_ids', '_urls')
+
+    def __init__(self):
+        self._ids = {}
+        self._urls = []
+
+    def __len__(self):
+        return len(self._urls)
+
+    def __contains__(self, url):
+        return url in self._ids
+
+    def intern(self, url):
+        """ Returns the ID of a URL, assigning the next free one if new.
+
+        :param url: String - URL (or any other finding) to intern.
+        :return: Integer - ID of the URL.
+        """
+        url_id = self._ids.get(url)
+        if url_id is None:
+            url_id = self._ids[url] = len(self._urls)
+            self._urls.append(url)
+        return url_id
+
+    def url(self, url_id):
+        """ Returns the URL string of an ID.
+
+        :param url_id: Integer - ID returned by intern().
+        :return: String
+        """
+        return self._urls[url_id]
+
+
+class EdgeList:
+    """ Link graph edges stored as packed pairs of URL IDs.
+
+    A page's edges are added while it is parsed, so duplicates are
+    dropped against the run of edges from the same source. The few
+    duplicates that remain disappear when exported as a set.
+    """
+
+    def __init__(self, table):
+        """
+        :param table: URLTable - Table the URLs are interned in.
+        """
+        self.table = table
+        self._pairs = array('I')
+        self._source = None
+        self._targets = set()
+
+    def __len__(self):
+        return len(self._pairs) // 2
+
+    def __iter__(self):
+        url = self.table.url
+        pairs = self._pairs
+        for index in range(0, len(pairs), 2):
+            yield url(pairs[index]), url(pairs[index + 1])
+
+    def add(self, edge):
+        """ Adds a (from_url, to_url) edge.
+
+        :param edge: Tuple - Source and target URL strings.
+        :return: None
+        """
+        source, target = self.table.intern(edge[0]), self.table.intern(edge[1])
+        if source != self._source:
+            self._source = source
+            self._targets = set()
+        if target not in self._targets:
+            self._targets.add(target)
+            self._pairs.append(source)
+            self._pairs.append(target)
+
+
+class ResourceIndex:
+    """ Resources of one category per source page, as lists of URL IDs. """
+
+    def __init__(self, table):
+        """
+        :param table: URLTable - Table the URLs are interned in.
+        """
+        self.table = table
+        self._sources = {}
+        self._source = None
+        self._seen = set()
+
+    def __len__(self):
+        return len(self._sources)
+
+    def add(self, source, value):
+        """ Records that a source page refers to a resource.
+
+        :param source: String - URL of the page.
+        :param value: String - The resource (URL, e-mail, phone number).
+        :return: None
+        """
+        source_id, value_id = self.table.intern(source), self.table.intern(value)
+        if source_id != self._source:
+            self._source = source_id
+            self._seen = set()
+        if value_id not in self._seen:
+            self._seen.add(value_id)
+            self._sources.setdefault(source_id, array('I')).append(value_id)
+
+    def export(self):
+        """ Returns {source_url: sorted resource strings}. """
+        url = self.table.url
+        return {url(source_id): sorted({url(value_id) for value_id in value_ids})
+                for source_id, value_ids in self._sources.items()}
@@ -0,0 +1,194 @@
+#!/usr/bin/python
+import base64
+import datetime
+import gzip
+import hashlib
+import os
+import uuid
+from urllib.parse import urlsplit
+
+DEFAULT_WARC_MAX_SIZE = 1024 * 1024 * 1024
+WARC_VERSION = 'WARC/1.1'
+# Classic 11-field CDX: SURT key, timestamp, URL, MIME type, status,
+# payload digest, redirect, meta tags, record length, offset, file name.
+CDX_HEADER = ' CDX N b a m s k r M S V g\n'
+# Bodies are stored decoded, so these would no longer describe them.
+_DROPPED_HEADERS = ('content-encoding', 'transfer-encoding', 'content-length')
+
+
+def _digest(data):
+    """ WARC-style digest: base32 of the SHA-1. """
+    return 'sha1:' + base64.b32encode(hashlib.sha1(data).digest()).decode('ascii')
+
+
+def surt(url):
+    """ Sort-friendly URL key for the CDX index, e.g. com,example)/path?q.
+
+    :param url: String - URL of the record.
+    :return: String
+    """
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url.strip().lower()
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    key = ','.join(reversed(host.split('.'))) + ')' + (parts.path or '/')
+    if parts.query:
+        key += '?' + parts.query
+    return key.lower()
+
+
+class WarcWriter:
+    """ Appends pages to rotating gzip-compressed WARC files.
+
+    Every record is a gzip member of its own, so a reader can seek to the
+    offset listed in the CDX index and decompress just that record.
+    A file is closed and the next one started once it reaches
+    `max_size` bytes. Meant to be used from one thread.
+    """
+
+    def __init__(self, directory, prefix, max_size=DEFAULT_WARC_MAX_SIZE,
+                 clock=datetime.datetime.now):
+        """
+        :param directory: String - Folder of the WARC files and index.
+        :param prefix: String - Name of the files: <prefix>-00000.warc.gz
+            and <prefix>.cdx.
+        :param max_size: Integer - Bytes after which a new file is started.
+        :param clock: Callable(tz) - Current time, for the record dates.
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.max_size = max(1, int(max_size))
+        self._clock = clock
+        self._serial = self._next_serial()
+        self._file = None
+        self._name = None
+        self.records = 0
+        self.cdx_path = os.path.join(directory, f"{prefix}.cdx")
+        self._cdx = open(self.cdx_path, 'a', encoding='UTF-8')
+
+    def _next_serial(self):
+        """ First serial number not taken by an earlier run. """
+        serial = 0
+        while os.path.exists(os.path.join(self.directory, f"{self.prefix}-{serial:05d}.warc.gz")):
+            serial += 1
+        return serial
+
+    def _now(self):
+        return self._clock(datetime.timezone.utc)
+
+    def _open_next(self):
+        if self._file is not None:
+            self._file.close()
+        self._name = f"{self.prefix}-{self._serial:05d}.warc.gz"
+        self._serial += 1
+        self._file = open(os.path.join(self.directory, self._name), 'ab')
+        info = b"software: TorCrawl.py\r\nformat: WARC File Format 1.1\r\n"
+        self._write_record('warcinfo', None, 'application/warc-fields', info,
+                           {'WARC-Filename': self._name})
+
+    def _rotate(self):
+        """ Starts the next file if there is none yet or the current one is full. """
+        if self._file is None or self._file.tell() >= self.max_size:
+            self._open_next()
+
+    def _write_record(self, record_type, url, content_type, block, extra=None, date=None):
+        """ Writes one record as its own gzip member.
+
+        :return: Tuple (offset, length, headers) - Where the compressed
+            record is and its WARC headers.
+        """
+        date = date or self._now()
+        headers = [
+            ('WARC-Type', record_type),
+            ('WARC-Record-ID', f"<urn:uuid:{uuid.uuid4()}>"),
+            ('WARC-Date', date.strftime('%Y-%m-%dT%H:%M:%SZ')),
+        ]
+        if url is not None:
+            headers.append(('WARC-Target-URI', url))
+        headers.extend((extra or {}).items())
+        headers.append(('WARC-Block-Digest', _digest(block)))
+        headers.append(('Content-Type', content_type))
+        headers.append(('Content-Length', str(len(block))))
+        head = WARC_VERSION + '\r\n' + ''.join(f"{name}: {value}\r\n" for name, value in headers)
+        record = head.encode('utf-8') + b'\r\n' + block + b'\r\n\r\n'
+
+        offset = self._file.tell()
+        self._file.write(gzip.compress(record))
+        self.records += 1
+        return offset, self._file.tell() - offset, dict(headers)
+
+    def write_response(self, url, status, reason, headers, body, request_headers=None):
+        """ Appends a request and a response record for a fetched page.
+
+        :param url: String - URL of the page.
+        :param status: Integer - HTTP status.
+        :param reason: String - HTTP reason phrase.
+        :param headers: List - (name, value) response headers.
+        :param body: Bytes - Page body, already decoded.
+        :param request_headers: Dict - Headers the request was sent with.
+        :return: String - Name of the WARC file written to.
+        """
+        self._rotate()
+        date = self._now()
+        kept = [(name, value) for name, value in headers
+                if name.lower() not in _DROPPED_HEADERS]
+        kept.append(('Content-Length', str(len(body))))
+        http_head = f"HTTP/1.1 {status} {reason}\r\n" + ''.join(
+            f"{name}: {value}\r\n" for name, value in kept)
+        block = http_head.encode('latin-1', 'replace') + b'\r\n' + body
+        offset, length, record = self._write_record(
+            'response', url, 'application/http;msgtype=response', block,
+            {'WARC-Payload-Digest': _digest(body)}, date)
+
+        parts = urlsplit(url)
+        path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        request_head = f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n" + ''.join(
+            f"{name}: {value}\r\n" for name, value in (request_headers or {}).items())
+        self._write_record('request', url, 'application/http;msgtype=request',
+                           request_head.encode('latin-1', 'replace') + b'\r\n',
+                           {'WARC-Concurrent-To': record['WARC-Record-ID']}, date)
+
+        content_type = next((value for name, value in headers
+                             if name.lower() == 'content-type'), '-')
+        self._index(url, date, content_type.split(';')[0].strip() or '-', status,
+                    _digest(body), length, offset)
+        return self._name
+
+    def write_resource(self, url, body, content_type='text/html'):
+        """ Appends a page known only by its body, e.g. from the page store.
+
+        :param url: String - URL of the page.
+        :param body: Bytes - Page body.
+        :param content_type: String - MIME type of the body.
+        :return: String - Name of the WARC file written to.
+        """
+        self._rotate()
+        date = self._now()
+        offset, length, _ = self._write_record('resource', url, content_type, body,
+                                               {'WARC-Payload-Digest': _digest(body)}, date)
+        self._index(url, date, content_type, '-', _digest(body), length, offset)
+        return self._name
+
+    def _index(self, url, date, mime, status, digest, length, offset):
+        fields = (surt(url), date.strftime('%Y%m%d%H%M%S'), url.replace(' ', '%20'), mime,
+                  str(status), digest.split(':', 1)[1], '-', '-', str(length), str(offset),
+                  self._name)
+        self._cdx.write(' '.join(fields) + '\n')
+
+    def close(self):
+        """ Closes the current file and sorts the CDX index by URL key. """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._cdx is None:
+            return
+        self._cdx.close()
+        self._cdx = None
+        with open(self.cdx_path, 'r', encoding='UTF-8') as cdx_file:
+            lines = [line for line in cdx_file if line != CDX_HEADER]
+        with open(self.cdx_path, 'w', encoding='UTF-8') as cdx_file:
+            cdx_file.write(CDX_HEADER)
+            cdx_file.writelines(sorted(lines))
@@ -0,0 +1,137 @@
+#!/usr/bin/python
+import atexit
+import threading
+import time
+import weakref
+
+# Writers still holding lines at interpreter exit.
+_writers = weakref.WeakSet()
+
+
+class BufferedWriter:
+    """ Appends text to files through one open handle per file.
+
+    Lines are kept in memory and written out in batches, once `max_lines`
+    are pending or `interval` seconds have passed since the last flush,
+    and at exit. With `background` the batches are written by a daemon
+    thread, so callers never wait on the disk.
+    """
+
+    def __init__(self, max_lines=1000, interval=1.0, background=False,
+                 clock=time.monotonic):
+        """
+        :param max_lines: Integer - Pending lines that trigger a flush.
+        :param interval: Float - Seconds after which pending lines are flushed.
+        :param background: Boolean - Flush from a background thread.
+        :param clock: Callable - Monotonic time source.
+        """
+        self.max_lines = max(1, int(max_lines))
+        self.interval = float(interval)
+        self.background = background
+        self._clock = clock
+        self._files = {}
+        self._pending = {}
+        self._count = 0
+        self._flushed = clock()
+        # _lock guards the buffers, _io_lock keeps batches in order on disk.
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._stop = None
+        _writers.add(self)
+
+    def write(self, path, text):
+        """ Queues text to be appended to a file.
+
+        The file is opened on its first write, so errors opening it are
+        raised to the caller rather than on a later flush.
+
+        :param path: String - File to append to.
+        :param text: String - Text to append, including any newline.
+        :return: None
+        """
+        with self._lock:
+            if path not in self._files:
+                self._files[path] = open(path, 'a', encoding='UTF-8')
+            self._pending.setdefault(path, []).append(text)
+            self._count += 1
+            due = (self._count >= self.max_lines
+                   or self._clock() - self._flushed >= self.interval)
+            if self.background and self._thread is None:
+                self._stop = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(self._stop,),
+                                                daemon=True, name="torcrawl-writer")
+                self._thread.start()
+
+        if due:
+            if self.background:
+                self._wake.set()
+            else:
+                self.flush()
+
+    def flush(self):
+        """ Writes out every pending line.
+
+        :return: None
+        """
+        self._drain(close=False)
+
+    def close(self):
+        """ Flushes pending lines and closes every handle.
+
+        The writer stays usable; files are reopened on their next write.
+
+        :return: None
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._stop.set()
+        if thread is not None:
+            self._wake.set()
+            thread.join()
+        self._drain(close=True)
+
+    def _drain(self, close):
+        """ Writes out pending lines, optionally closing the handles after.
+
+        The buffers are swapped out under `_lock`, so writers only wait
+        for the swap, never for the disk.
+        """
+        with self._io_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._count = 0
+                self._flushed = self._clock()
+                handles = self._files
+                if close:
+                    self._files = {}
+            for path, lines in pending.items():
+                handles[path].write(''.join(lines))
+                handles[path].flush()
+            if close:
+                for handle in handles.values():
+                    handle.close()
+
+    def _run(self, stop):
+        """ Background loop flushing on the size or time threshold.
+
+        :param stop: Event - Set when the loop should end.
+        """
+        while not stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except OSError as err:
+                print(f"## Unable to write buffered output: {err}")
+
+
+@atexit.register
+def _flush_all():
+    for writer in list(_writers):
+        try:
+            writer.close()
+        except OSError:
+            pass
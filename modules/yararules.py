@@ -0,0 +1,208 @@
+#!/usr/bin/python
+import hashlib
+import importlib.resources as resources
+import os
+import threading
+import time
+
+RULE_EXTENSIONS = ('.yar', '.yara')
+COMPILED_EXTENSIONS = ('.yarc',)
+# Rules saved with rules.save() or yarac start with this magic.
+COMPILED_MAGIC = b'YARA'
+
+# Rule files or folders set with --yara-rules; None for res/keywords.yar.
+_rule_sources = None
+_rules_cache = {}
+_cache_lock = threading.Lock()
+
+
+def default_rules_file():
+    """ Returns the path of the bundled res/keywords.yar. """
+    try:
+        return str(resources.files("res").joinpath("keywords.yar"))
+    except (FileNotFoundError, ModuleNotFoundError):
+        return os.path.join('res', 'keywords.yar')
+
+
+def rule_files(sources):
+    """ Expands rule files and folders into the files to load.
+
+    :param sources: List - Rule files, precompiled bundles or folders
+        holding them (searched recursively).
+    :return: List - Paths, in a stable order.
+    """
+    files = []
+    for source in sources:
+        if not os.path.isdir(source):
+            files.append(source)
+            continue
+        for root, dirs, names in os.walk(source):
+            dirs.sort()
+            files.extend(os.path.join(root, name) for name in sorted(names)
+                         if name.lower().endswith(RULE_EXTENSIONS + COMPILED_EXTENSIONS))
+    return files
+
+
+def _is_compiled(path):
+    with open(path, 'rb') as rule_file:
+        return rule_file.read(len(COMPILED_MAGIC)) == COMPILED_MAGIC
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as rule_file:
+        for chunk in iter(lambda: rule_file.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class YaraRules:
+    """ YARA rules compiled once and reused for every page.
+
+    Source files are compiled together into one set of rules, with a
+    namespace per file; precompiled bundles are loaded as they are.
+    The files are stat()ed at most every `check_interval` seconds, and
+    when one has a new mtime or size its content hash decides whether
+    the rules are really compiled again.
+    """
+
+    def __init__(self, sources=None, check_interval=1.0, clock=time.monotonic):
+        """
+        :param sources: List - Rule files, bundles or folders (Default:
+            res/keywords.yar).
+        :param check_interval: Float - Seconds between checks for changes.
+        :param clock: Callable - Monotonic time source.
+        """
+        self.sources = list(sources) if sources else [default_rules_file()]
+        self.check_interval = float(check_interval)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._rules = None
+        self._stats = None
+        self._hashes = None
+        self._checked = None
+        self.compilations = 0
+
+    def _stat(self):
+        files = rule_files(self.sources)
+        stats = []
+        for path in files:
+            stat = os.stat(path)
+            stats.append((path, stat.st_mtime_ns, stat.st_size))
+        return files, tuple(stats)
+
+    def rules(self):
+        """ Returns the compiled rules, reloading them if a file changed.
+
+        :return: List of yara.Rules - One per bundle, plus one for the sources.
+        """
+        with self._lock:
+            now = self._clock()
+            if self._rules is not None and now - self._checked < self.check_interval:
+                return self._rules
+            self._checked = now
+            files, stats = self._stat()
+            if self._rules is not None and stats == self._stats:
+                return self._rules
+            hashes = tuple(_file_hash(path) for path in files)
+            if self._rules is None or hashes != self._hashes:
+                self._rules = self._load(files)
+                self.compilations += 1
+            self._stats, self._hashes = stats, hashes
+            return self._rules
+
+    @staticmethod
+    def _load(files):
+        try:
+            import yara as _yara
+        except OSError:
+            print("YARA module error: " +
+                  "Try this solution: https://stackoverflow.com/a/51504326")
+            raise
+
+        compiled = []
+        sources = {}
+        for index, path in enumerate(files):
+            if _is_compiled(path):
+                compiled.append(_yara.load(path))
+            else:
+                namespace = os.path.splitext(os.path.basename(path))[0]
+                sources[namespace if namespace not in sources else f"{namespace}_{index}"] = path
+        if sources:
+            compiled.append(_yara.compile(filepaths=sources))
+        return compiled
+
+    def match(self, data):
+        """ Matches data against every rule.
+
+        :param data: Bytes or String - What to scan.
+        :return: List of yara.Match.
+        """
+        return [match for rules in self.rules() for match in rules.match(data=data)]
+
+
+def match_details(match):
+    """ Turns a yara.Match into plain data that can be pickled or exported.
+
+    :param match: yara.Match
+    :return: Dict - Rule, namespace, tags, meta and the offset and length
+        of every matched string.
+    """
+    strings = []
+    for string in match.strings:
+        if hasattr(string, 'instances'):
+            strings.extend({"identifier": string.identifier, "offset": instance.offset,
+                            "length": instance.matched_length}
+                           for instance in string.instances)
+        else:
+            # yara-python < 4.3: (offset, identifier, data) tuples.
+            offset, identifier, data = string
+            strings.append({"identifier": identifier, "offset": offset, "length": len(data)})
+    return {
+        "rule": match.rule,
+        "namespace": match.namespace,
+        "tags": list(match.tags),
+        "meta": dict(match.meta),
+        "strings": strings,
+    }
+
+
+def page_score(matches):
+    """ Score of a page: the sum of the `score` meta of its matched rules.
+
+    :param matches: List - Dicts returned by match_details().
+    :return: Integer - Rules without a numeric score count as 0.
+    """
+    score = 0
+    for match in matches:
+        try:
+            score += int(match["meta"].get("score", 0))
+        except (TypeError, ValueError):
+            continue
+    return score
+
+
+def configured_rules():
+    """ Returns the sources set with configure_rules(), or None. """
+    return _rule_sources
+
+
+def configure_rules(sources):
+    """ Sets the rule files, bundles or folders used by get_rules(). """
+    global _rule_sources
+    _rule_sources = list(sources) if sources else None
+
+
+def get_rules(sources=None):
+    """ Returns the process-wide YaraRules for a set of sources.
+
+    :param sources: List - Rule files, bundles or folders (Default: the
+        configured --yara-rules, or res/keywords.yar).
+    :return: YaraRules
+    """
+    key = tuple(sources or _rule_sources or ())
+    with _cache_lock:
+        rules = _rules_cache.get(key)
+        if rules is None:
+            rules = _rules_cache[key] = YaraRules(list(key))
+        return rules
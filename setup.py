@@ -31,8 +31,11 @@ setup(
         'networkx',
         'pyvis',
     ],
+    extras_require={
+        'brotli': ['brotli>=1.2'],
+    },
     package_data={
-        'res': ['keywords.yar', 'proxies.txt', 'user_agents.txt', 'regex_patterns.txt'],
+        'res': ['keywords.yar', 'proxies.txt', 'user_agents.txt', 'regex_patterns.txt', 'extensions.txt'],
     },
     include_package_data=True,
     entry_points={
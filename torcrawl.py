@@ -18,6 +18,14 @@ General:
 -rpr, --random-proxy: Enable random proxy rotation from res/proxies.txt
 -px, --proxy       : IP address for SOCKS5 proxy
 -pr, --proxyport   : Port for SOCKS5 proxy
+-iso, --isolate    : Put every fetch worker on its own TOR circuit
+-tp, --tor-pool    : Balance requests over TOR SOCKS endpoints (host:port,...)
+-mhc, --max-host-connections: Keep-alive connections per host (Default: 8)
+-ct, --connect-timeout: Seconds to establish a connection (Default: 30)
+-rt, --read-timeout: Seconds to wait for data from a connection (Default: 60)
+-tt, --total-timeout: Seconds allowed for a whole request (Default: 300)
+-re, --retries     : Retries of transient failures with backoff (Default: 2)
+-hg, --hedge       : Duplicate requests slower than the host's p95 latency
 -V, --version      : Show version and exit
 
 Extract:
@@ -29,6 +37,15 @@ Extract:
                             read in from /res folder. 
                             'h' search whole html object.
                             't' search only the text.
+-yr, --yara-rules       : YARA rule files, precompiled bundles or folders
+                            (Default: res/keywords.yar)
+-ms, --min-score        : Only keep pages whose YARA score (sum of the matched
+                            rules' score meta) reaches this value
+-ew, --extract-workers  : Pages of the input file fetched concurrently (Default: 1)
+-sw, --scan-workers     : Processes YARA-scanning pages of the input file (Default: 1)
+-uo, --unordered        : Output extracted pages as they finish, not in input order
+-warc, --warc           : With -c, store extracted pages in WARC files with a CDX index
+-wsz, --warc-max-size   : Bytes after which a new WARC file is started (Default: 1 GiB)
 
 Crawl:
 -c, --crawl       : Crawl website (Default output on /links.txt)
@@ -40,6 +57,15 @@ Crawl:
 -DB, --database   : Export crawl findings and link graph to SQLite database
 -vis, --visualization: Generate HTML visualization (requires -DB)
 -l, --log         : Log file with visited URLs and their response code.
+-W, --workers     : Number of pages fetched concurrently (Default: 1)
+-mpb, --max-page-bytes: Read at most this many bytes per page (Default: 10MiB)
+-ps, --parser     : Link extraction backend, lxml or html.parser (Default: lxml)
+-aw, --async-writes: Write findings and the log file from a background thread
+-ss, --seen-store : Dedupe keys store: memory, bloom or sqlite (Default: memory)
+-be, --bloom-error: False-positive rate of the bloom store (Default: 0.001)
+-sd, --state-dir  : Checkpoint the crawl to this folder so it can be resumed
+-rs, --resume     : Resume an interrupted crawl (Default folder: <folder>/state)
+-inc, --incremental: Re-crawl with conditional requests, reusing unchanged pages
 
 GitHub: github.com/MikeMeliz/TorCrawl.py
 License: GNU General Public License v3.0
@@ -51,6 +77,7 @@ import os
 import socket
 import sys
 import datetime
+import time
 
 import socks  # noqa - pysocks
 
@@ -60,19 +87,38 @@ from modules.checker import extract_domain
 from modules.checker import folder
 from modules.checker import url_canon
 # TorCrawl Modules
-from modules.crawler import Crawler
+from modules.crawler import Crawler, DEFAULT_MAX_PAGE_BYTES
+from modules.linkparser import DEFAULT_PARSER, PARSERS
+from modules.pagestore import PageStore
+from modules.seen import DEFAULT_BLOOM_ERROR, SEEN_STORES
 from modules.extractor import extractor
 from modules.export import export_json, export_xml, export_database
 from modules.visualization import export_visualization
+from modules.yararules import configure_rules
+from modules.transport import SocksTransport, install_transport, parse_endpoints
+from modules.transport import configure_connections, transfer_stats
+from modules.transport import RequestPolicy, configure_requests
+from modules.warc import DEFAULT_WARC_MAX_SIZE
 
 __version__ = "1.35"
 
 
 # Set socket and connection with TOR network
-def connect_tor(proxy_url, proxy_port):
+def connect_tor(proxy_url, proxy_port, isolate=False, endpoints=None, hedge=False):
     """ Connect to TOR via DNS resolution through a socket.
+
+    With `isolate` every fetch worker binds its own SOCKS credentials so
+    that TOR routes each worker over a separate circuit. With `endpoints`
+    the requests are balanced over several TOR SOCKS ports. With `hedge`
+    the connections are bound per request too, so that hedged duplicates
+    can authenticate onto a circuit of their own.
     :return: None or HTTPError.
     """
+    if isolate or endpoints or hedge:
+        endpoints = endpoints or [(proxy_url, int(proxy_port))]
+        install_transport(SocksTransport(endpoints, isolate=isolate))
+        return
+
     try:
         # Set socks proxy and wrap the urllib module
         socks.setdefaultproxy(socks.PROXY_TYPE_SOCKS5, proxy_url, proxy_port)
@@ -162,6 +208,71 @@ def main():
         '--pause',
         help='The length of time the crawler will pause'
     )
+    parser.add_argument(
+        '-W',
+        '--workers',
+        type=int,
+        default=1,
+        help='Number of pages fetched concurrently while crawling (Default: 1)'
+    )
+    parser.add_argument(
+        '-mpb',
+        '--max-page-bytes',
+        type=int,
+        default=DEFAULT_MAX_PAGE_BYTES,
+        help='Read at most this many bytes of a page while crawling, 0 for '
+             'no limit (Default: 10485760)'
+    )
+    parser.add_argument(
+        '-ps',
+        '--parser',
+        choices=PARSERS,
+        default=DEFAULT_PARSER,
+        help='Backend used to extract links from crawled pages (Default: lxml)'
+    )
+    parser.add_argument(
+        '-aw',
+        '--async-writes',
+        action='store_true',
+        help='Write findings files and the log from a background thread'
+    )
+    parser.add_argument(
+        '-ss',
+        '--seen-store',
+        choices=SEEN_STORES,
+        default='memory',
+        help='Where the dedupe keys of seen links and findings are kept: '
+             'memory (exact), bloom (compact, small false-positive rate) or '
+             'sqlite (exact, on disk). Discovered links themselves stay in '
+             'memory (Default: memory)'
+    )
+    parser.add_argument(
+        '-be',
+        '--bloom-error',
+        type=float,
+        default=DEFAULT_BLOOM_ERROR,
+        help='False-positive rate of the bloom seen store (Default: 0.001)'
+    )
+    parser.add_argument(
+        '-sd',
+        '--state-dir',
+        help='Folder to checkpoint the crawl to, so that it can be resumed'
+    )
+    parser.add_argument(
+        '-rs',
+        '--resume',
+        action='store_true',
+        help='Resume an interrupted crawl from its checkpoint '
+             '(Default state folder: <folder>/state)'
+    )
+    parser.add_argument(
+        '-inc',
+        '--incremental',
+        action='store_true',
+        help='Re-crawl incrementally: send conditional requests, reuse what '
+             'earlier crawls extracted from unchanged pages and write a '
+             'new/changed/removed/failed diff'
+    )
     parser.add_argument(
         '-l',
         '--log',
@@ -208,6 +319,57 @@ def main():
         help='Check for keywords and only scrape documents that contain a '
              'match. \'h\' search whole html object. \'t\' search only the text.'
     )
+    parser.add_argument(
+        '-yr',
+        '--yara-rules',
+        nargs='+',
+        help='YARA rule files, precompiled rule bundles or folders of them '
+             'to use instead of res/keywords.yar'
+    )
+    parser.add_argument(
+        '-ms',
+        '--min-score',
+        type=int,
+        help='With -y, only extract and store pages whose YARA score (sum of '
+             'the matched rules\' score meta) is at least this value'
+    )
+    parser.add_argument(
+        '-ew',
+        '--extract-workers',
+        type=int,
+        default=1,
+        help='Number of pages of the input file fetched concurrently (Default: 1)'
+    )
+    parser.add_argument(
+        '-sw',
+        '--scan-workers',
+        type=int,
+        default=1,
+        help='Number of processes YARA-scanning pages of the input file; with 1 '
+             'pages are scanned on a thread (Default: 1)'
+    )
+    parser.add_argument(
+        '-uo',
+        '--unordered',
+        action='store_true',
+        help='Write or print extracted pages as they finish instead of in '
+             'input order'
+    )
+    parser.add_argument(
+        '-warc',
+        '--warc',
+        action='store_true',
+        help='With -c, store the extracted pages in gzip-compressed WARC '
+             'files with a CDX index instead of one file per page'
+    )
+    parser.add_argument(
+        '-wsz',
+        '--warc-max-size',
+        type=int,
+        default=DEFAULT_WARC_MAX_SIZE,
+        help='Size in bytes after which a new WARC file is started '
+             '(Default: 1 GiB)'
+    )
     parser.add_argument(
         '-rua',
         '--random-ua',
@@ -230,6 +392,61 @@ def main():
         '--proxy',
         help='IP address for SOCKS5 proxy',default='127.0.0.1'
     )
+    parser.add_argument(
+        '-iso',
+        '--isolate',
+        action='store_true',
+        help='Put every fetch worker on its own TOR circuit (SOCKS auth isolation)'
+    )
+    parser.add_argument(
+        '-tp',
+        '--tor-pool',
+        type=parse_endpoints,
+        help='Comma separated TOR SOCKS endpoints (host:port) to balance '
+             'requests over'
+    )
+    parser.add_argument(
+        '-mhc',
+        '--max-host-connections',
+        type=int,
+        default=8,
+        help='Maximum keep-alive connections per host (Default: 8)'
+    )
+    parser.add_argument(
+        '-ct',
+        '--connect-timeout',
+        type=float,
+        default=30.0,
+        help='Seconds to establish a connection (Default: 30)'
+    )
+    parser.add_argument(
+        '-rt',
+        '--read-timeout',
+        type=float,
+        default=60.0,
+        help='Seconds to wait for data from a connection (Default: 60)'
+    )
+    parser.add_argument(
+        '-tt',
+        '--total-timeout',
+        type=float,
+        default=300.0,
+        help='Seconds allowed for a whole request, 0 for no limit (Default: 300)'
+    )
+    parser.add_argument(
+        '-re',
+        '--retries',
+        type=int,
+        default=2,
+        help='Retries of transient failures, with exponential backoff (Default: 2)'
+    )
+    parser.add_argument(
+        '-hg',
+        '--hedge',
+        action='store_true',
+        help='Send a duplicate over another circuit when a request is slower '
+             'than the host\'s p95 latency'
+    )
 
     args = parser.parse_args()
 
@@ -259,6 +476,8 @@ def main():
     depth = args.depth if args.depth else 0
     pause = args.pause if args.pause else 0
     selection_yara = args.yara if args.yara else None
+    if args.yara_rules:
+        configure_rules(args.yara_rules)
     random_ua = args.random_ua
     random_proxy = args.random_proxy
 
@@ -273,6 +492,14 @@ def main():
         print("## Random proxy rotation disabled. Using TOR instead.")
         random_proxy = False
 
+    # Connections are kept alive and reused across pages of the same site.
+    configure_connections(max_per_host=args.max_host_connections)
+    configure_requests(RequestPolicy(connect_timeout=args.connect_timeout,
+                                     read_timeout=args.read_timeout,
+                                     total_timeout=args.total_timeout or None,
+                                     retries=args.retries,
+                                     hedge=args.hedge))
+
     # Connect to TOR or random proxy
     if random_proxy:
         # Random proxy rotation enabled - will be handled per request
@@ -280,15 +507,33 @@ def main():
             print("## Random proxy rotation enabled (TOR disabled)")
     elif args.without is False:
         check_tor(args.verbose)
-        connect_tor(args.proxy, args.proxyport)
+        connect_tor(args.proxy, args.proxyport, args.isolate, args.tor_pool, args.hedge)
 
     if args.verbose:
         check_ip()
         if args.url: print(('## URL: ' + args.url))
 
     if args.crawl:
+        state_dir = args.state_dir
+        if args.resume and state_dir is None:
+            state_dir = os.path.join(output_folder, 'state')
+        # The extractor reads the pages fetched by this crawl instead of
+        # downloading them again.
+        page_store = None
+        if args.extract:
+            page_store = PageStore(os.path.join(output_folder, 'pages'), since=time.time())
         crawler = Crawler(website, depth, pause, output_folder, args.log,
-                          args.verbose, random_ua, random_proxy)
+                          args.verbose, random_ua, random_proxy,
+                          workers=args.workers,
+                          max_page_bytes=args.max_page_bytes,
+                          parser=args.parser,
+                          async_writes=args.async_writes,
+                          seen_store=args.seen_store,
+                          bloom_error=args.bloom_error,
+                          state_dir=state_dir,
+                          resume=args.resume,
+                          incremental=args.incremental,
+                          page_store=page_store)
         lst = crawler.crawl()
 
         if args.input is None:
@@ -299,9 +544,19 @@ def main():
                 file.write(f"{item}\n")
         print(f"## File created on {os.getcwd()}/{input_file}")
 
+        yara_results = {}
         if args.extract:
-            extractor(website, args.crawl, output_file, input_file, output_folder,
-                      selection_yara, random_ua, random_proxy)
+            yara_results = extractor(website, args.crawl, output_file, input_file, output_folder,
+                                     selection_yara, random_ua, random_proxy,
+                                     page_store=page_store,
+                                     fetch_workers=args.extract_workers,
+                                     scan_workers=args.scan_workers,
+                                     ordered=not args.unordered, min_score=args.min_score,
+                                     warc=args.warc, warc_max_size=args.warc_max_size)
+            if args.verbose:
+                print(f"## Page store: {page_store.hits} page(s) reused, "
+                      f"{page_store.misses} fetched again")
+            page_store.close()
 
         payload = crawler.export_payload()
 
@@ -310,12 +565,18 @@ def main():
         if args.xml_export:
             export_xml(output_folder, results_prefix, payload["data"], verbose=args.verbose)
         if args.database_export:
-            export_database(output_folder, results_prefix, payload["data"], payload["edges"], payload["titles"], payload["resources"], verbose=args.verbose)
+            export_database(output_folder, results_prefix, payload["data"], payload["edges"], payload["titles"], payload["resources"], verbose=args.verbose,
+                            pages=crawler.pages, yara_matches=yara_results)
         if args.visualization:
             export_visualization(output_folder, results_prefix, payload["start_url"], verbose=args.verbose)
     else:
         extractor(website, args.crawl, output_file, input_file, output_folder,
-                  selection_yara, random_ua, random_proxy)
+                  selection_yara, random_ua, random_proxy,
+                  fetch_workers=args.extract_workers, scan_workers=args.scan_workers,
+                  ordered=not args.unordered, min_score=args.min_score)
+
+    if args.verbose:
+        print(f"## Transferred {transfer_stats.summary()}")
 
 
 # Stub to call main method.